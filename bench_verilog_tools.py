@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+工具链自身的性能基准测试
+用现有生成器合成指定规模的工作区，分别计时批量生成、项目发现、列表、报告，
+以及使用假 make / iverilog / vvp（只 sleep 并输出固定结果）的编译和仿真，
+结果以 JSON 输出，便于不同版本之间比较，不需要安装真实的仿真工具
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import contextlib
+import subprocess
+from pathlib import Path
+from datetime import datetime
+
+
+# 计时的阶段（按执行顺序）
+STAGES = ('generate', 'discover', 'list', 'report', 'compile', 'simulate')
+
+# 合成工作区使用的信号定义（按项目序号循环使用）
+SIGNAL_PATTERNS = (
+    'a, b / y',
+    'clk, rst_n, en / [7:0] count',
+    '[15:0] a, [15:0] b, cin / [15:0] sum, cout',
+    'clk, rst_n, [31:0] din, valid / [31:0] dout, ready',
+)
+
+# 假工具链（{sleep} 为每次调用的耗时）
+FAKE_MAKE = '''#!/bin/sh
+# 基准测试用的假 make：只识别目标和 OUTPUT_NAME，不读取 Makefile
+goal=all
+out=sim
+for arg in "$@"; do
+    case "$arg" in
+        OUTPUT_NAME=*) out=${{arg#OUTPUT_NAME=}} ;;
+        *=*|-*) ;;
+        *) goal=$arg ;;
+    esac
+done
+sleep {sleep}
+case "$goal" in
+    compile) echo "fake image" > "$out.vvp" ;;
+    simulate|all|run) echo "$out.v:1: \\$finish called at 1000000 (1ps)" ;;
+    clean) rm -f ./*.vvp ./*.vcd ./*.log ;;
+esac
+'''
+
+FAKE_IVERILOG = '''#!/bin/sh
+# 基准测试用的假 iverilog：只写出 -o 指定的文件
+out=a.out
+while [ $# -gt 0 ]; do
+    case "$1" in -o) out=$2; shift ;; esac
+    shift
+done
+sleep {sleep}
+echo "fake image" > "$out"
+'''
+
+FAKE_VVP = '''#!/bin/sh
+# 基准测试用的假 vvp
+sleep {sleep}
+echo "fake.v:1: \\$finish called at 1000000 (1ps)"
+'''
+
+
+def write_fake_toolchain(bin_dir, sleep=0.0):
+    """
+    在 bin_dir 中写入假 make / iverilog / vvp
+    Args:
+        sleep: 每次调用 sleep 的秒数，模拟工具耗时
+    """
+    bin_dir = Path(bin_dir)
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for name, template in (('make', FAKE_MAKE), ('iverilog', FAKE_IVERILOG), ('vvp', FAKE_VVP)):
+        path = bin_dir / name
+        path.write_text(template.format(sleep=sleep), encoding='utf-8')
+        path.chmod(0o755)
+    return bin_dir
+
+
+def synthesize_entries(count):
+    """生成 count 个项目的 (名称, 信号定义) 列表"""
+    return [(f'bench_{i:05d}', SIGNAL_PATTERNS[i % len(SIGNAL_PATTERNS)]) for i in range(count)]
+
+
+def _git_revision():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=Path(__file__).resolve().parent, timeout=5)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() or None
+
+
+class Benchmark:
+    """在一个合成工作区中依次计时各阶段"""
+
+    def __init__(self, workspace, projects, jobs=1, build_projects=None, tool_sleep=0.0):
+        """
+        Args:
+            workspace: 工作区目录（各阶段在其中运行）
+            projects: 合成的项目数
+            jobs: 编译阶段的并行数
+            build_projects: 编译/仿真阶段只使用前 N 个项目（默认全部）
+            tool_sleep: 假工具每次调用的耗时（秒）
+        """
+        self.workspace = Path(workspace)
+        self.entries = synthesize_entries(projects)
+        self.jobs = jobs
+        self.build_projects = build_projects
+        self.tool_sleep = tool_sleep
+        self.manager = None
+
+    def _manager(self):
+        """构建阶段使用的管理器（项目数按 build_projects 截取）"""
+        from manage_verilog_projects import VerilogProjectManager
+
+        manager = VerilogProjectManager()
+        if self.build_projects is not None:
+            names = sorted(manager.projects)[:self.build_projects]
+            manager.projects = {name: manager.projects[name] for name in names}
+        return manager
+
+    def stage_generate(self):
+        from create_verilog_project import generate_batch
+
+        summary = generate_batch(self.entries, base_dir='.', if_exists='overwrite', jobs=self.jobs)
+        if summary['failed']:
+            raise RuntimeError(f"生成失败: {summary['failed'][:3]}")
+
+    def stage_discover(self):
+        from manage_verilog_projects import VerilogProjectManager
+
+        self.manager = VerilogProjectManager()
+        self.manager.load_projects()
+
+    def stage_list(self):
+        self.manager.list_projects()
+
+    def stage_report(self):
+        self.manager.generate_report()
+
+    def stage_compile(self):
+        # 失败的阶段可能很快结束，计入结果会被误报为加速
+        if not self._manager().compile_all(jobs=self.jobs):
+            raise RuntimeError("编译阶段有失败的项目")
+
+    def stage_simulate(self):
+        # 假工具链每次编译的产物相同，不使用结果缓存，否则重复运行只会计时缓存命中
+        if not self._manager().simulate_all(result_cache=False):
+            raise RuntimeError("仿真阶段有失败的项目")
+
+    def run(self, stages=STAGES, repeat=1):
+        """
+        依次运行各阶段，每个阶段重复 repeat 次
+        Returns:
+            {阶段: {'seconds': 最短耗时, 'samples': [...], 'per_project_ms': ...}}
+        """
+        results = {}
+        cwd = os.getcwd()
+        bin_dir = write_fake_toolchain(self.workspace / '.bench_bin', self.tool_sleep)
+        old_path = os.environ.get('PATH', '')
+        os.environ['PATH'] = f"{bin_dir}{os.pathsep}{old_path}"
+        os.chdir(self.workspace)
+        # 未计时但后续阶段依赖的准备阶段：list / report 需要已发现的项目，其他阶段需要已生成的工作区
+        prepare = set()
+        if {'list', 'report'} & set(stages):
+            prepare.add('discover')
+        if self.entries and not (self.workspace / self.entries[-1][0]).is_dir():
+            prepare.add('generate')
+        try:
+            for stage in STAGES:
+                if stage not in stages and stage not in prepare:
+                    continue
+                samples = []
+                for _ in range(repeat if stage in stages else 1):
+                    # 各阶段的输出与计时无关，只在失败时显示
+                    output = io.StringIO()
+                    try:
+                        with contextlib.redirect_stdout(output):
+                            start = time.perf_counter()
+                            getattr(self, f'stage_{stage}')()
+                            samples.append(time.perf_counter() - start)
+                    except Exception:
+                        print(output.getvalue()[-4000:], flush=True)
+                        raise
+                if stage not in stages:
+                    continue
+                count = len(self.entries)
+                if stage in ('compile', 'simulate') and self.build_projects is not None:
+                    count = min(count, self.build_projects)
+                best = min(samples)
+                results[stage] = {
+                    'seconds': round(best, 6),
+                    'samples': [round(s, 6) for s in samples],
+                    'per_project_ms': round(best * 1000 / count, 4) if count else None,
+                }
+                print(f"  {stage:<10} {best:>10.3f}s  ({results[stage]['per_project_ms']} ms/项目)",
+                      flush=True)
+        finally:
+            os.chdir(cwd)
+            os.environ['PATH'] = old_path
+        return results
+
+
+def compare(results, baseline):
+    """打印本次结果与基线结果的对比"""
+    print(f"\n{'阶段':<10} {'基线(s)':>10} {'本次(s)':>10} {'比值':>8}")
+    for stage, current in results['stages'].items():
+        base = baseline.get('stages', {}).get(stage)
+        if not base:
+            print(f"{stage:<10} {'-':>10} {current['seconds']:>10.3f} {'':>8}")
+            continue
+        ratio = current['seconds'] / base['seconds'] if base['seconds'] else float('inf')
+        mark = '  ⚠ 变慢' if ratio > 1.1 else ''
+        print(f"{stage:<10} {base['seconds']:>10.3f} {current['seconds']:>10.3f} {ratio:>7.2f}x{mark}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Verilog 工具链性能基准测试',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+示例:
+  # 1000 个项目，全部阶段
+  python bench_verilog_tools.py --projects 1000
+
+  # 10000 个项目，编译/仿真只用前 500 个，结果保存到文件
+  python bench_verilog_tools.py --projects 10000 --build-projects 500 -o bench.json
+
+  # 只测发现和报告，与之前的结果比较
+  python bench_verilog_tools.py --stages discover report --compare bench.json
+        '''
+    )
+    parser.add_argument('--projects', type=int, default=1000, help='合成的项目数（默认: 1000）')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES),
+                        help='需要计时的阶段（默认: 全部）')
+    parser.add_argument('--repeat', type=int, default=1, help='每个阶段重复次数，取最短耗时（默认: 1）')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='生成/编译阶段的并行数')
+    parser.add_argument('--build-projects', type=int, help='编译/仿真阶段只使用前 N 个项目')
+    parser.add_argument('--tool-sleep', type=float, default=0.0,
+                        help='假 make / iverilog / vvp 每次调用的耗时（秒，默认: 0）')
+    parser.add_argument('--workspace', help='工作区目录（默认: 临时目录，结束后删除）')
+    parser.add_argument('-o', '--output', help='将结果写入该 JSON 文件')
+    parser.add_argument('--compare', help='与之前保存的结果 JSON 比较')
+
+    args = parser.parse_args()
+
+    if args.workspace:
+        workspace = Path(args.workspace)
+        workspace.mkdir(parents=True, exist_ok=True)
+    else:
+        workspace = Path(tempfile.mkdtemp(prefix='verilog_bench_'))
+
+    print(f"\n基准测试: {args.projects} 个项目，工作区 {workspace}\n")
+    try:
+        bench = Benchmark(workspace, args.projects, jobs=args.jobs,
+                          build_projects=args.build_projects, tool_sleep=args.tool_sleep)
+        stages = bench.run(args.stages, repeat=max(1, args.repeat))
+    except RuntimeError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+    finally:
+        if not args.workspace:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'config': {
+            'projects': args.projects,
+            'build_projects': args.build_projects,
+            'jobs': args.jobs,
+            'repeat': args.repeat,
+            'tool_sleep': args.tool_sleep,
+        },
+        'stages': stages,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n✓ 结果已保存到 {args.output}")
+    else:
+        print()
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+
+    if args.compare:
+        try:
+            with open(args.compare, encoding='utf-8') as f:
+                compare(results, json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"✗ 无法读取基线结果: {e}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,8 @@
 # -*- coding: utf-8 -*-
 """
 常用数字电路模板生成器
-提供快速生成常用芯片模块的功能
+提供快速生成常用芯片模块的功能，模板支持位宽/深度/路数/状态数等参数，
+可以生成任意规模的设计及对应的自检测 Testbench
 """
 
 import os
@@ -10,388 +11,556 @@ import sys
 from pathlib import Path
 
 
-def create_template_project(name, inputs, outputs, template_type):
-    """生成模板项目"""
+# 模板注册表: 模板名 -> {'description', 'params': {参数名: 默认值}, 'builder': 生成函数}
+TEMPLATES = {}
+
+# 兼容旧模板名: 旧名 -> (模板名, 参数)
+TEMPLATE_ALIASES = {
+    'mux2to1': ('mux', {'ways': 2}),
+    'demux1to2': ('demux', {'ways': 2}),
+}
+
+# 各参数的最小值
+PARAM_MINIMUMS = {
+    'width': 1,
+    'depth': 2,
+    'ways': 2,
+    'states': 2,
+}
+
+
+def register_template(name, description, **defaults):
+    """
+    注册模板的装饰器
+    生成函数签名: builder(name, **params)，返回
+    {'inputs': [...], 'outputs': [...], 'rtl': RTL代码, 'tb': Testbench代码}
+    """
+    def decorator(builder):
+        TEMPLATES[name] = {
+            'description': description,
+            'params': defaults,
+            'builder': builder,
+        }
+        return builder
+    return decorator
+
+
+def resolve_template(template_type, params=None):
+    """
+    解析模板名（含旧模板名）并合并参数
+    Returns:
+        (模板名, 完整参数字典)
+    """
+    params = dict(params or {})
+    if template_type in TEMPLATE_ALIASES:
+        template_type, alias_params = TEMPLATE_ALIASES[template_type]
+        params = {**alias_params, **params}
+
+    if template_type not in TEMPLATES:
+        raise ValueError(f"未知的模板 '{template_type}'")
+
+    template = TEMPLATES[template_type]
+    unknown = set(params) - set(template['params'])
+    if unknown:
+        raise ValueError(f"模板 '{template_type}' 不支持参数: {', '.join(sorted(unknown))}")
+
+    merged = {**template['params'], **params}
+    for key, value in merged.items():
+        minimum = PARAM_MINIMUMS.get(key, 1)
+        if value < minimum:
+            raise ValueError(f"参数 {key} 不能小于 {minimum}")
+    return template_type, merged
+
+
+def default_project_name(template_type, params=None):
+    """
+    默认项目名：参数均为默认值时就是模板名（旧模板名保持不变），
+    否则附加非默认参数，例如 counter_width32、mux_ways8_width16
+    """
+    if template_type in TEMPLATE_ALIASES and not params:
+        return template_type
+
+    resolved_type, merged = resolve_template(template_type, params)
+    defaults = TEMPLATES[resolved_type]['params']
+    suffix = ''.join(f"_{key}{value}" for key, value in merged.items()
+                     if value != defaults[key])
+    return resolved_type + suffix
+
+
+def create_template_project(name, template_type, params=None, base_dir='.', verbose=True):
+    """
+    生成模板项目
+    Args:
+        name: 项目名（同时是模块名）
+        template_type: 模板名或旧模板名
+        params: 模板参数，如 {'width': 32}
+        base_dir: 项目所在的父目录
+        verbose: 是否打印生成过程
+    Returns:
+        项目目录
+    """
     from create_verilog_project import VerilogProjectGenerator
-    
+
+    template_type, params = resolve_template(template_type, params)
+    design = TEMPLATES[template_type]['builder'](name, **params)
+
     # 构建信号字符串
-    if inputs and outputs:
-        signals = f"{' '.join(inputs)} / {' '.join(outputs)}"
-    elif inputs:
-        signals = f"{' '.join(inputs)} /"
-    else:
-        signals = f"/ {' '.join(outputs)}"
-    
+    signals = f"{', '.join(design['inputs'])} / {', '.join(design['outputs'])}"
+
     # 生成基础项目
-    generator = VerilogProjectGenerator(name, signals)
+    generator = VerilogProjectGenerator(name, signals, base_dir=base_dir, verbose=verbose)
     generator.create_project_structure()
-    
-    # 生成模板特定的内容
-    if template_type == "mux2to1":
-        generate_mux2to1(generator)
-    elif template_type == "demux1to2":
-        generate_demux1to2(generator)
-    elif template_type == "counter":
-        generate_counter(generator)
-    elif template_type == "shift_register":
-        generate_shift_register(generator)
-    elif template_type == "fsm":
-        generate_fsm(generator)
-    
+
+    # 生成模板特定的内容（内容未变化时不重写，保持 mtime）
+    generator._write_file(generator.project_dir / 'rtl' / f'{name}.v', design['rtl'])
+    generator._write_file(generator.project_dir / 'sim' / f'{name}_tb.v', design['tb'])
+    param_desc = ', '.join(f"{key}={value}" for key, value in params.items())
+    generator._log(f"  - 生成 {template_type} 模板 ({param_desc})")
+
     # 生成其他文件
     generator.generate_makefile()
     generator.generate_readme()
-    
-    print(f"✓ 模板项目 '{name}' ({template_type}) 生成完成")
+
+    generator._log(f"✓ 模板项目 '{name}' ({template_type}) 生成完成")
     return generator.project_dir
 
 
-def generate_mux2to1(gen):
-    """2选1多路选择器"""
-    rtl_code = """`timescale 1ns/1ps
+def _clog2(value):
+    """选择信号所需位宽，至少1位"""
+    return max(1, (value - 1).bit_length())
+
+
+def _testbench(name, declarations, instance, body, default_cycles, clocked=True):
+    """
+    生成自检测 Testbench 的公共框架
+    - 支持 +shard=i +nshards=k 分片：每个分片只运行 +cycles=N 个测试向量中的一段
+    - 支持 +dumpfile=xxx.vcd 指定波形文件，+nodump 关闭波形（测量仿真吞吐量时使用）
+    - 结束时打印 PASS / FAIL 汇总
+    Args:
+        declarations: 模板特有的信号声明
+        instance: 被测模块实例化代码
+        body: 测试代码，可使用 first/last（本分片的向量区间）、seed、errors、checks
+        default_cycles: 默认测试向量总数
+        clocked: 是否生成时钟
+    """
+    clock = "\n    // 时钟生成\n    always #5 clk = ~clk;\n" if clocked else ""
+
+    return f"""`timescale 1ns/1ps
+
+module {name}_tb;
+{declarations}
+    integer i, k, errors, checks, seed;
+    integer shard, nshards, cycles, span, first, last;
+    reg [8*256-1:0] dump_file;
+
+{instance}
+{clock}
+    initial begin
+        // 分片参数：第 shard 片负责测试向量区间 [first, last)
+        if (!$value$plusargs("shard=%d", shard)) shard = 0;
+        if (!$value$plusargs("nshards=%d", nshards)) nshards = 1;
+        if (!$value$plusargs("cycles=%d", cycles)) cycles = {default_cycles};
+        if (!$value$plusargs("dumpfile=%s", dump_file)) dump_file = "{name}.vcd";
+        span  = (cycles + nshards - 1) / nshards;
+        first = shard * span;
+        last  = (first + span < cycles) ? first + span : cycles;
+        seed  = shard + 1;
+        errors = 0;
+        checks = 0;
+
+        if (!$test$plusargs("nodump")) begin
+            $dumpfile(dump_file);
+            $dumpvars(0, {name}_tb);
+        end
 
-module mux2to1 (
-    input i0, i1, sel,
-    output y
-);
-    // 2选1多路选择器
-    // sel=0时，y=i0; sel=1时，y=i1
-    
-    assign y = sel ? i1 : i0;
+{body}
 
-endmodule
-"""
-    
-    tb_code = """`timescale 1ns/1ps
-
-module mux2to1_tb;
-    reg i0, i1, sel;
-    wire y;
-    
-    mux2to1 uut (.i0(i0), .i1(i1), .sel(sel), .y(y));
-    
-    initial begin
-        $dumpfile("mux2to1.vcd");
-        $dumpvars(0, mux2to1_tb);
-        $monitor("@%t: i0=%b i1=%b sel=%b => y=%b", $time, i0, i1, sel, y);
-        
-        // 测试所有8种组合
-        #10 i0=0; i1=0; sel=0;
-        #10 i0=0; i1=0; sel=1;
-        #10 i0=0; i1=1; sel=0;
-        #10 i0=0; i1=1; sel=1;
-        #10 i0=1; i1=0; sel=0;
-        #10 i0=1; i1=0; sel=1;
-        #10 i0=1; i1=1; sel=0;
-        #10 i0=1; i1=1; sel=1;
-        
-        #20 $finish;
+        if (errors == 0)
+            $display("PASS: %0d checks (shard %0d/%0d)", checks, shard, nshards);
+        else
+            $display("FAIL: %0d errors in %0d checks (shard %0d/%0d)", errors, checks, shard, nshards);
+        $finish;
     end
 endmodule
 """
-    
-    gen.project_dir.joinpath('rtl', 'mux2to1.v').write_text(rtl_code)
-    gen.project_dir.joinpath('sim', 'mux2to1_tb.v').write_text(tb_code)
-    print("  - 生成 mux2to1 模板")
 
 
-def generate_demux1to2(gen):
-    """1分2解多路器"""
-    rtl_code = """`timescale 1ns/1ps
+@register_template('mux', 'N选1多路选择器', ways=2, width=1)
+def generate_mux(name, ways, width):
+    """N选1多路选择器"""
+    sel_width = _clog2(ways)
+
+    rtl_code = f"""`timescale 1ns/1ps
 
-module demux1to2 (
-    input i, sel,
-    output o0, o1
+module {name} #(
+    parameter WAYS = {ways},
+    parameter WIDTH = {width},
+    parameter SEL_WIDTH = {sel_width}
+) (
+    input [WAYS*WIDTH-1:0] data,
+    input [SEL_WIDTH-1:0] sel,
+    output [WIDTH-1:0] y
 );
-    // 1分2解多路器
-    // sel=0时，o0=i, o1=0; sel=1时，o0=0, o1=i
-    
-    assign o0 = sel ? 1'b0 : i;
-    assign o1 = sel ? i : 1'b0;
+    // {ways}选1多路选择器，每路 {width} 位
+    // y = data[sel*WIDTH +: WIDTH]
+
+    assign y = data[sel*WIDTH +: WIDTH];
 
 endmodule
 """
-    
-    tb_code = """`timescale 1ns/1ps
-
-module demux1to2_tb;
-    reg i, sel;
-    wire o0, o1;
-    
-    demux1to2 uut (.i(i), .sel(sel), .o0(o0), .o1(o1));
-    
-    initial begin
-        $dumpfile("demux1to2.vcd");
-        $dumpvars(0, demux1to2_tb);
-        $monitor("@%t: i=%b sel=%b => o0=%b o1=%b", $time, i, sel, o0, o1);
-        
-        // 测试所有4种组合
-        #10 i=0; sel=0;
-        #10 i=1; sel=0;
-        #10 i=0; sel=1;
-        #10 i=1; sel=1;
-        
-        #20 $finish;
+
+    declarations = f"""    localparam WAYS = {ways};
+    localparam WIDTH = {width};
+    localparam SEL_WIDTH = {sel_width};
+
+    reg [WAYS*WIDTH-1:0] data;
+    reg [SEL_WIDTH-1:0] sel;
+    wire [WIDTH-1:0] y;"""
+
+    instance = f"""    {name} #(.WAYS(WAYS), .WIDTH(WIDTH), .SEL_WIDTH(SEL_WIDTH)) uut (
+        .data(data), .sel(sel), .y(y)
+    );"""
+
+    body = """        // 每个向量: 随机数据，依次选择每一路
+        for (i = first; i < last; i = i + 1) begin
+            for (k = 0; k < WAYS*WIDTH; k = k + 1)
+                data[k] = $random(seed);
+            sel = i % WAYS;
+            #10;
+            if (y !== data[sel*WIDTH +: WIDTH]) begin
+                errors = errors + 1;
+                $display("ERROR: @%0t sel=%0d y=%h expected=%h", $time, sel, y, data[sel*WIDTH +: WIDTH]);
+            end
+            checks = checks + 1;
+        end"""
+
+    return {
+        'inputs': [f'[{ways * width - 1}:0] data', f'[{sel_width - 1}:0] sel'],
+        'outputs': [f'[{width - 1}:0] y'],
+        'rtl': rtl_code,
+        'tb': _testbench(name, declarations, instance, body,
+                         default_cycles=max(64, 16 * ways), clocked=False),
+    }
+
+
+@register_template('demux', '1分N解多路器', ways=2, width=1)
+def generate_demux(name, ways, width):
+    """1分N解多路器"""
+    sel_width = _clog2(ways)
+
+    rtl_code = f"""`timescale 1ns/1ps
+
+module {name} #(
+    parameter WAYS = {ways},
+    parameter WIDTH = {width},
+    parameter SEL_WIDTH = {sel_width}
+) (
+    input [WIDTH-1:0] i,
+    input [SEL_WIDTH-1:0] sel,
+    output reg [WAYS*WIDTH-1:0] o
+);
+    // 1分{ways}解多路器，每路 {width} 位
+    // 第 sel 路输出 i，其余各路输出 0
+
+    always @(*) begin
+        o = {{WAYS*WIDTH{{1'b0}}}};
+        o[sel*WIDTH +: WIDTH] = i;
     end
+
 endmodule
 """
-    
-    gen.project_dir.joinpath('rtl', 'demux1to2.v').write_text(rtl_code)
-    gen.project_dir.joinpath('sim', 'demux1to2_tb.v').write_text(tb_code)
-    print("  - 生成 demux1to2 模板")
+
+    declarations = f"""    localparam WAYS = {ways};
+    localparam WIDTH = {width};
+    localparam SEL_WIDTH = {sel_width};
+
+    reg [WIDTH-1:0] i_data;
+    reg [SEL_WIDTH-1:0] sel;
+    wire [WAYS*WIDTH-1:0] o;
+    reg [WAYS*WIDTH-1:0] expected;"""
+
+    instance = f"""    {name} #(.WAYS(WAYS), .WIDTH(WIDTH), .SEL_WIDTH(SEL_WIDTH)) uut (
+        .i(i_data), .sel(sel), .o(o)
+    );"""
+
+    body = """        // 每个向量: 随机输入，依次选择每一路
+        for (i = first; i < last; i = i + 1) begin
+            for (k = 0; k < WIDTH; k = k + 1)
+                i_data[k] = $random(seed);
+            sel = i % WAYS;
+            expected = {WAYS*WIDTH{1'b0}};
+            expected[sel*WIDTH +: WIDTH] = i_data;
+            #10;
+            if (o !== expected) begin
+                errors = errors + 1;
+                $display("ERROR: @%0t sel=%0d o=%h expected=%h", $time, sel, o, expected);
+            end
+            checks = checks + 1;
+        end"""
+
+    return {
+        'inputs': [f'[{width - 1}:0] i', f'[{sel_width - 1}:0] sel'],
+        'outputs': [f'[{ways * width - 1}:0] o'],
+        'rtl': rtl_code,
+        'tb': _testbench(name, declarations, instance, body,
+                         default_cycles=max(64, 16 * ways), clocked=False),
+    }
 
 
-def generate_counter(gen):
-    """4位计数器"""
-    rtl_code = """`timescale 1ns/1ps
+@register_template('counter', 'N位计数器（带装载）', width=4)
+def generate_counter(name, width):
+    """N位计数器"""
+    rtl_code = f"""`timescale 1ns/1ps
 
-module counter (
-    input clk, rst, enable,
-    output [3:0] count
+module {name} #(
+    parameter WIDTH = {width}
+) (
+    input clk, rst, enable, load,
+    input [WIDTH-1:0] d,
+    output [WIDTH-1:0] count
 );
-    // 4位二进制计数器
-    // enable=1时计数，rst=1时复位
-    
-    reg [3:0] count_reg;
-    
+    // {width}位二进制计数器
+    // rst=1时复位，load=1时装载d，enable=1时计数
+
+    reg [WIDTH-1:0] count_reg;
+
     always @(posedge clk) begin
         if (rst)
-            count_reg <= 4'b0000;
+            count_reg <= {{WIDTH{{1'b0}}}};
+        else if (load)
+            count_reg <= d;
         else if (enable)
-            count_reg <= count_reg + 1;
+            count_reg <= count_reg + 1'b1;
     end
-    
+
     assign count = count_reg;
 
 endmodule
 """
-    
-    tb_code = """`timescale 1ns/1ps
-
-module counter_tb;
-    reg clk, rst, enable;
-    wire [3:0] count;
-    integer i;
-    
-    counter uut (.clk(clk), .rst(rst), .enable(enable), .count(count));
-    
-    // 时钟生成
-    always #5 clk = ~clk;
-    
-    initial begin
-        clk = 0;
-        $dumpfile("counter.vcd");
-        $dumpvars(0, counter_tb);
-        $monitor("@%t: count=%4b rst=%b enable=%b", $time, count, rst, enable);
-        
+
+    declarations = f"""    localparam WIDTH = {width};
+
+    reg clk, rst, enable, load;
+    reg [WIDTH-1:0] d;
+    wire [WIDTH-1:0] count;
+    reg [WIDTH-1:0] expected;"""
+
+    instance = f"""    {name} #(.WIDTH(WIDTH)) uut (
+        .clk(clk), .rst(rst), .enable(enable), .load(load), .d(d), .count(count)
+    );"""
+
+    body = """        clk = 0; rst = 1; enable = 0; load = 0; d = 0;
+        @(negedge clk);
+        @(negedge clk) rst = 0;
+
         // 测试1: 复位
-        #10 rst = 1; enable = 0;
-        #20 rst = 0; enable = 0;
-        #10 $display("Test 1: 复位完成");
-        
-        // 测试2: 计数（0到15）
-        #10 enable = 1;
-        for (i = 0; i < 16; i = i + 1) begin
-            #10;
+        if (count !== 0) begin
+            errors = errors + 1;
+            $display("ERROR: 复位后 count=%0d", count);
+        end
+        checks = checks + 1;
+
+        // 测试2: 装载本分片的起始值，然后逐个检查计数值
+        d = first;
+        load = 1;
+        @(negedge clk) load = 0;
+        enable = 1;
+        expected = first;
+        for (i = first; i < last; i = i + 1) begin
+            if (count !== expected) begin
+                errors = errors + 1;
+                $display("ERROR: @%0t count=%0d expected=%0d", $time, count, expected);
+            end
+            checks = checks + 1;
+            expected = expected + 1'b1;
+            @(negedge clk);
         end
-        #10 $display("Test 2: 计数完成");
-        
-        // 测试3: 禁用计数
-        #10 enable = 0;
-        #20 $display("Test 3: 计数禁用");
-        
-        // 测试4: 重新复位
-        #10 rst = 1;
-        #10 rst = 0;
-        #10 $display("Test 4: 重新复位完成");
-        
-        #20 $finish;
-    end
-endmodule
-"""
-    
-    gen.project_dir.joinpath('rtl', 'counter.v').write_text(rtl_code)
-    gen.project_dir.joinpath('sim', 'counter_tb.v').write_text(tb_code)
-    print("  - 生成 counter 模板")
+
+        // 测试3: 禁用计数时保持
+        enable = 0;
+        expected = count;
+        @(negedge clk);
+        @(negedge clk);
+        if (count !== expected) begin
+            errors = errors + 1;
+            $display("ERROR: 禁用计数后 count=%0d expected=%0d", count, expected);
+        end
+        checks = checks + 1;"""
+
+    return {
+        'inputs': ['clk', 'rst', 'enable', 'load', f'[{width - 1}:0] d'],
+        'outputs': [f'[{width - 1}:0] count'],
+        'rtl': rtl_code,
+        # 默认遍历全部计数值，位宽很大时最多 65536 个，可用 +cycles=N 调整
+        'tb': _testbench(name, declarations, instance, body,
+                         default_cycles=min(2 ** width, 65536)),
+    }
 
 
-def generate_shift_register(gen):
-    """4位移位寄存器"""
-    rtl_code = """`timescale 1ns/1ps
+@register_template('shift_register', '深度D移位寄存器', depth=4)
+def generate_shift_register(name, depth):
+    """深度D移位寄存器"""
+    rtl_code = f"""`timescale 1ns/1ps
 
-module shift_register (
+module {name} #(
+    parameter DEPTH = {depth}
+) (
     input clk, rst, shift_in,
-    output [3:0] data_out
+    output [DEPTH-1:0] data_out
 );
-    // 4位串入并出的移位寄存器
-    
-    reg [3:0] sr;
-    
+    // {depth}位串入并出的移位寄存器
+
+    reg [DEPTH-1:0] sr;
+
     always @(posedge clk) begin
         if (rst)
-            sr <= 4'b0000;
+            sr <= {{DEPTH{{1'b0}}}};
         else
-            sr <= {sr[2:0], shift_in};
+            sr <= {{sr[DEPTH-2:0], shift_in}};
     end
-    
+
     assign data_out = sr;
 
 endmodule
 """
-    
-    tb_code = """`timescale 1ns/1ps
 
-module shift_register_tb;
+    declarations = f"""    localparam DEPTH = {depth};
+
     reg clk, rst, shift_in;
-    wire [3:0] data_out;
-    integer i;
-    
-    shift_register uut (.clk(clk), .rst(rst), .shift_in(shift_in), .data_out(data_out));
-    
-    // 时钟生成
-    always #5 clk = ~clk;
-    
-    initial begin
-        clk = 0;
-        $dumpfile("shift_register.vcd");
-        $dumpvars(0, shift_register_tb);
-        $monitor("@%t: data_out=%4b shift_in=%b", $time, data_out, shift_in);
-        
-        // 测试1: 复位
-        #10 rst = 1; shift_in = 0;
-        #20 rst = 0;
-        #10 $display("Test 1: 复位完成");
-        
-        // 测试2: 移入序列 1010
-        #10 shift_in = 1;
-        #10 shift_in = 0;
-        #10 shift_in = 1;
-        #10 shift_in = 0;
-        #10 $display("Test 2: 移入序列 1010");
-        
-        // 测试3: 再次复位后移入 1111
-        #10 rst = 1;
-        #10 rst = 0;
-        #10 shift_in = 1;
-        #40;
-        #10 $display("Test 3: 移入序列 1111");
-        
-        #20 $finish;
-    end
-endmodule
-"""
-    
-    gen.project_dir.joinpath('rtl', 'shift_register.v').write_text(rtl_code)
-    gen.project_dir.joinpath('sim', 'shift_register_tb.v').write_text(tb_code)
-    print("  - 生成 shift_register 模板")
+    wire [DEPTH-1:0] data_out;
+    reg [DEPTH-1:0] expected;"""
+
+    instance = f"""    {name} #(.DEPTH(DEPTH)) uut (
+        .clk(clk), .rst(rst), .shift_in(shift_in), .data_out(data_out)
+    );"""
+
+    body = """        clk = 0; rst = 1; shift_in = 0;
+        @(negedge clk);
+        @(negedge clk) rst = 0;
+        expected = {DEPTH{1'b0}};
+
+        // 移入随机序列（各分片使用不同的随机种子），每个周期与参考模型比较
+        for (i = first; i < last; i = i + 1) begin
+            shift_in = $random(seed);
+            expected = {expected[DEPTH-2:0], shift_in};
+            @(negedge clk);
+            if (data_out !== expected) begin
+                errors = errors + 1;
+                $display("ERROR: @%0t data_out=%b expected=%b", $time, data_out, expected);
+            end
+            checks = checks + 1;
+        end"""
+
+    return {
+        'inputs': ['clk', 'rst', 'shift_in'],
+        'outputs': [f'[{depth - 1}:0] data_out'],
+        'rtl': rtl_code,
+        'tb': _testbench(name, declarations, instance, body,
+                         default_cycles=max(64, 4 * depth)),
+    }
 
 
-def generate_fsm(gen):
-    """简单状态机（红绿灯控制器）"""
-    rtl_code = """`timescale 1ns/1ps
+@register_template('fsm', 'M状态环形状态机', states=3)
+def generate_fsm(name, states):
+    """M状态环形状态机"""
+    state_width = _clog2(states)
 
-module fsm (
-    input clk, rst,
-    output reg [1:0] light  // 00=红，01=绿，10=黄
+    state_params = ',\n'.join(f"        S{k} = {state_width}'d{k}" for k in range(states))
+    case_items = '\n'.join(
+        f"            S{k}: next_state = advance ? S{(k + 1) % states} : S{k};"
+        for k in range(states)
+    )
+
+    rtl_code = f"""`timescale 1ns/1ps
+
+module {name} (
+    input clk, rst, advance,
+    output [{state_width - 1}:0] state
 );
-    // 简单状态机：红->绿->黄->红
-    
-    localparam RED = 2'b00, GREEN = 2'b01, YELLOW = 2'b10;
-    
-    reg [1:0] current_state, next_state;
-    
+    // {states}状态环形状态机：S0 -> S1 -> ... -> S{states - 1} -> S0
+    // advance=1 时进入下一状态，否则保持
+
+    localparam
+{state_params};
+
+    reg [{state_width - 1}:0] current_state, next_state;
+
     // 次态逻辑
     always @(*) begin
         case (current_state)
-            RED:    next_state = GREEN;
-            GREEN:  next_state = YELLOW;
-            YELLOW: next_state = RED;
-            default: next_state = RED;
+{case_items}
+            default: next_state = S0;
         endcase
     end
-    
+
     // 状态转移
     always @(posedge clk) begin
         if (rst)
-            current_state <= RED;
+            current_state <= S0;
         else
             current_state <= next_state;
     end
-    
+
     // 输出逻辑
-    assign light = current_state;
+    assign state = current_state;
 
 endmodule
 """
-    
-    tb_code = """`timescale 1ns/1ps
-
-module fsm_tb;
-    reg clk, rst;
-    wire [1:0] light;
-    integer i;
-    
-    fsm uut (.clk(clk), .rst(rst), .light(light));
-    
-    // 时钟生成
-    always #5 clk = ~clk;
-    
-    initial begin
-        clk = 0;
-        $dumpfile("fsm.vcd");
-        $dumpvars(0, fsm_tb);
-        
-        // 显示状态名称
-        always @(light) begin
-            case (light)
-                2'b00: $write("RED");
-                2'b01: $write("GREEN");
-                2'b10: $write("YELLOW");
-                default: $write("UNKNOWN");
-            endcase
-        end
-        
-        $monitor("@%t: light=%b (%s)", $time, light, 
-                 light==2'b00 ? "RED" : light==2'b01 ? "GREEN" : "YELLOW");
-        
-        // 测试: 状态机循环
-        #10 rst = 1;
-        #20 rst = 0;
-        #10 $display("开始状态机循环：RED -> GREEN -> YELLOW -> RED");
-        
-        for (i = 0; i < 6; i = i + 1) begin
-            #10;
-        end
-        
-        #10 $finish;
-    end
-endmodule
-"""
-    
-    gen.project_dir.joinpath('rtl', 'fsm.v').write_text(rtl_code)
-    gen.project_dir.joinpath('sim', 'fsm_tb.v').write_text(tb_code)
-    print("  - 生成 fsm 模板")
+
+    declarations = f"""    localparam STATES = {states};
+
+    reg clk, rst, advance;
+    wire [{state_width - 1}:0] state;
+    reg [{state_width - 1}:0] expected;"""
+
+    instance = f"""    {name} uut (
+        .clk(clk), .rst(rst), .advance(advance), .state(state)
+    );"""
+
+    body = """        clk = 0; rst = 1; advance = 0;
+        @(negedge clk);
+        @(negedge clk) rst = 0;
+        expected = 0;
+
+        // 随机推进状态机，每个周期与参考模型比较
+        for (i = first; i < last; i = i + 1) begin
+            advance = $random(seed);
+            if (advance)
+                expected = (expected == STATES - 1) ? 0 : expected + 1;
+            @(negedge clk);
+            if (state !== expected) begin
+                errors = errors + 1;
+                $display("ERROR: @%0t state=%0d expected=%0d", $time, state, expected);
+            end
+            checks = checks + 1;
+        end"""
+
+    return {
+        'inputs': ['clk', 'rst', 'advance'],
+        'outputs': [f'[{state_width - 1}:0] state'],
+        'rtl': rtl_code,
+        'tb': _testbench(name, declarations, instance, body,
+                         default_cycles=max(64, 4 * states)),
+    }
 
 
 def show_templates():
     """显示所有可用的模板"""
-    templates = {
-        'mux2to1': '2选1多路选择器',
-        'demux1to2': '1分2解多路器',
-        'counter': '4位计数器',
-        'shift_register': '4位移位寄存器',
-        'fsm': '状态机（红绿灯控制器）'
-    }
-    
     print("\n可用的模板:\n")
-    for key, desc in templates.items():
-        print(f"  + {key:<20} - {desc}")
+    for key, template in TEMPLATES.items():
+        params = ', '.join(f"--{p} {v}" for p, v in template['params'].items())
+        print(f"  + {key:<20} - {template['description']} (默认: {params})")
+
+    print("\n兼容的旧模板名:\n")
+    for alias, (key, params) in TEMPLATE_ALIASES.items():
+        params = ', '.join(f"{p}={v}" for p, v in params.items())
+        print(f"  + {alias:<20} - {key} ({params})")
     print()
 
 
 def main():
     import argparse
-    
+
     parser = argparse.ArgumentParser(
         description='常用数字电路模板生成器',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -399,78 +568,60 @@ def main():
 示例:
   # 生成2选1多路选择器
   python create_templates.py mux2to1
-  
-  # 生成计数器
-  python create_templates.py counter
-  
+
+  # 生成32位计数器（项目名默认为 counter_width32）
+  python create_templates.py counter --width 32
+
+  # 生成16选1、每路8位的多路选择器
+  python create_templates.py mux --ways 16 --width 8
+
+  # 生成深度1024的移位寄存器、200状态的状态机
+  python create_templates.py shift_register --depth 1024
+  python create_templates.py fsm --states 200 --name big_fsm
+
   # 列出所有可用模板
   python create_templates.py list
         '''
     )
-    
+
     parser.add_argument('template', nargs='?', default='list',
                        help='模板类型或"list"显示所有模板')
-    
+    parser.add_argument('--name', help='项目名称（默认根据模板和参数生成）')
+    parser.add_argument('--output-dir', default='.', help='项目生成的父目录（默认: 当前目录）')
+    parser.add_argument('--width', type=int, help='数据位宽（counter / mux / demux）')
+    parser.add_argument('--depth', type=int, help='移位寄存器深度（shift_register）')
+    parser.add_argument('--ways', type=int, help='路数（mux / demux）')
+    parser.add_argument('--states', type=int, help='状态数（fsm）')
+
     args = parser.parse_args()
-    
+
     if args.template == 'list':
         show_templates()
         return
-    
-    # 模板定义
-    templates = {
-        'mux2to1': {
-            'name': 'mux2to1',
-            'inputs': ['i0', 'i1', 'sel'],
-            'outputs': ['y'],
-            'func': generate_mux2to1
-        },
-        'demux1to2': {
-            'name': 'demux1to2',
-            'inputs': ['i', 'sel'],
-            'outputs': ['o0', 'o1'],
-            'func': generate_demux1to2
-        },
-        'counter': {
-            'name': 'counter',
-            'inputs': ['clk', 'rst', 'enable'],
-            'outputs': ['count[3:0]'],
-            'func': generate_counter
-        },
-        'shift_register': {
-            'name': 'shift_register',
-            'inputs': ['clk', 'rst', 'shift_in'],
-            'outputs': ['data_out[3:0]'],
-            'func': generate_shift_register
-        },
-        'fsm': {
-            'name': 'fsm',
-            'inputs': ['clk', 'rst'],
-            'outputs': ['light[1:0]'],
-            'func': generate_fsm
-        }
-    }
-    
-    if args.template not in templates:
-        print(f"❌ 错误：未知的模板 '{args.template}'")
+
+    params = {key: getattr(args, key) for key in ('width', 'depth', 'ways', 'states')
+              if getattr(args, key) is not None}
+
+    try:
+        template_type, _ = resolve_template(args.template, params)
+        name = args.name or default_project_name(args.template, params)
+    except ValueError as e:
+        print(f"❌ 错误：{e}")
         print("\n运行 'python create_templates.py list' 查看所有可用模板")
         sys.exit(1)
-    
-    template = templates[args.template]
-    
-    print(f"\n生成模板: {template['name']}")
+
+    if not name.isidentifier():
+        print(f"❌ 错误：项目名称 '{name}' 无效（必须是有效的Verilog标识符）")
+        sys.exit(1)
+
+    print(f"\n生成模板: {name}")
     print(f"{'='*60}\n")
-    
-    create_template_project(
-        template['name'],
-        template['inputs'],
-        template['outputs'],
-        args.template
-    )
-    
+
+    create_template_project(name, args.template, params, base_dir=args.output_dir)
+
     print(f"\n✓ 完成！")
     print(f"\n后续步骤:")
-    print(f"  cd {template['name']}")
+    print(f"  cd {Path(args.output_dir) / name}")
     print(f"  make")
 
 
@@ -6,24 +6,101 @@ Verilog 快速项目生成工具
 """
 
 import os
+import re
 import sys
-import argparse
+import json
+import fnmatch
 from pathlib import Path
 
+from verilog_backends import BACKENDS, DEFAULT_BACKEND, get_backend, makefile_rules
+
+
+# 用户代码区域标记：重新生成时这些区域中的内容会被保留
+USER_REGION_RE = re.compile(
+    r'^([ \t]*// USER CODE BEGIN (\w+)[^\n]*\n)(.*?)(^[ \t]*// USER CODE END \2\b)',
+    re.S | re.M
+)
+
+# 每次生成都会变化、比较内容时需要忽略的行（如README中的生成时间）
+VOLATILE_LINE_PREFIXES = ('生成时间:',)
+
+# 按名称识别的时钟和复位输入（不区分大小写）：生成的 testbench 单独驱动它们，不参与输入向量扫描
+CLOCK_PATTERNS = ('clk*', 'clock*')
+RESET_PATTERNS = ('rst*', 'reset*')
+
+# 低电平有效的复位（如 rst_n、resetn、rst_b）
+ACTIVE_LOW_RESET_RE = re.compile(r'(_n|_b|_l|^rstn|^resetn)$', re.I)
+
+# 工作区共享IP库的默认目录名（位于项目父目录下），其中每个 <模块名>.v 由 iverilog -y 按需解析
+IP_LIB_DIR = 'ip_lib'
+
+# 文件写入状态的显示文字
+WRITE_STATUS_LABELS = {
+    'created': '生成',
+    'updated': '更新',
+    'unchanged': '未变化，跳过',
+    'preserved': '无用户代码标记，保留原文件',
+}
+
 
 class VerilogProjectGenerator:
     """Verilog项目生成器"""
     
-    def __init__(self, project_name, signals):
+    def __init__(self, project_name, signals, base_dir='.', verbose=True, regenerate=False,
+                 lib_dirs=None, use_lib=(), backend=DEFAULT_BACKEND):
         """
         初始化生成器
         Args:
             project_name: 项目名称
             signals: 信号列表，格式: "input1 input2 / output1 output2"
+            base_dir: 项目所在的父目录
+            verbose: 是否打印生成过程
+            regenerate: 重新生成模式：保留用户代码区域，内容未变化的文件不重写
+            lib_dirs: 共享IP库目录列表，默认使用 base_dir/ip_lib（存在时）
+            use_lib: 在生成的模块中实例化的共享库模块名
+            backend: Makefile 默认使用的仿真器后端（icarus / verilator / fake）
         """
         self.project_name = project_name
         self.parse_signals(signals)
-        self.project_dir = Path(project_name)
+        self.project_dir = Path(base_dir) / project_name
+        self.verbose = verbose
+        self.regenerate = regenerate
+        self.file_status = {}
+        # 模块参数 [{'name', 'value', 'local'}]，从已有RTL导入时填充
+        self.parameters = []
+        # 已有的RTL源文件；非空时不生成模块模板，Makefile 直接引用这些文件
+        self.rtl_sources = []
+        if lib_dirs is None:
+            default_lib = Path(base_dir) / IP_LIB_DIR
+            lib_dirs = [default_lib] if default_lib.is_dir() else []
+        self.lib_dirs = [Path(d) for d in lib_dirs]
+        self.use_lib = list(use_lib)
+        self.backend = get_backend(backend).name
+    
+    @classmethod
+    def from_module(cls, module, source_file, base_dir='.', verbose=True, regenerate=False,
+                    lib_dirs=None, backend=DEFAULT_BACKEND):
+        """
+        根据 verilog_ports 提取的模块信息创建生成器（导入已有RTL）
+        Args:
+            module: verilog_ports.scan_modules 产生的模块信息字典
+            source_file: 模块所在的Verilog文件
+        """
+        from verilog_ports import port_signal
+        
+        generator = cls(module['name'], '/', base_dir=base_dir, verbose=verbose,
+                        regenerate=regenerate, lib_dirs=lib_dirs, backend=backend)
+        # inout 端口在 testbench 中与输出一样声明为 wire
+        generator.inputs = [port_signal(p) for p in module['ports'] if p['direction'] == 'input']
+        generator.outputs = [port_signal(p) for p in module['ports'] if p['direction'] != 'input']
+        generator.parameters = [p for p in module['parameters'] if not p['local']]
+        generator.rtl_sources = [Path(source_file)]
+        return generator
+    
+    def _log(self, message):
+        """打印生成过程信息（批量模式下静默）"""
+        if self.verbose:
+            print(message)
         
     def parse_signals(self, signals):
         """
@@ -130,22 +207,107 @@ class VerilogProjectGenerator:
         # 必须是字母开头，后面只能是字母、数字或下划线
         return all(c.isalnum() or c == '_' for c in s) and (s[0].isalpha() or s[0] == '_')
     
+    def _write_file(self, path, content):
+        """
+        写入生成的文件，返回写入状态: created / updated / unchanged / preserved
+        - 内容与磁盘上一致时不写入，保持文件 mtime 不变
+        - 重新生成模式下，USER CODE 区域沿用磁盘上的内容；
+          旧文件没有任何区域标记时视为完全由用户维护，不做修改
+        - 写入时先写临时文件再原子重命名，避免留下写了一半的文件
+        """
+        path = Path(path)
+        status = 'created'
+        
+        if path.exists():
+            old_content = path.read_text(encoding='utf-8', errors='ignore')
+            
+            if self.regenerate:
+                if USER_REGION_RE.search(content):
+                    old_regions = self._extract_user_regions(old_content)
+                    if not old_regions:
+                        status = 'preserved'
+                    else:
+                        content = self._merge_user_regions(content, old_regions)
+                
+                if status != 'preserved' and \
+                        self._strip_volatile(old_content) == self._strip_volatile(content):
+                    status = 'unchanged'
+            elif old_content == content:
+                status = 'unchanged'
+            
+            if status == 'created':
+                status = 'updated'
+        
+        if status in ('created', 'updated'):
+            fd, tmp_name = self._create_temp(path)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    try:
+                        os.fchmod(f.fileno(), path.stat().st_mode & 0o7777)  # 更新时沿用原文件的权限
+                    except FileNotFoundError:
+                        pass
+                    f.write(content)
+                os.replace(tmp_name, path)
+            except BaseException:
+                os.unlink(tmp_name)
+                raise
+        
+        self.file_status[str(path)] = status
+        return status
+    
+    def _create_temp(self, path):
+        """
+        在 path 所在目录创建临时文件 .<文件名>.<随机串>.tmp，返回 (文件描述符, 路径)
+        以 0666 创建，由内核去掉 umask（与 open() 新建的文件权限一致；mkstemp 固定为 0600）
+        """
+        while True:
+            tmp_name = str(path.with_name(f'.{path.name}.{os.urandom(4).hex()}.tmp'))
+            try:
+                return os.open(tmp_name, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), tmp_name
+            except FileExistsError:
+                continue
+    
+    def _extract_user_regions(self, content):
+        """提取文件中的用户代码区域: {区域名: 内容}"""
+        return {m.group(2): m.group(3) for m in USER_REGION_RE.finditer(content)}
+    
+    def _merge_user_regions(self, content, regions):
+        """用已有的用户代码替换新生成内容中的同名区域"""
+        def replace(m):
+            body = regions.get(m.group(2), m.group(3))
+            return m.group(1) + body + m.group(4)
+        return USER_REGION_RE.sub(replace, content)
+    
+    def _strip_volatile(self, content):
+        """去掉每次生成都会变化的行，用于比较内容是否真正变化"""
+        return '\n'.join(line for line in content.splitlines()
+                         if not line.startswith(VOLATILE_LINE_PREFIXES))
+    
+    def _log_write(self, label, path, status):
+        """打印文件写入结果"""
+        if status == 'created':
+            self._log(f"✓ {label}: {path}")
+        else:
+            self._log(f"✓ {label}: {path} ({WRITE_STATUS_LABELS[status]})")
+    
     def create_project_structure(self):
         """创建项目目录结构"""
-        self.project_dir.mkdir(exist_ok=True)
+        self.project_dir.mkdir(parents=True, exist_ok=True)
         (self.project_dir / 'sim').mkdir(exist_ok=True)
         (self.project_dir / 'rtl').mkdir(exist_ok=True)
-        print(f"✓ 创建项目目录: {self.project_dir}")
+        self._log(f"✓ 创建项目目录: {self.project_dir}")
     
     def generate_module(self):
         """生成RTL模块文件"""
+        if self.rtl_sources:
+            self._log(f"✓ 使用已有RTL文件: {', '.join(str(f) for f in self.rtl_sources)}")
+            return None
+        
         module_content = self._generate_module_code()
         module_file = self.project_dir / 'rtl' / f'{self.project_name}.v'
         
-        with open(module_file, 'w', encoding='utf-8') as f:
-            f.write(module_content)
-        
-        print(f"✓ 生成模块文件: {module_file}")
+        status = self._write_file(module_file, module_content)
+        self._log_write("生成模块文件", module_file, status)
         return module_file
     
     def _generate_module_code(self):
@@ -180,27 +342,65 @@ module {self.project_name} (
     // ============================================
     // 内部信号声明 (需要时添加)
     // ============================================
+    // USER CODE BEGIN declarations
     // wire/reg 声明在此
+    // USER CODE END declarations
 
     // ============================================
     // 组合逻辑/时序逻辑实现
     // ============================================
-    // 在此添加你的逻辑实现
+    // USER CODE BEGIN logic
+{self._generate_library_instances()}    // 在此添加你的逻辑实现
     // 例如: assign output1 = input1 & input2;
+    // USER CODE END logic
 
 endmodule
 '''
         return code
     
+    def _find_library_module(self, module_name):
+        """在共享IP库中查找模块（与 iverilog -y -Y .v 相同的规则：<模块名>.v）"""
+        from verilog_ports import scan_modules
+        
+        for lib_dir in self.lib_dirs:
+            lib_file = lib_dir / f'{module_name}.v'
+            if lib_file.is_file():
+                for module in scan_modules(lib_file):
+                    if module['name'] == module_name:
+                        return module, lib_file
+        searched = ', '.join(str(d) for d in self.lib_dirs) or '（未指定共享库目录）'
+        raise ValueError(f"共享库中找不到模块 '{module_name}': {searched}")
+    
+    def _generate_library_instances(self):
+        """生成共享库模块的实例化模板（端口连接留空，由用户填写）"""
+        blocks = []
+        for module_name in self.use_lib:
+            module, lib_file = self._find_library_module(module_name)
+            params = [p for p in module['parameters'] if not p['local']]
+            param_str = ''
+            if params:
+                param_str = ' #(' + ', '.join(f".{p['name']}({p['value']})" for p in params) + ')'
+            
+            lib_path = os.path.relpath(lib_file.resolve(), self.project_dir.resolve())
+            lines = [f"    // 共享库模块 {module_name}（{lib_path}），编译时由 iverilog -y 解析"]
+            lines.append(f"    {module_name}{param_str} u_{module_name} (")
+            ports = module['ports']
+            for i, port in enumerate(ports):
+                name = port['name']
+                sep = ' ' if name.startswith('\\') else ''
+                comma = ',' if i < len(ports) - 1 else ''
+                lines.append(f"        .{name}{sep}(){comma}  // {port['direction']}")
+            lines.append("    );")
+            blocks.append('\n'.join(lines) + '\n\n')
+        return ''.join(blocks)
+    
     def generate_testbench(self):
         """生成Testbench文件"""
         tb_content = self._generate_testbench_code()
         tb_file = self.project_dir / 'sim' / f'{self.project_name}_tb.v'
         
-        with open(tb_file, 'w', encoding='utf-8') as f:
-            f.write(tb_content)
-        
-        print(f"✓ 生成测试文件: {tb_file}")
+        status = self._write_file(tb_file, tb_content)
+        self._log_write("生成测试文件", tb_file, status)
         return tb_file
     
     def _get_signal_name(self, signal_def):
@@ -210,15 +410,22 @@ endmodule
         """
         parts = signal_def.split()
         # 最后一个token是信号名
+        if parts and parts[-1].startswith('\\'):
+            return parts[-1] + ' '  # 转义标识符需要以空白结尾
         return parts[-1] if parts else signal_def
     
     def _generate_testbench_code(self):
         """生成Testbench代码"""
         # 生成信号声明
         signal_decl = []
+        # 与被测模块参数同名的 localparam，使参数化位宽在 testbench 中同样可用
+        signal_decl.extend([f"    localparam {p['name']} = {p['value']};" for p in self.parameters])
         signal_decl.extend([f"    reg {sig};" for sig in self.inputs])
         signal_decl.extend([f"    wire {sig};" for sig in self.outputs])
         signal_decl.append("    integer i;  // 循环计数器")
+        signal_decl.append("    integer shard, nshards;  // 分片参数 (+shard=i +nshards=k)")
+        signal_decl.append("    integer sweep_count;     // 扫描向量总数 (+sweep=N)")
+        signal_decl.append("    reg [8*256-1:0] dump_file;  // 波形文件名 (+dumpfile=xxx.vcd)")
         
         # 生成module实例化 - 使用信号名称
         port_connections = []
@@ -231,6 +438,12 @@ endmodule
         
         port_conn_str = ',\n'.join(port_connections)
         
+        if self.parameters:
+            param_overrides = ', '.join(f".{p['name']}({p['name']})" for p in self.parameters)
+            instance_params = f" #({param_overrides})"
+        else:
+            instance_params = ""
+        
         # 生成监控显示 - 使用信号名称
         input_names = [self._get_signal_name(sig) for sig in self.inputs]
         output_names = [self._get_signal_name(sig) for sig in self.outputs]
@@ -249,7 +462,7 @@ module {self.project_name}_tb;
     // ============================================
     // Module实例化
     // ============================================
-    {self.project_name} uut (
+    {self.project_name}{instance_params} uut (
 {port_conn_str}
     );
 
@@ -260,8 +473,14 @@ module {self.project_name}_tb;
         // 初始化所有输入信号
 {self._generate_initialization()}
         
+        // 读取分片参数：多个 vvp 进程并行运行时，每个进程只负责测试空间的一片
+        if (!$value$plusargs("shard=%d", shard)) shard = 0;
+        if (!$value$plusargs("nshards=%d", nshards)) nshards = 1;
+        if (!$value$plusargs("sweep=%d", sweep_count)) sweep_count = {self._sweep_count()};
+        if (!$value$plusargs("dumpfile=%s", dump_file)) dump_file = "{self.project_name}.vcd";
+        
         // 生成波形文件用于gtkwave查看
-        $dumpfile("{self.project_name}.vcd");
+        $dumpfile(dump_file);
         $dumpvars(0, {self.project_name}_tb);
         
         // 监控器：显示信号变化
@@ -270,7 +489,9 @@ module {self.project_name}_tb;
         // ============================================
         // 测试用例
         // ============================================
+        // USER CODE BEGIN testcases
 {self._generate_test_cases()}
+        // USER CODE END testcases
         
         #100 $finish;  // 仿真结束
     end
@@ -279,58 +500,195 @@ endmodule
 '''
         return code
     
+    def _classify_inputs(self):
+        """
+        按名称把输入分为时钟、复位和数据输入
+        Returns:
+            (时钟信号名列表, 复位信号名列表, 数据输入的信号定义列表)
+        """
+        clocks, resets, data = [], [], []
+        for sig in self.inputs:
+            sig_name = self._get_signal_name(sig)
+            lower = sig_name.strip().lower()
+            if any(fnmatch.fnmatchcase(lower, p) for p in CLOCK_PATTERNS):
+                clocks.append(sig_name)
+            elif any(fnmatch.fnmatchcase(lower, p) for p in RESET_PATTERNS):
+                resets.append(sig_name)
+            else:
+                data.append(sig)
+        return clocks, resets, data
+    
+    def _reset_value(self, sig_name, asserted):
+        """复位信号有效（asserted）或释放时的值"""
+        active_low = bool(ACTIVE_LOW_RESET_RE.search(sig_name.strip()))
+        return "1'b0" if asserted == active_low else "1'b1"
+    
+    def _clock_cycle(self, clocks, indent):
+        """所有时钟前进一个周期（10ns）的语句"""
+        rise = ' '.join(f"{c} = 1'b1;" for c in clocks)
+        fall = ' '.join(f"{c} = 1'b0;" for c in clocks)
+        return [f"{indent}#5 {rise}", f"{indent}#5 {fall}"]
+    
     def _generate_initialization(self):
-        """生成初始化代码"""
+        """生成初始化代码（复位输入初始为有效）"""
+        _, resets, _ = self._classify_inputs()
         init_lines = []
         for sig in self.inputs:
             sig_name = self._get_signal_name(sig)
-            init_lines.append(f"        {sig_name} = 1'b0;")
+            if sig_name in resets:
+                init_lines.append(f"        {sig_name} = {self._reset_value(sig_name, True)};  // 复位有效")
+            else:
+                init_lines.append(f"        {sig_name} = 1'b0;")
         return '\n'.join(init_lines) if init_lines else "        // 初始化代码（按需添加）"
     
     def _generate_test_cases(self):
-        """生成测试用例模板"""
+        """生成测试用例模板（时钟和复位单独驱动，不作为数据位参与扫描）"""
+        clocks, resets, data = self._classify_inputs()
         test_cases = []
         test_cases.append("        // 测试用例1: 基本功能测试")
-        test_cases.append("        #10;  // 等待10ns")
+        if resets:
+            # 复位保持两个时钟周期后释放
+            if clocks:
+                test_cases.append("        repeat (2) begin")
+                test_cases.extend(self._clock_cycle(clocks, "            "))
+                test_cases.append("        end")
+            else:
+                test_cases.append("        #10;  // 等待10ns")
+            for sig_name in resets:
+                test_cases.append(f"        {sig_name} = {self._reset_value(sig_name, False)};  // 释放复位")
+        else:
+            test_cases.append("        #10;  // 等待10ns")
         
-        # 最多修改前2个输入信号
-        for sig in self.inputs[:min(2, len(self.inputs))]:
+        # 最多修改前2个数据输入
+        for sig in data[:2]:
             sig_name = self._get_signal_name(sig)
             test_cases.append(f"        {sig_name} = ~{sig_name};  // 翻转信号")
         
-        test_cases.append("        #10;  // 观察输出")
+        if clocks:
+            test_cases.extend(self._clock_cycle(clocks, "        "))
+        else:
+            test_cases.append("        #10;  // 观察输出")
         test_cases.append("")
+        
+        # 分片扫描：第 shard 片只运行 i % nshards == shard 的输入向量；有时钟时每个向量一个时钟周期
+        if data:
+            data_names = [self._get_signal_name(sig) for sig in data]
+            test_cases.append("        // 测试用例2: 数据输入向量扫描（按 +shard/+nshards 分片，时钟和复位不参与扫描）")
+            test_cases.append("        for (i = shard; i < sweep_count; i = i + nshards) begin")
+            test_cases.append(f"            {{{', '.join(data_names)}}} = i;")
+            if clocks:
+                test_cases.extend(self._clock_cycle(clocks, "            "))
+            else:
+                test_cases.append("            #10;")
+            test_cases.append("        end")
+            test_cases.append("")
+        
         test_cases.append("        // 添加更多测试用例...")
         
         return '\n'.join(test_cases) if test_cases else "        // 添加测试用例"
     
+    def _signal_width(self, signal_def):
+        """
+        计算信号位宽，例如: "[7:0] data" -> 8, "data" -> 1
+        位宽表达式无法计算（如参数化位宽）时返回 None
+        """
+        for part in signal_def.split()[:-1]:
+            if part.startswith('[') and part.endswith(']'):
+                bounds = part[1:-1].split(':')
+                try:
+                    values = [int(b) for b in bounds]
+                except ValueError:
+                    return None
+                return abs(values[0] - values[-1]) + 1
+        return 1
+    
+    def _sweep_count(self, max_bits=8):
+        """
+        默认扫描向量数：全部数据输入位宽的穷举空间（不含时钟和复位），最多 2**max_bits 个
+        更大的扫描可在仿真时通过 +sweep=N 指定，并用分片并行运行
+        """
+        total_bits = 0
+        for sig in self._classify_inputs()[2]:
+            width = self._signal_width(sig)
+            total_bits += width if width is not None else max_bits
+        return 2 ** min(total_bits, max_bits)
+    
     def generate_makefile(self):
         """生成Makefile"""
-        makefile_content = f'''# Verilog Simulation Makefile
+        makefile_content = self._generate_makefile_code()
+        makefile_file = self.project_dir / 'Makefile'
+        
+        status = self._write_file(makefile_file, makefile_content)
+        self._log_write("生成Makefile", makefile_file, status)
+        return makefile_file
+    
+    def _verilog_files(self):
+        """Makefile 中的源文件列表（相对项目目录）"""
+        if not self.rtl_sources:
+            rtl_files = [f'rtl/{self.project_name}.v']
+        else:
+            rtl_files = [os.path.relpath(Path(f).resolve(), self.project_dir.resolve())
+                         for f in self.rtl_sources]
+        return rtl_files + [f'sim/{self.project_name}_tb.v']
+    
+    def _lib_dirs_relative(self):
+        """共享库目录（相对项目目录）"""
+        return [os.path.relpath(Path(d).resolve(), self.project_dir.resolve()) for d in self.lib_dirs]
+    
+    def _generate_makefile_code(self):
+        """生成Makefile内容"""
+        return f'''# Verilog Simulation Makefile
 # Using Icarus Verilog and VVP
 
-VERILOG_FILES = rtl/{self.project_name}.v sim/{self.project_name}_tb.v
+VERILOG_FILES = {' '.join(self._verilog_files())}
+# 共享IP库目录：找不到定义的模块由 iverilog 在这些目录中按 <模块名>.v 搜索
+LIB_DIRS = {' '.join(self._lib_dirs_relative())}
 MODULE_NAME = {self.project_name}_tb
 OUTPUT_NAME = {self.project_name}
+# 由 manage_verilog_projects.py deps 根据模块依赖生成的文件列表（存在时覆盖上面的 VERILOG_FILES）
+-include sources.mk
+# 仿真器后端: {' / '.join(BACKENDS)}，可以在运行时覆盖，例如 make simulate SIMULATOR=verilator
+SIMULATOR ?= {self.backend}
+# 额外的编译选项，例如 include 目录: make compile IVERILOG_FLAGS="-Irtl"
+IVERILOG_FLAGS ?=
+# 仿真参数，例如分片运行: make simulate SIM_ARGS="+shard=0 +nshards=4"
+SIM_ARGS ?=
+# 构建目录：.vvp 和波形写入这里，可以放在本地临时存储，例如 make BUILD_DIR=/dev/shm/vbuild/{self.project_name}
+BUILD_DIR ?= .
+# 产物先写入临时文件（<名称>.<进程号>.tmp）再改名，同时运行的其他进程不会读到写了一半的文件
+VCD = $(BUILD_DIR)/$(OUTPUT_NAME).vcd
+# 波形超过 VIEW_THRESHOLD 时 make view 先抽取精简的查看文件再打开，VIEW_ARGS 选择作用域、时间窗口和分辨率，
+# 例如 make view VIEW_ARGS="--scope {self.project_name}_tb.uut --start 10us --end 20us --resolution 10ns"
+VIEW_THRESHOLD ?= 100M
+VIEW_ARGS ?=
+VIEW_VCD = $(BUILD_DIR)/$(OUTPUT_NAME)_view.vcd
+# 波形抽取工具：设置了环境变量 VERILOG_TOOLS（工具目录）时使用其中的 verilog_wave.py，否则在 PATH 中查找
+WAVE_TOOL ?= $(if $(VERILOG_TOOLS),python3 $(VERILOG_TOOLS)/verilog_wave.py,verilog_wave.py)
 
+{makefile_rules()}
 .PHONY: all compile simulate view clean
 
 all: compile simulate view
 
 compile:
-\tiverilog -o $(OUTPUT_NAME).vvp $(VERILOG_FILES)
-\t@echo "[OK] Compilation done: $(OUTPUT_NAME).vvp"
+\t@mkdir -p $(BUILD_DIR)
+\t$(COMPILE_CMD) && mv -f $(COMPILE_OUT) $(IMAGE) || {{ rm -f $(COMPILE_OUT); exit 1; }}
+\t@echo "[OK] Compilation done: $(IMAGE)"
 
+# SIM_ARGS 在前：其中的 +dumpfile 优先于默认的波形文件
 simulate: compile
-\tvvp $(OUTPUT_NAME).vvp
-\t@echo "[OK] Simulation done: $(OUTPUT_NAME).vcd"
+\t$(RUN_CMD) $(SIM_ARGS) +dumpfile=$(VCD).$$$$.tmp; status=$$?; \\
+\t\t[ ! -f $(VCD).$$$$.tmp ] || mv -f $(VCD).$$$$.tmp $(VCD); exit $$status
+\t@echo "[OK] Simulation done: $(VCD)"
 
+# 抽取失败时删除查看文件，打开完整的波形
 view: simulate
-\tgtkwave $(OUTPUT_NAME).vcd &
+\t@$(WAVE_TOOL) $(VCD) -o $(VIEW_VCD) --min-size $(VIEW_THRESHOLD) $(VIEW_ARGS) || rm -f $(VIEW_VCD)
+\t@if [ -f $(VIEW_VCD) ]; then gtkwave $(VIEW_VCD) & else gtkwave $(VCD) & fi
 \t@echo "[OK] Waveform viewer opened"
 
 clean:
-\trm -f $(OUTPUT_NAME).vvp $(OUTPUT_NAME).vcd
+\trm -rf $(IMAGE) $(OBJ_DIR) $(VCD) $(VIEW_VCD) $(BUILD_DIR)/$(OUTPUT_NAME)_shard*.vcd $(BUILD_DIR)/$(OUTPUT_NAME)*.[0-9]*.tmp $(OUTPUT_NAME)*.log
 \t@echo "[OK] Clean done"
 
 help:
@@ -341,17 +699,19 @@ help:
 \t@echo "  make view    - View waveform"
 \t@echo "  make clean   - Clean generated files"
 '''
-        makefile_file = self.project_dir / 'Makefile'
-        
-        with open(makefile_file, 'w', encoding='utf-8') as f:
-            f.write(makefile_content)
-        
-        print(f"✓ 生成Makefile: {makefile_file}")
-        return makefile_file
     
     def generate_readme(self):
         """生成README文档"""
-        readme_content = f'''# {self.project_name} Verilog项目
+        readme_content = self._generate_readme_code()
+        readme_file = self.project_dir / 'README.md'
+        
+        status = self._write_file(readme_file, readme_content)
+        self._log_write("生成README", readme_file, status)
+        return readme_file
+    
+    def _generate_readme_code(self):
+        """生成README内容"""
+        return f'''# {self.project_name} Verilog项目
 
 ## 项目结构
 
@@ -364,7 +724,7 @@ help:
 ├── Makefile                         # 仿真流程自动化
 └── README.md                        # 本文件
 ```
-
+{self._format_rtl_sources()}{self._format_lib_dirs()}
 ## 模块接口
 
 ### 输入信号 ({len(self.inputs)} 个)
@@ -443,13 +803,21 @@ input_signal = value;   // 改变输入
 ---
 生成时间: {self.get_timestamp()}
 '''
-        readme_file = self.project_dir / 'README.md'
-        
-        with open(readme_file, 'w', encoding='utf-8') as f:
-            f.write(readme_content)
-        
-        print(f"✓ 生成README: {readme_file}")
-        return readme_file
+    
+    def _format_rtl_sources(self):
+        """导入已有RTL时，README中说明RTL来源"""
+        if not self.rtl_sources:
+            return ""
+        files = '\n'.join(f"- `{f}`" for f in self._verilog_files()[:-1])
+        return f"\n> 本项目从已有RTL导入，模块定义位于:\n{files}\n"
+    
+    def _format_lib_dirs(self):
+        """使用共享IP库时，README中说明库目录"""
+        if not self.lib_dirs:
+            return ""
+        dirs = '\n'.join(f"- `{d}`" for d in self._lib_dirs_relative())
+        return (f"\n> 共享IP库目录（Makefile 中的 LIB_DIRS），库模块无需复制到 rtl/，"
+                f"编译时由 iverilog -y 按需解析:\n{dirs}\n")
     
     def _format_signal_list(self, signals):
         """格式化信号列表"""
@@ -461,7 +829,19 @@ input_signal = value;   // 改变输入
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     def generate_all(self):
-        """生成所有文件"""
+        """
+        生成所有文件
+        Returns:
+            {文件路径: 写入状态} 字典，状态见 _write_file
+        """
+        if not self.verbose:
+            self.create_project_structure()
+            self.generate_module()
+            self.generate_testbench()
+            self.generate_makefile()
+            self.generate_readme()
+            return self.file_status
+        
         print(f"\n{'='*60}")
         print(f"开始生成 Verilog 项目: {self.project_name}")
         print(f"{'='*60}\n")
@@ -480,9 +860,143 @@ input_signal = value;   // 改变输入
         print(f"  2. 编辑 rtl/{self.project_name}.v 添加你的逻辑")
         print(f"  3. 编辑 sim/{self.project_name}_tb.v 添加测试向量")
         print(f"  4. 运行 'make' 进行仿真\n")
+        return self.file_status
+
+
+def load_manifest(manifest_path):
+    """
+    读取批量生成清单，返回 [(name, signals), ...]
+    支持两种格式:
+      - JSON: [{"name": "and_gate", "signals": "a, b / y"}, ...] 或 {"and_gate": "a, b / y", ...}
+      - CSV:  每行 name,signals（可带 name,signals 表头）
+    """
+    import csv
+    
+    manifest_path = Path(manifest_path)
+    
+    if manifest_path.suffix.lower() == '.json':
+        with open(manifest_path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            return [(name, signals or '/') for name, signals in data.items()]
+        return [(entry['name'], entry.get('signals') or '/') for entry in data]
+    
+    entries = []
+    with open(manifest_path, encoding='utf-8', newline='') as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip() or row[0].strip().startswith('#'):
+                continue
+            name = row[0].strip()
+            if name == 'name':
+                continue  # 表头
+            # 信号定义中可能含逗号，未加引号时会被拆成多列，这里重新拼接
+            signals = ','.join(row[1:]).strip() or '/'
+            entries.append((name, signals))
+    return entries
+
+
+def generate_batch(entries, base_dir='.', if_exists='skip', jobs=None, factory=None, lib_dirs=None,
+                   backend=DEFAULT_BACKEND):
+    """
+    在同一进程内批量生成项目，各项目的文件写入并行进行
+    Args:
+        entries: [(name, signals), ...]
+        base_dir: 项目所在的父目录
+        if_exists: 项目已存在时的策略: 'skip' 跳过 / 'overwrite' 覆盖 /
+                   'update' 重新生成（保留用户代码，只写入内容有变化的文件）
+        jobs: 并行写入线程数，默认由 ThreadPoolExecutor 决定
+        factory: 生成器构造函数 factory(name, spec, base_dir=, verbose=, regenerate=, lib_dirs=, backend=)，
+                 默认为 VerilogProjectGenerator（spec 为信号字符串）
+        lib_dirs: 共享IP库目录列表，默认使用 base_dir/ip_lib（存在时）
+        backend: Makefile 默认使用的仿真器后端
+    Returns:
+        汇总字典: {'created': [...], 'updated': [...], 'unchanged': [...],
+                   'skipped': [...], 'failed': [(name, 原因), ...]}
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    summary = {'created': [], 'updated': [], 'unchanged': [], 'skipped': [], 'failed': []}
+    factory = factory or VerilogProjectGenerator
+    
+    tasks = []
+    seen = set()
+    for name, signals in entries:
+        if not name.isidentifier():
+            summary['failed'].append((name, '无效的Verilog标识符'))
+            continue
+        if name in seen:
+            summary['failed'].append((name, '清单中重复'))
+            continue
+        seen.add(name)
+        
+        exists = (Path(base_dir) / name).exists()
+        if exists and if_exists == 'skip':
+            summary['skipped'].append(name)
+            continue
+        tasks.append((name, signals, exists))
+    
+    def generate_one(task):
+        name, signals, exists = task
+        generator = factory(name, signals, base_dir=base_dir, verbose=False,
+                            regenerate=(if_exists == 'update'), lib_dirs=lib_dirs, backend=backend)
+        file_status = generator.generate_all()
+        if not exists:
+            return 'created'
+        if any(status in ('created', 'updated') for status in file_status.values()):
+            return 'updated'
+        return 'unchanged'
+    
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [(task[0], pool.submit(generate_one, task)) for task in tasks]
+        for name, future in futures:
+            try:
+                summary[future.result()].append(name)
+            except Exception as e:
+                summary['failed'].append((name, str(e)))
+    
+    return summary
+
+
+def import_verilog(verilog_file, module_names=None, base_dir='.', if_exists='skip', jobs=None,
+                   lib_dirs=None, backend=DEFAULT_BACKEND):
+    """
+    从已有Verilog文件导入：流式扫描文件中的所有模块，为每个模块生成项目、Testbench和Makefile
+    Args:
+        verilog_file: Verilog源文件（可以是大型门级网表）
+        module_names: 只导入这些模块，默认导入全部
+    Returns:
+        与 generate_batch 相同的汇总字典
+    """
+    from verilog_ports import scan_modules
+    
+    entries = [(module['name'], module) for module in scan_modules(verilog_file)
+               if not module_names or module['name'] in module_names]
+    
+    def factory(name, module, **kwargs):
+        return VerilogProjectGenerator.from_module(module, verilog_file, **kwargs)
+    
+    return generate_batch(entries, base_dir=base_dir, if_exists=if_exists,
+                          jobs=jobs, factory=factory, lib_dirs=lib_dirs, backend=backend)
+
+
+def print_batch_summary(summary):
+    """打印批量生成汇总"""
+    print(f"\n{'='*60}")
+    print("批量生成汇总")
+    print(f"{'='*60}")
+    print(f"  新建: {len(summary['created'])}")
+    print(f"  更新: {len(summary['updated'])}")
+    print(f"  未变化: {len(summary['unchanged'])}")
+    print(f"  跳过: {len(summary['skipped'])}")
+    print(f"  失败: {len(summary['failed'])}")
+    for name, reason in summary['failed']:
+        print(f"    ✗ {name}: {reason}")
+    print(f"{'='*60}\n")
 
 
 def main():
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description='Verilog项目快速生成工具',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -496,33 +1010,105 @@ def main():
   
   # 创建只有输入的模块（如监视器）
   python create_verilog_project.py monitor "sig1 sig2 sig3 /"
+  
+  # 按清单批量生成（JSON 或 CSV），已存在的项目跳过
+  python create_verilog_project.py --manifest modules.csv --if-exists skip
+  
+  # 从已有RTL（包括大型网表）导入，为每个模块生成 testbench 和 Makefile
+  python create_verilog_project.py --from-verilog netlist.v --output-dir tb_projects
+  
+  # 重新生成：保留用户代码区域，只写入内容有变化的文件
+  python create_verilog_project.py my_module "clk rst / out" --if-exists update
+  
+  # 引用共享IP库（默认 ./ip_lib）中的模块，而不是复制到 rtl/
+  python create_verilog_project.py my_top "clk rst din[7:0] / dout[7:0]" --use-lib sync_fifo
+  
+  # 大型设计默认使用 Verilator 仿真（也可以在运行时用 make SIMULATOR=... 切换）
+  python create_verilog_project.py big_core "clk rst_n / [31:0] pc" --backend verilator
         '''
     )
     
-    parser.add_argument('project_name', help='项目名称 (同时是Module名称)')
+    parser.add_argument('project_name', nargs='?', help='项目名称 (同时是Module名称)')
     parser.add_argument(
         'signals',
         help='信号定义: "input1 input2 ... / output1 output2 ..." (用 / 分隔输入和输出)',
         nargs='?',
         default='/'
     )
+    parser.add_argument('--manifest', help='批量生成清单文件 (.json 或 .csv，每项包含 name 和 signals)')
+    parser.add_argument('--from-verilog', help='从已有Verilog文件导入模块端口并生成项目')
+    parser.add_argument('--module', action='append',
+                        help='与 --from-verilog 一起使用：只导入指定模块（可多次指定）')
+    parser.add_argument('--if-exists', choices=['ask', 'skip', 'overwrite', 'update'],
+                        help='项目已存在时的处理策略（单项目默认 ask，批量模式默认 skip）')
+    parser.add_argument('--output-dir', default='.', help='项目生成的父目录（默认: 当前目录）')
+    parser.add_argument('--jobs', type=int, default=None, help='批量模式下的并行写入线程数')
+    parser.add_argument('--summary', help='批量模式下将汇总结果写入该 JSON 文件')
+    parser.add_argument('--lib-dir', action='append',
+                        help=f'共享IP库目录（可多次指定，默认: <output-dir>/{IP_LIB_DIR}，存在时）')
+    parser.add_argument('--use-lib', action='append', default=[],
+                        help='在生成的模块中实例化共享库模块（可多次指定）')
+    parser.add_argument('--backend', choices=list(BACKENDS), default=DEFAULT_BACKEND,
+                        help=f'Makefile 默认使用的仿真器后端（默认: {DEFAULT_BACKEND}）')
     
     args = parser.parse_args()
     
+    if args.manifest or args.from_verilog:
+        if_exists = args.if_exists or 'skip'
+        if if_exists == 'ask':
+            print("✗ 错误: 批量模式不支持交互式询问，请使用 --if-exists skip / overwrite / update")
+            sys.exit(1)
+        
+        if args.from_verilog:
+            if not Path(args.from_verilog).exists():
+                print(f"✗ 错误: 文件不存在: {args.from_verilog}")
+                sys.exit(1)
+            summary = import_verilog(args.from_verilog, module_names=args.module,
+                                     base_dir=args.output_dir, if_exists=if_exists, jobs=args.jobs,
+                                     lib_dirs=args.lib_dir, backend=args.backend)
+        else:
+            entries = load_manifest(args.manifest)
+            summary = generate_batch(entries, base_dir=args.output_dir,
+                                     if_exists=if_exists, jobs=args.jobs, lib_dirs=args.lib_dir,
+                                     backend=args.backend)
+        print_batch_summary(summary)
+        
+        if args.summary:
+            with open(args.summary, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2, ensure_ascii=False)
+        
+        sys.exit(1 if summary['failed'] else 0)
+    
+    if not args.project_name:
+        parser.error('需要指定项目名称、--manifest 清单或 --from-verilog 源文件')
+    
     # 验证项目名称
     if not args.project_name.isidentifier():
         print(f"✗ 错误: 项目名称 '{args.project_name}' 无效（必须是有效的Verilog标识符）")
         sys.exit(1)
     
     # 检查项目是否已存在
-    if Path(args.project_name).exists():
-        response = input(f"项目 '{args.project_name}' 已存在，是否覆盖? (y/n): ").strip().lower()
-        if response != 'y':
+    if (Path(args.output_dir) / args.project_name).exists():
+        if_exists = args.if_exists or 'ask'
+        if if_exists == 'ask':
+            response = input(f"项目 '{args.project_name}' 已存在，是否覆盖? (y/n): ").strip().lower()
+            if_exists = 'overwrite' if response == 'y' else 'skip'
+        if if_exists == 'skip':
             print("操作已取消")
             sys.exit(0)
     
     # 创建项目
-    generator = VerilogProjectGenerator(args.project_name, args.signals)
+    generator = VerilogProjectGenerator(args.project_name, args.signals, base_dir=args.output_dir,
+                                        regenerate=(args.if_exists == 'update'),
+                                        lib_dirs=args.lib_dir, use_lib=args.use_lib, backend=args.backend)
+    # 在写入任何文件之前检查引用的共享库模块
+    try:
+        for module_name in args.use_lib:
+            generator._find_library_module(module_name)
+    except ValueError as e:
+        print(f"✗ 错误: {e}")
+        sys.exit(1)
+    
     generator.generate_all()
 
 
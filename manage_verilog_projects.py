@@ -7,32 +7,94 @@ Verilog 项目管理工具
 
 import os
 import sys
-import subprocess
-import argparse
+import time
+import threading
+import contextlib
 from pathlib import Path
 import json
 from datetime import datetime
 
 
+# 构建状态文件（相对项目目录），记录各 testbench 上次成功编译/仿真时的依赖指纹
+BUILD_STATE = Path('.vbuild') / 'state.json'
+
+# 变化时需要重跑整个项目的构建配置文件
+BUILD_CONFIG_FILES = ('Makefile', 'sources.mk')
+
+# 依赖分析相关的 HDL 源文件后缀
+HDL_SUFFIXES = ('.v', '.vh', '.sv', '.svh')
+
+# 仿真吞吐量基线（工作区根目录，可以提交到版本库）
+PERF_BASELINE = Path('perf_baseline.json')
+
+# compile / simulate 日志文件名后缀（项目目录下的 <输出名><后缀>）
+LOG_SUFFIXES = {'compile': '_compile.log', 'simulate': '_sim.log'}
+
+
 class VerilogProjectManager:
     """Verilog项目管理器"""
     
-    def __init__(self):
-        self.projects = {}
-        self.load_projects()
+    def __init__(self, root='.'):
+        """
+        Args:
+            root: 工作区目录（其中的项目在首次访问 projects 时才扫描）
+        """
+        self.root = Path(root)
+        self._projects = None
+        self.pool = None      # 常驻线程池（守护进程中使用）
+        self.selection = {}   # --changed-since 选出的目标 {项目名: 目标列表}
+        self._history = None
+        self._history_lock = threading.Lock()
+        self.result_stream = None  # --format jsonl：每完成一个目标的一个阶段就写入一条 JSON 记录
+        self.build_root = None     # --build-dir：各项目的 .vvp 和波形写入 <build_root>/<项目名>
+        self.copy_failed_waves = False  # 使用独立构建目录时，把失败运行的波形复制回项目目录
+        self.lock_policy = 'wait'  # 项目被其他管理器进程锁定时：wait 等待 / skip 跳过
+        self.lock_timeout = None   # wait 策略最多等待的秒数
+        self.backend_name = None   # --backend：本次运行使用的仿真器后端，默认使用各项目 Makefile 中的 SIMULATOR
+        self.limits = None         # 仿真进程的资源限制 {'memory': 字节, 'cpu_time': 秒}
+        self.cores = None          # --pin-cpus：并行任务绑定专用核心组（verilog_limits.CorePool）
+        self._emit_lock = threading.Lock()
+    
+    @property
+    def projects(self):
+        """{项目名: 项目信息}（首次访问时扫描工作区）"""
+        if self._projects is None:
+            self.load_projects()
+        return self._projects
+    
+    @projects.setter
+    def projects(self, projects):
+        """替换项目集合；设为 None 时下次访问重新扫描"""
+        self._projects = projects
     
     def load_projects(self):
-        """扫描当前目录下的所有 Verilog 项目"""
-        current_dir = Path('.')
-        
-        for item in current_dir.iterdir():
+        """扫描工作区目录下的所有 Verilog 项目"""
+        projects = {}
+        for item in self.root.iterdir():
             if item.is_dir() and (item / 'Makefile').exists():
                 if (item / 'rtl').exists() and (item / 'sim').exists():
-                    self.projects[item.name] = {
-                        'path': item,
-                        'has_makefile': True,
-                        'verilog_files': list(item.glob('**/*.v'))
-                    }
+                    projects[item.name] = self._project_info(item)
+        self._projects = projects
+        return projects
+    
+    def _project_info(self, item):
+        return {
+            'path': item,
+            'has_makefile': True,
+            'verilog_files': list(item.glob('**/*.v'))
+        }
+    
+    def reload_project(self, name):
+        """
+        重新读取项目的文件列表，并丢弃缓存的依赖图、编译目标和构建状态
+        工作区中新建的项目加入项目集合，已删除的项目移除
+        """
+        info = self.projects.get(name)
+        path = info['path'] if info else self.root / name
+        if (path / 'Makefile').exists() and (path / 'rtl').exists() and (path / 'sim').exists():
+            self.projects[name] = self._project_info(path)
+        else:
+            self.projects.pop(name, None)
     
     def list_projects(self):
         """列出所有项目"""
@@ -54,129 +116,1356 @@ class VerilogProjectManager:
         
         print("="*70 + "\n")
     
-    def compile_all(self):
-        """编译所有项目"""
+    def _read_makefile_value(self, info, var):
+        """读取 Makefile 中变量的原始值，没有定义时为 None"""
+        try:
+            lines = (info['path'] / 'Makefile').read_text(encoding='utf-8', errors='ignore').splitlines()
+        except OSError:
+            return None
+        
+        for line in lines:
+            key, sep, value = line.partition('=')
+            if sep and key.rstrip(' ?:+') == var:
+                return value.strip()
+        return None
+    
+    def _read_makefile_var(self, info, var):
+        """
+        读取 Makefile 中变量的值（如 VERILOG_FILES 可能引用 rtl/ sim/ 之外的已有RTL，
+        LIB_DIRS 指向共享IP库），返回相对项目目录解析后的路径列表
+        """
+        value = self._read_makefile_value(info, var) or ''
+        return [info['path'] / f for f in value.split() if '$' not in f]
+    
+    def get_dependency_graph(self, name):
+        """构建项目的模块依赖图（同一次运行中只扫描一次）"""
+        from verilog_deps import DependencyGraph
+        
+        info = self.projects[name]
+        if 'graph' not in info:
+            extra_files = [f for f in self._read_makefile_var(info, 'VERILOG_FILES') if f.is_file()]
+            info['graph'] = DependencyGraph.scan(
+                info['path'],
+                extra_files=extra_files,
+                library_dirs=self._read_makefile_var(info, 'LIB_DIRS')
+            )
+        return info['graph']
+    
+    def get_build_targets(self, name):
+        """
+        项目的编译目标：每个 testbench 一个，文件列表由模块依赖图自动生成
+        共享IP库中的模块不放入文件列表（由 iverilog -y 解析），但计入依赖指纹
+        Returns:
+            [{'label', 'top', 'output', 'files', 'libraries', 'includes', 'fingerprint'}, ...]
+            没有识别出 testbench 时返回一个使用 Makefile 默认设置的目标（files 为 None）
+        """
+        if name in self.selection:
+            return self.selection[name]
+        
+        info = self.projects[name]
+        if 'targets' in info:
+            return info['targets']
+        
+        graph = self.get_dependency_graph(name)
+        testbenches = graph.testbenches()
+        targets = []
+        
+        for tb in testbenches:
+            files, includes = graph.dependencies(tb)
+            top = graph.top_module(tb)
+            # 主 testbench 的输出名与 Makefile 一致（项目名），其余去掉 _tb 后缀
+            if top == f"{name}_tb" or len(testbenches) == 1:
+                output = name
+            else:
+                output = top[:-3] if top.endswith('_tb') else top
+            
+            targets.append({
+                'label': name if len(testbenches) == 1 else f"{name}:{top}",
+                'top': top,
+                'output': output,
+                'files': [os.path.relpath(f, info['path'])
+                          for f in files if f not in graph.library_files],
+                'libraries': [os.path.relpath(f, info['path'])
+                              for f in files if f in graph.library_files],
+                'includes': [os.path.relpath(f, info['path']) for f in includes],
+                'fingerprint': graph.fingerprint(files + includes),
+            })
+        
+        if not targets:
+            targets.append({'label': name, 'top': None, 'output': name, 'files': None,
+                            'libraries': [], 'includes': [], 'fingerprint': None})
+        
+        info['targets'] = targets
+        return targets
+    
+    def build_dir(self, info):
+        """
+        项目的构建目录（.vvp 和波形所在）：--build-dir 下的 <项目名>，
+        否则为 Makefile 中的 BUILD_DIR（没有设置时为项目目录）
+        """
+        if self.build_root:
+            return Path(self.build_root).resolve() / info['path'].name
+        if 'build_dir' not in info:
+            configured = self._read_makefile_var(info, 'BUILD_DIR')
+            info['build_dir'] = configured[0] if configured else info['path']
+        return info['build_dir']
+    
+    def backend(self, info):
+        """
+        项目使用的仿真器后端：--backend 指定的后端，否则为 Makefile 中的 SIMULATOR
+        （此前生成的 Makefile 没有 SIMULATOR，使用 Icarus）
+        """
+        from verilog_backends import get_backend
+        
+        if self.backend_name:
+            return get_backend(self.backend_name)
+        if 'backend' not in info:
+            info['backend'] = get_backend(self._read_makefile_value(info, 'SIMULATOR'))
+        return info['backend']
+    
+    def _image(self, info, target):
+        """目标的编译产物路径（.vvp、Verilator 可执行文件等）"""
+        return self.build_dir(info) / f"{target['output']}{self.backend(info).image_suffix}"
+    
+    def _make_vars(self, info, target):
+        """把编译目标转换为 make 命令行变量（覆盖 Makefile 中的默认值）"""
+        make_vars = [f"BUILD_DIR={self.build_dir(info)}"] if self.build_root else []
+        if self.backend_name:
+            make_vars.append(f"SIMULATOR={self.backend_name}")
+        if target['files'] is None:
+            return make_vars
+        
+        make_vars += [
+            f"VERILOG_FILES={' '.join(target['files'])}",
+            f"MODULE_NAME={target['top']}",
+            f"OUTPUT_NAME={target['output']}",
+        ]
+        include_dirs = sorted({os.path.dirname(f) or '.' for f in target['includes']})
+        if include_dirs:
+            make_vars.append(f"{self.backend(info).flags_var}=" + ' '.join(f"-I{d}" for d in include_dirs))
+        return make_vars
+    
+    def _build_state(self, info):
+        """读取项目的构建状态（各 testbench 上次成功编译/仿真时的依赖指纹）"""
+        if 'build_state' not in info:
+            try:
+                info['build_state'] = json.loads((info['path'] / BUILD_STATE).read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                info['build_state'] = {}
+        return info['build_state']
+    
+    def _is_up_to_date(self, info, target, phase):
+        """目标的传递依赖自上次成功的 compile/simulate 以来是否没有变化"""
+        if target['fingerprint'] is None:
+            return False
+        if not self._image(info, target).exists():
+            return False
+        return self._build_state(info).get(target['top'], {}).get(phase) == target['fingerprint']
+    
+    def _record_build(self, info, target, phase):
+        """记录目标成功 compile/simulate 时的依赖指纹"""
+        if target['fingerprint'] is None:
+            return
+        
+        state = self._build_state(info)
+        state.setdefault(target['top'], {})[phase] = target['fingerprint']
+        
+        from verilog_lock import atomic_write
+        
+        state_file = info['path'] / BUILD_STATE
+        state_file.parent.mkdir(exist_ok=True)
+        atomic_write(state_file, json.dumps(state, indent=2))
+    
+    @property
+    def history(self):
+        """运行历史数据库（首次使用时打开；无法打开时为 None，不影响构建）"""
+        with self._history_lock:
+            if self._history is None:
+                from verilog_history import RunHistory, HISTORY_DB
+                try:
+                    self._history = RunHistory(self.root / HISTORY_DB)
+                except Exception as e:
+                    print(f"⚠ 无法打开运行历史数据库: {e}")
+                    self._history = False
+            return self._history or None
+    
+    def _source_hash(self, info, target):
+        """目标所有依赖文件内容的哈希"""
+        if target['files'] is None:
+            return None
+        files = target['files'] + target['libraries'] + target['includes']
+        return self.get_dependency_graph(info['path'].name).content_hash(info['path'] / f for f in files)
+    
+    def _artifact_bytes(self, info, target, phase):
+        """编译产物（.vvp 等）或仿真产物（波形和日志）的大小"""
+        build_dir = self.build_dir(info)
+        output = target['output']
+        if phase == 'compile':
+            files = [self._image(info, target)]
+        else:
+            files = list(build_dir.glob(f"{output}*.vcd")) + list(info['path'].glob(f"{output}*.log"))
+        return sum(f.stat().st_size for f in files if f.is_file())
+    
+    def _emit(self, info, target, phase, status, **fields):
+        """--format jsonl 时输出一条结果记录（可在线程池中并行调用）"""
+        if self.result_stream is None:
+            return
+        record = {
+            'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+            'project': info['path'].name,
+            'target': target['label'],
+            'phase': phase,
+            'status': status,
+            **fields,
+        }
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._emit_lock:
+            self.result_stream.write(line + '\n')
+            self.result_stream.flush()
+    
+    def _record_run(self, info, target, phase, status, measured=None, log=None, verdict=None):
+        """
+        把一次 compile / simulate 写入运行历史，并输出结果记录
+        Args:
+            log: 日志文件路径
+            verdict: 仿真日志的解析结果 LogVerdict.summary()
+        """
+        measured = measured or {}
+        rounded = {k: round(measured[k], 3) if measured.get(k) is not None else None
+                   for k in ('duration', 'cpu_user', 'cpu_sys')}
+        self._emit(info, target, phase, status,
+                   exit_code=measured.get('returncode'),
+                   **rounded,
+                   max_rss_kb=measured.get('max_rss_kb'),
+                   sim_time_ns=measured.get('sim_time_ns'),
+                   log=log,
+                   cached=False,
+                   **(verdict or {}))
+        
+        history = self.history
+        if history is None:
+            return
+        try:
+            history.record(
+                info['path'].name, target['label'], phase, status,
+                duration=measured.get('duration'),
+                cpu_user=measured.get('cpu_user'),
+                cpu_sys=measured.get('cpu_sys'),
+                max_rss_kb=measured.get('max_rss_kb'),
+                artifact_bytes=self._artifact_bytes(info, target, phase),
+                source_hash=self._source_hash(info, target),
+                sim_time_ns=measured.get('sim_time_ns'),
+                log_lines=measured.get('log_lines'),
+            )
+        except Exception as e:
+            print(f"⚠ 写入运行历史失败: {e}")
+    
+    def _project_lock(self, info):
+        """
+        项目锁：同一工作区中的多个管理器进程对同一项目的编译、仿真和清理互斥（同一进程内可重入）
+        按 lock_policy 等待或抛出 ProjectBusy
+        """
+        from verilog_lock import ProjectLock
+        
+        return ProjectLock(info['path'], wait=self.lock_policy == 'wait', timeout=self.lock_timeout)
+    
+    def _run_make(self, info, target, goal, extra_args=(), timeout=30):
+        """
+        在项目目录运行 make <goal>（可在线程池中并行调用），结果写入运行历史
+        运行期间持有项目锁，项目正被其他进程使用且不等待时抛出 ProjectBusy
+        Returns:
+            ('ok' | 'failed' | 'timeout' | 'error', 错误信息, run_measured 的测量结果)
+        """
+        with self._project_lock(info):
+            return self._run_make_locked(info, target, goal, extra_args, timeout)
+    
+    def _core_group(self):
+        """取用一个专用核心组（上下文管理器，没有 --pin-cpus 时为 None）"""
+        return self.cores.acquire() if self.cores else contextlib.nullcontext()
+    
+    def _limited(self, cmd, simulate, cpus=None):
+        """
+        包装子进程命令：仿真进程设置资源限制，所有进程绑定到 cpus（在 exec 之前生效）
+        """
+        from verilog_limits import limit_command
+        
+        limits = (self.limits or {}) if simulate else {}
+        return limit_command(cmd, limits.get('memory'), limits.get('cpu_time'), cpus)
+    
+    def _run_make_locked(self, info, target, goal, extra_args, timeout):
+        from verilog_history import run_measured, parse_sim_output
+        from verilog_limits import LIMIT_STATUS, limit_violation
+        from verilog_lock import atomic_write
+        from verilog_results import LogVerdict
+        
+        # 仿真输出边运行边解析，退出码为0但日志中有 FAIL / ERROR / $error / $fatal 时判定为失败
+        verdict = LogVerdict() if goal == 'simulate' else None
+        on_stdout = (lambda line: verdict.feed(line.decode('utf-8', errors='ignore'))) if verdict else None
+        try:
+            with self._core_group() as cpus:
+                cmd = ['make', *extra_args, goal] + self._make_vars(info, target)
+                result = run_measured(self._limited(cmd, goal == 'simulate', cpus),
+                                      cwd=info['path'], timeout=timeout, on_stdout=on_stdout)
+        except Exception as e:
+            self._record_run(info, target, goal, 'error')
+            return 'error', str(e), None
+        
+        log_file = info['path'] / f"{target['output']}{LOG_SUFFIXES.get(goal, f'_{goal}.log')}"
+        try:
+            atomic_write(log_file, result['stdout'] + result['stderr'])
+        except OSError:
+            log_file = None
+        
+        if verdict:
+            verdict.close()
+            result.update(parse_sim_output(result['stdout'].decode('utf-8', errors='ignore')))
+        
+        violation = None
+        if goal == 'simulate':
+            cpu_used = None if result['cpu_user'] is None else result['cpu_user'] + result['cpu_sys']
+            violation = limit_violation(self.limits, result['returncode'],
+                                        (result['stdout'] + result['stderr']).decode('utf-8', errors='ignore'),
+                                        cpu_used)
+        
+        if result['timed_out']:
+            status, message = 'timeout', ''
+        elif violation:
+            status, message = LIMIT_STATUS, violation
+        elif result['returncode'] == 0 and verdict and verdict.failed:
+            status, message = 'failed', verdict.first_error
+        elif result['returncode'] == 0:
+            status, message = 'ok', ''
+        else:
+            status, message = 'failed', result['stderr'].decode('utf-8', errors='ignore')
+        
+        self._record_run(info, target, goal, status, result, log=log_file,
+                         verdict=verdict.summary() if verdict else None)
+        return status, message, result
+    
+    def _make(self, info, target, goal, timeout=30):
+        """
+        在项目目录运行 make <goal>，见 _run_make
+        Returns:
+            ('ok' | 'failed' | 'timeout' | 'error', 错误信息)
+        """
+        status, message, _ = self._run_make(info, target, goal, timeout=timeout)
+        return status, message
+    
+    def _result_key(self, info, target, plusargs):
+        """仿真结果缓存键（编译产物 + 仿真参数 + 仿真器版本）；没有编译产物时为 None"""
+        from verilog_results import result_key, simulator_version
+        
+        backend = self.backend(info)
+        try:
+            return result_key(self._image(info, target), plusargs,
+                              f"{backend.name} {simulator_version(backend.version_command)}")
+        except OSError:
+            return None
+    
+    def _result_cache(self, info):
+        from verilog_results import ResultCache
+        
+        return ResultCache(info['path'], self.build_dir(info))
+    
+    def _cached_result(self, info, key):
+        """结果缓存中的结论，未命中时为 None"""
+        return self._result_cache(info).lookup(key) if key else None
+    
+    def _store_result(self, info, key, status, log_text, before):
+        """把确定的仿真结论（成功/失败，不包括超时和异常）写入结果缓存"""
+        if key and status in ('ok', 'failed'):
+            self._result_cache(info).store(key, status, log_text, before)
+    
+    def _wave_snapshot(self, info):
+        return self._result_cache(info).snapshot()
+    
+    def _keep_failed_waves(self, info, before):
+        """构建目录在项目目录之外时，把本次失败运行生成的波形复制回项目目录（持久存储）"""
+        import shutil
+        
+        if not self.copy_failed_waves or self.build_dir(info).resolve() == info['path'].resolve():
+            return
+        for name in self._result_cache(info).changed(before):
+            src = Path(name) if os.path.isabs(name) else info['path'] / name
+            try:
+                shutil.copy2(src, info['path'] / src.name)
+            except OSError as e:
+                print(f"  ⚠ 无法保存波形 {src}: {e}")
+    
+    def _simulate(self, info, target, timeout=30, result_cache=True):
+        """
+        先编译，再用 make -o compile simulate 单独运行仿真，使仿真耗时和吞吐量不包含编译时间
+        编译产物、仿真参数（SIM_ARGS）和仿真器版本都没有变化时直接复用结果缓存中的结论
+        Args:
+            result_cache: 是否使用结果缓存（为 False 时总是重新仿真，结果仍写入缓存）
+        编译、查找缓存和仿真期间一直持有项目锁（其他进程不会在两者之间重新编译）
+        Returns:
+            (状态, 错误信息, 吞吐量 {'ns_per_sec', 'lines_per_sec'} 或 None, 是否来自结果缓存)
+        """
+        with self._project_lock(info):
+            return self._simulate_locked(info, target, timeout, result_cache)
+    
+    def _simulate_locked(self, info, target, timeout, result_cache):
+        status, message = self._make(info, target, 'compile', timeout=timeout)
+        if status != 'ok':
+            return status, message, None, False
+        self._record_build(info, target, 'compile')
+        
+        key = self._result_key(info, target, os.environ.get('SIM_ARGS', ''))
+        cached = self._cached_result(info, key) if result_cache else None
+        if cached:
+            self._emit(info, target, 'simulate', cached['status'], log=cached['log'], cached=True)
+            message = '' if cached['status'] == 'ok' else f"日志: {cached['log']}"
+            return cached['status'], message, None, True
+        
+        before = self._wave_snapshot(info)
+        status, message, result = self._run_make(info, target, 'simulate', ['-o', 'compile'], timeout)
+        if result:
+            log_text = (result['stdout'] + result['stderr']).decode('utf-8', errors='ignore')
+            self._store_result(info, key, status, log_text, before)
+        if status != 'ok':
+            if status in ('failed', 'timeout', 'limit'):
+                self._keep_failed_waves(info, before)
+            return status, message, None, False
+        return status, message, self._throughput(result), False
+    
+    def _throughput(self, measured):
+        """由仿真结束时间、日志行数和墙钟时间计算吞吐量"""
+        wall = measured.get('duration') or 0
+        if wall <= 0:
+            return None
+        sim_time_ns = measured.get('sim_time_ns')
+        return {
+            'ns_per_sec': sim_time_ns / wall if sim_time_ns is not None else None,
+            'lines_per_sec': measured.get('log_lines', 0) / wall,
+            'wall': wall,
+        }
+    
+    def check_performance(self, perf, gate=None, update_baseline=False):
+        """
+        把本次仿真吞吐量与基线比较
+        Args:
+            perf: {目标: 吞吐量}
+            gate: 吞吐量下降超过该百分比时判定失败；None 表示只报告
+            update_baseline: 用本次结果覆盖基线（没有基线的目标总是记录）
+        Returns:
+            是否通过
+        """
+        baseline_file = self.root / PERF_BASELINE
+        try:
+            baseline = json.loads(baseline_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            baseline = {}
+        
+        print(f"{'目标':<30} {'仿真ns/秒':>14} {'基线':>14} {'变化':>8}  {'日志行/秒':>10}")
+        passed = True
+        changed = False
+        for label, current in perf.items():
+            if current is None or current['ns_per_sec'] is None:
+                print(f"{label:<30} {'-':>14} {'-':>14} {'':>8}  (没有找到 $finish 时间)")
+                continue
+            
+            base = baseline.get(label)
+            known = base is not None and 'ns_per_sec' in base
+            mark = ''
+            if known:
+                # 基线为 0 时吞吐量不可能下降（当前也为 0 时视为不变）
+                if base['ns_per_sec']:
+                    change = current['ns_per_sec'] / base['ns_per_sec'] - 1
+                else:
+                    change = float('inf') if current['ns_per_sec'] else 0.0
+                change_str = f"{change:+.1%}"
+                if gate is not None and -change * 100 > gate:
+                    mark = f"  ✗ 吞吐量下降超过 {gate:g}%"
+                    passed = False
+                base_str = f"{base['ns_per_sec']:.4g}"
+            else:
+                change_str, base_str = '', '(新)'
+            print(f"{label:<30} {current['ns_per_sec']:>14.4g} {base_str:>14} {change_str:>8}  "
+                  f"{current['lines_per_sec']:>10.1f}{mark}")
+            
+            if update_baseline or not known:
+                baseline[label] = {
+                    'ns_per_sec': current['ns_per_sec'],
+                    'lines_per_sec': current['lines_per_sec'],
+                    'recorded_at': datetime.now().isoformat(timespec='seconds'),
+                }
+                changed = True
+        
+        if changed:
+            from verilog_lock import atomic_write
+            atomic_write(baseline_file, json.dumps(baseline, indent=2, ensure_ascii=False))
+            print(f"\n✓ 基线已更新: {baseline_file}")
+        print()
+        return passed
+    
+    def _precheck_target(self, info, target, timeout=30):
+        """
+        对单个目标运行只做语法检查的编译（不生成编译产物）
+        Returns:
+            ('ok' | 'failed' | 'timeout' | 'error' | 'skipped', [{'file', 'line', 'message'}], 其他输出)
+        """
+        import subprocess
+        from verilog_backends import parse_diagnostics
+        
+        if target['files'] is None:
+            # 没有识别出 testbench：使用 Makefile 中的默认设置
+            files = [f for f in (self._read_makefile_value(info, 'VERILOG_FILES') or '').split() if '$' not in f]
+            top = self._read_makefile_value(info, 'MODULE_NAME')
+            include_dirs = []
+        else:
+            files, top = target['files'], target['top']
+            include_dirs = sorted({os.path.dirname(f) or '.' for f in target['includes']})
+        lib_dirs = [d for d in (self._read_makefile_value(info, 'LIB_DIRS') or '').split() if '$' not in d]
+        
+        command = self.backend(info).precheck_command(top, files, include_dirs, lib_dirs) if files and top else None
+        if command is None:
+            return 'skipped', [], ''
+        try:
+            result = subprocess.run(command, cwd=info['path'], capture_output=True,
+                                    encoding='utf-8', errors='replace', timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return 'timeout', [], ''
+        except OSError as e:
+            return 'error', [], str(e)
+        
+        if result.returncode == 0:
+            return 'ok', [], ''
+        output = result.stdout + result.stderr
+        errors = parse_diagnostics(output)
+        return 'failed', errors, '' if errors else output.strip()
+    
+    def precheck(self, jobs=1, timeout=30):
+        """
+        语法预检：并行对所有（已选中的）目标运行只做语法检查的编译（如 iverilog -tnull），
+        先报告全部语法错误（文件和行号），再把有错误的目标从后续的编译/仿真中排除
+        无法运行预检（工具缺失、超时）的目标不排除，由完整编译报告错误
+        Returns:
+            是否没有语法错误
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        print("\n开始语法预检...\n")
+        
+        tasks = [(name, info, target) for name, info in self.projects.items()
+                 for target in self.get_build_targets(name)]
+        
+        pool = self.pool
+        own_pool = pool is None
+        if own_pool:
+            pool = ThreadPoolExecutor(max_workers=jobs if jobs > 1 else None)
+        try:
+            results = list(pool.map(lambda task: self._precheck_target(task[1], task[2], timeout), tasks))
+        finally:
+            if own_pool:
+                pool.shutdown()
+        
+        broken = {}
+        passed = 0
+        unchecked = 0
+        for (name, info, target), (status, errors, output) in zip(tasks, results):
+            self._emit(info, target, 'precheck', status, errors=errors)
+            label = target['label']
+            if status == 'ok':
+                passed += 1
+            elif status == 'failed':
+                broken.setdefault(name, []).append(target)
+                print(f"✗ {label}: {len(errors) or 1} 个错误")
+                for error in errors:
+                    print(f"    {info['path'] / error['file']}:{error['line']}: {error['message']}")
+                for line in output.splitlines()[:10]:
+                    print(f"    {line}")
+            else:
+                unchecked += 1
+                if status == 'timeout':
+                    print(f"⚠ {label}: 预检超时，不排除")
+                elif status == 'error':
+                    print(f"⚠ {label}: 无法运行预检（{output}），不排除")
+        
+        for name, targets in broken.items():
+            remaining = [t for t in self.get_build_targets(name) if t not in targets]
+            if remaining:
+                self.selection[name] = remaining
+            else:
+                self.selection.pop(name, None)
+                del self.projects[name]
+        
+        failed = sum(len(targets) for targets in broken.values())
+        unchecked_msg = f", {unchecked} 个未检查" if unchecked else ""
+        excluded_msg = "（已从编译/仿真中排除）" if failed else ""
+        print(f"\n预检完成: {passed} 个通过, {failed} 个有语法错误{excluded_msg}{unchecked_msg}\n")
+        return not broken
+    
+    def compile_all(self, incremental=False, jobs=1):
+        """
+        编译所有项目
+        Args:
+            incremental: 只编译传递依赖自上次成功编译以来有变化的 testbench
+            jobs: 并行编译数（守护进程中使用常驻线程池 self.pool）
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from verilog_lock import ProjectBusy
+        
         print("\n开始编译所有项目...\n")
         
         success = []
         failed = []
+        skipped = []
+        busy = []
+        to_build = []
         
         for name, info in self.projects.items():
-            print(f"编译 {name}...", end=" ")
-            try:
-                result = subprocess.run(
-                    ['make', 'compile'],
-                    cwd=info['path'],
-                    capture_output=True,
-                    timeout=30
-                )
+            for target in self.get_build_targets(name):
+                if incremental and self._is_up_to_date(info, target, 'compile'):
+                    print(f"编译 {target['label']}... ✓ 未变化，跳过")
+                    skipped.append(target['label'])
+                    self._emit(info, target, 'compile', 'skipped')
+                else:
+                    to_build.append((info, target))
+        
+        pool = self.pool
+        own_pool = pool is None and jobs > 1 and len(to_build) > 1
+        if own_pool:
+            pool = ThreadPoolExecutor(max_workers=jobs)
+        futures = [pool.submit(self._make, info, target, 'compile') for info, target in to_build] if pool else None
+        
+        try:
+            for i, (info, target) in enumerate(to_build):
+                label = target['label']
+                print(f"编译 {label}...", end=" ", flush=True)
+                try:
+                    status, message = futures[i].result() if futures else self._make(info, target, 'compile')
+                except ProjectBusy as e:
+                    print(f"⚠ 跳过（{e}）")
+                    busy.append(label)
+                    self._emit(info, target, 'compile', 'skipped', reason=str(e))
+                    continue
                 
-                if result.returncode == 0:
+                if status == 'ok':
                     print("✓ 成功")
-                    success.append(name)
-                else:
+                    success.append(label)
+                    self._record_build(info, target, 'compile')
+                    continue
+                
+                failed.append(label)
+                if status == 'failed':
                     print("✗ 失败")
-                    failed.append(name)
-                    print(f"  错误: {result.stderr.decode('utf-8', errors='ignore')}")
-            
-            except subprocess.TimeoutExpired:
-                print("✗ 超时")
-                failed.append(name)
-            except Exception as e:
-                print(f"✗ 异常: {e}")
-                failed.append(name)
+                    print(f"  错误: {message}")
+                elif status == 'timeout':
+                    print("✗ 超时")
+                else:
+                    print(f"✗ 异常: {message}")
+        finally:
+            if own_pool:
+                pool.shutdown()
         
-        print(f"\n编译完成: {len(success)} 个成功, {len(failed)} 个失败\n")
+        skipped_msg = f", {len(skipped)} 个未变化" if skipped else ""
+        busy_msg = f", {len(busy)} 个被其他进程占用" if busy else ""
+        print(f"\n编译完成: {len(success)} 个成功, {len(failed)} 个失败{skipped_msg}{busy_msg}\n")
         
         return len(failed) == 0
     
-    def simulate_all(self):
-        """仿真所有项目"""
+    def simulate_all(self, shards=1, incremental=False, perf_gate=None, update_baseline=False,
+                     result_cache=True):
+        """
+        仿真所有项目
+        Args:
+            shards: 每个项目拆分的分片数，大于1时并行启动多个仿真进程
+            incremental: 只仿真传递依赖自上次成功仿真以来有变化的 testbench
+            perf_gate: 仿真吞吐量（仿真ns/墙钟秒）相对基线下降超过该百分比时判定失败
+            update_baseline: 用本次吞吐量覆盖基线
+            result_cache: 编译产物和仿真参数没有变化时复用缓存的仿真结论
+        """
+        from verilog_lock import ProjectBusy
+        
         print("\n开始仿真所有项目...\n")
         
         success = []
         failed = []
+        limited = []
+        skipped = []
+        busy = []
+        cached = []
+        perf = {}
         
         for name, info in self.projects.items():
-            print(f"仿真 {name}...", end=" ")
-            try:
-                result = subprocess.run(
-                    ['make', 'simulate'],
-                    cwd=info['path'],
-                    capture_output=True,
-                    timeout=30
-                )
+            for target in self.get_build_targets(name):
+                label = target['label']
+                if incremental and self._is_up_to_date(info, target, 'simulate'):
+                    print(f"仿真 {label}... ✓ 未变化，跳过")
+                    skipped.append(label)
+                    self._emit(info, target, 'simulate', 'skipped')
+                    continue
                 
-                if result.returncode == 0:
-                    print("✓ 成功")
-                    success.append(name)
+                print(f"仿真 {label}...", end=" ")
+                if shards > 1:
+                    try:
+                        status, perf[label] = self.simulate_sharded(name, info, shards, target=target,
+                                                                    result_cache=result_cache)
+                    except ProjectBusy as e:
+                        print(f"⚠ 跳过（{e}）")
+                        busy.append(label)
+                        self._emit(info, target, 'simulate', 'skipped', reason=str(e))
+                        continue
+                    except Exception as e:
+                        print(f"✗ 异常: {e}")
+                        status = 'error'
+                    (success if status == 'ok' else failed).append(label)
+                    if status == 'limit':
+                        limited.append(label)
+                    if status == 'ok':
+                        self._record_build(info, target, 'simulate')
+                    continue
+                
+                try:
+                    status, message, perf[label], from_cache = self._simulate(info, target,
+                                                                              result_cache=result_cache)
+                except ProjectBusy as e:
+                    print(f"⚠ 跳过（{e}）")
+                    busy.append(label)
+                    self._emit(info, target, 'simulate', 'skipped', reason=str(e))
+                    continue
+                if from_cache:
+                    cached.append(label)
+                if status == 'ok':
+                    print("✓ 成功（缓存结果）" if from_cache else "✓ 成功")
+                    success.append(label)
+                    self._record_build(info, target, 'simulate')
+                elif from_cache:
+                    print(f"✗ 失败（缓存结果，{message}）")
+                    failed.append(label)
                 else:
-                    print("✗ 失败")
-                    failed.append(name)
-            
-            except subprocess.TimeoutExpired:
-                print("✗ 超时")
-                failed.append(name)
-            except Exception as e:
-                print(f"✗ 异常: {e}")
-                failed.append(name)
+                    print({'failed': "✗ 失败", 'timeout': "✗ 超时",
+                           'limit': f"✗ 超出资源限制（{message}）"}.get(status, f"✗ 异常: {message}"))
+                    if status == 'failed' and message:
+                        print(f"  错误: {message}")
+                    if status == 'limit':
+                        limited.append(label)
+                    failed.append(label)
+        
+        limited_msg = f"（其中 {len(limited)} 个超出资源限制）" if limited else ""
+        skipped_msg = f", {len(skipped)} 个未变化" if skipped else ""
+        busy_msg = f", {len(busy)} 个被其他进程占用" if busy else ""
+        cached_msg = f", {len(cached)} 个使用缓存结果" if cached else ""
+        print(f"\n仿真完成: {len(success)} 个成功, {len(failed)} 个失败{limited_msg}"
+              f"{skipped_msg}{busy_msg}{cached_msg}\n")
         
-        print(f"\n仿真完成: {len(success)} 个成功, {len(failed)} 个失败\n")
+        perf = {label: p for label, p in perf.items() if label in success and p is not None}
+        if perf and not self.check_performance(perf, perf_gate, update_baseline):
+            print(f"✗ 性能门限未通过（吞吐量下降超过 {perf_gate:g}%）\n")
+            return False
         
         return len(failed) == 0
     
-    def clean_all(self):
-        """清理所有项目"""
-        print("\n开始清理所有项目...\n")
+    def compile_project(self, name, incremental=False, timeout=30):
+        """
+        编译单个项目的所有目标（不打印进度，供编程接口调用）
+        Returns:
+            [{'label', 'status', 'elapsed', 'message', 'cached'}, ...]，格式同 build_project
+        """
+        from verilog_lock import ProjectBusy
         
-        for name, info in self.projects.items():
-            print(f"清理 {name}...", end=" ")
+        info = self.projects[name]
+        results = []
+        
+        for target in self.get_build_targets(name):
+            if incremental and self._is_up_to_date(info, target, 'compile'):
+                self._emit(info, target, 'compile', 'skipped')
+                results.append({'label': target['label'], 'status': 'skipped', 'elapsed': 0,
+                                'message': '', 'cached': False})
+                continue
+            
+            start = time.time()
             try:
-                result = subprocess.run(
-                    ['make', 'clean'],
+                status, message = self._make(info, target, 'compile', timeout=timeout)
+            except ProjectBusy as e:
+                self._emit(info, target, 'compile', 'skipped', reason=str(e))
+                results.append({'label': target['label'], 'status': 'skipped', 'elapsed': 0,
+                                'message': str(e), 'cached': False})
+                continue
+            if status == 'ok':
+                self._record_build(info, target, 'compile')
+            results.append({'label': target['label'], 'status': status,
+                            'elapsed': round(time.time() - start, 3), 'message': message,
+                            'cached': False})
+        
+        return results
+    
+    def build_project(self, name, incremental=False, result_cache=True, timeout=30):
+        """
+        编译并仿真单个项目的所有目标（多节点回归中由工作节点调用）
+        Returns:
+            [{'label', 'status', 'elapsed', 'message', 'cached'}, ...]，
+            status 为 ok / skipped / failed / timeout / limit（超出资源限制）/ error（项目被其他进程占用时为 skipped）
+        """
+        from verilog_lock import ProjectBusy
+        
+        info = self.projects[name]
+        results = []
+        
+        for target in self.get_build_targets(name):
+            if incremental and self._is_up_to_date(info, target, 'simulate'):
+                results.append({'label': target['label'], 'status': 'skipped', 'elapsed': 0,
+                                'message': '', 'cached': False})
+                continue
+            
+            start = time.time()
+            try:
+                status, message, _, from_cache = self._simulate(info, target, timeout=timeout,
+                                                                result_cache=result_cache)
+            except ProjectBusy as e:
+                results.append({'label': target['label'], 'status': 'skipped', 'elapsed': 0,
+                                'message': str(e), 'cached': False})
+                continue
+            if status == 'ok':
+                self._record_build(info, target, 'simulate')
+            results.append({'label': target['label'], 'status': status,
+                            'elapsed': round(time.time() - start, 3), 'message': message,
+                            'cached': from_cache})
+        
+        return results
+    
+    def simulate_sharded(self, name, info, shards, timeout=30, target=None, result_cache=True):
+        """
+        分片仿真单个项目：编译一次，然后用同一个编译产物并行启动多个仿真进程
+        每个分片通过 +shard=i +nshards=k 只运行测试空间的一部分，
+        各分片日志合并到 <output>_sim.log
+        运行期间持有项目锁，项目正被其他进程使用且不等待时抛出 ProjectBusy
+        Returns:
+            ('ok' | 'failed' | 'timeout' | 'limit', 吞吐量)
+        """
+        target = target or self.get_build_targets(name)[0]
+        with self._project_lock(info):
+            return self._simulate_sharded_locked(info, target, shards, timeout, result_cache)
+    
+    def _simulate_sharded_locked(self, info, target, shards, timeout, result_cache):
+        import subprocess
+        from concurrent.futures import ThreadPoolExecutor
+        
+        output = target['output']
+        
+        # 与非分片仿真一样通过 _make 编译：写入编译日志、运行历史和结果记录，并占用核心组
+        status, message = self._make(info, target, 'compile', timeout=timeout)
+        if status != 'ok':
+            print({'failed': "✗ 编译失败", 'timeout': "✗ 编译超时"}.get(status, f"✗ 编译异常: {message}"))
+            if status == 'failed' and message:
+                print(f"  错误: {message}")
+            return status, None
+        self._record_build(info, target, 'compile')
+        
+        key = self._result_key(info, target, f"+nshards={shards}")
+        cached = self._cached_result(info, key) if result_cache else None
+        if cached:
+            self._emit(info, target, 'simulate', cached['status'], log=cached['log'], cached=True)
+            if cached['status'] != 'ok':
+                print(f"✗ 失败（缓存结果，日志: {cached['log']}）")
+                return 'failed', None
+            print(f"✓ 成功（缓存结果，{shards} 分片）")
+            return 'ok', None
+        
+        build_dir = self.build_dir(info).resolve()  # 仿真在项目目录中运行
+        image = self._image(info, target).resolve()
+        before = self._wave_snapshot(info)
+        start = time.time()
+        returncodes = {}
+        
+        def run_shard(i):
+            log_file = info['path'] / f"{output}_shard{i}.log"
+            wave = build_dir / f'{output}_shard{i}.vcd'
+            tmp_wave = wave.with_name(f'{wave.name}.{os.getpid()}.tmp')
+            # --pin-cpus 时每个分片占用一个核心组，同时运行的分片数不超过核心组数
+            with self._core_group() as cpus, open(log_file, 'w', encoding='utf-8') as log:
+                # 所有分片共享同一个超时期限（包括等待核心组的时间）
+                remaining = timeout - (time.time() - start)
+                if remaining <= 0:
+                    returncodes[i] = None
+                    return
+                # 波形先写入临时文件，结束后再改名
+                cmd = (self.backend(info).run_command(image) +
+                       [f'+shard={i}', f'+nshards={shards}', f"+dumpfile={tmp_wave}"])
+                proc = subprocess.Popen(
+                    self._limited(cmd, True, cpus),
                     cwd=info['path'],
-                    capture_output=True,
-                    timeout=10
+                    stdout=log,
+                    stderr=subprocess.STDOUT
                 )
+                try:
+                    returncodes[i] = proc.wait(timeout=remaining)
+                except subprocess.TimeoutExpired:
+                    returncodes[i] = None
+                finally:
+                    if proc.poll() is None:
+                        proc.kill()
+                        proc.wait()
+            if tmp_wave.exists():
+                os.replace(tmp_wave, wave)
+        
+        with ThreadPoolExecutor(max_workers=shards) as pool:
+            list(pool.map(run_shard, range(shards)))
+        
+        elapsed = time.time() - start
+        
+        # 合并日志
+        from verilog_history import parse_sim_output
+        from verilog_limits import LIMIT_STATUS, limit_violation
+        from verilog_lock import atomic_write
+        from verilog_results import LogVerdict
+        merged_log = info['path'] / f"{output}_sim.log"
+        merged = []
+        violation = None
+        for i in range(shards):
+            log_file = info['path'] / f"{output}_shard{i}.log"
+            rc = returncodes[i]
+            status = "超时" if rc is None else f"exit={rc}"
+            text = log_file.read_text(encoding='utf-8', errors='ignore')
+            violation = violation or limit_violation(self.limits, rc, text)
+            merged.append(f"===== shard {i}/{shards} ({status}) =====\n")
+            merged.append(text)
+            log_file.unlink()
+        atomic_write(merged_log, ''.join(merged))
+        
+        verdict = LogVerdict()
+        verdict.feed(''.join(merged))
+        verdict.close()
+        
+        measured = {'duration': elapsed, **parse_sim_output(''.join(merged))}
+        failed_shards = [i for i, rc in returncodes.items() if rc != 0]
+        status = 'failed' if failed_shards or verdict.failed else 'ok'
+        if None in returncodes.values():
+            status = 'timeout'
+        elif violation:
+            status = LIMIT_STATUS
+        else:
+            self._store_result(info, key, status, ''.join(merged), before)
+        self._record_run(info, target, 'simulate', status, measured, log=merged_log,
+                         verdict=verdict.summary())
+        if status != 'ok':
+            self._keep_failed_waves(info, before)
+        if violation:
+            print(f"✗ 超出资源限制（{violation}, 日志: {merged_log}）")
+            return status, None
+        if failed_shards:
+            print(f"✗ 失败 (分片 {failed_shards}, 日志: {merged_log})")
+            return status, None
+        if verdict.failed:
+            print(f"✗ 失败 ({verdict.first_error}, 日志: {merged_log})")
+            return status, None
+        
+        print(f"✓ 成功 ({shards} 分片, {elapsed:.2f}s)")
+        return status, self._throughput(measured)
+    
+    def show_dependencies(self, project_name=None):
+        """
+        显示项目中每个 testbench 的依赖文件列表，
+        并把主 testbench 的文件列表写入 sources.mk（生成的 Makefile 会自动包含）
+        """
+        names = [project_name] if project_name else list(self.projects)
+        
+        for name in names:
+            if name not in self.projects:
+                print(f"✗ 项目 '{name}' 不存在")
+                continue
+            
+            info = self.projects[name]
+            graph = self.get_dependency_graph(name)
+            print(f"\n{name}:")
+            
+            for target in self.get_build_targets(name):
+                if target['files'] is None:
+                    print("  ⚠ 没有找到 testbench (sim/*_tb.v)")
+                    continue
+                print(f"  {target['top']} -> {target['output']}{self.backend(info).image_suffix}")
+                for f in target['files']:
+                    print(f"    - {f}")
+                for f in target['libraries']:
+                    print(f"    * {f} (共享库)")
+                for f in target['includes']:
+                    print(f"    + {f} (include)")
                 
-                if result.returncode == 0:
-                    print("✓")
-                else:
-                    print("✗")
+                if target['output'] == name:
+                    sources_mk = info['path'] / 'sources.mk'
+                    content = ("# 由 manage_verilog_projects.py deps 根据模块依赖自动生成\n"
+                               f"VERILOG_FILES = {' '.join(target['files'])}\n")
+                    if not sources_mk.exists() or sources_mk.read_text(encoding='utf-8') != content:
+                        sources_mk.write_text(content, encoding='utf-8')
+            
+            for path, modules in graph.missing.items():
+                print(f"  ⚠ {os.path.relpath(path, info['path'])}: 找不到模块定义 {', '.join(modules)}")
+        print()
+    
+    def changed_files_since(self, rev):
+        """
+        返回自 rev 以来有变化的文件（git diff，包括未提交的修改和未跟踪的新文件）
+        Returns:
+            绝对路径集合
+        """
+        import subprocess
+        
+        def git(*cmd):
+            result = subprocess.run(['git', *cmd], cwd=self.root, capture_output=True, text=True, timeout=60)
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.strip() or f"git {' '.join(cmd)} 失败")
+            return result.stdout
+        
+        top = Path(git('rev-parse', '--show-toplevel').strip())
+        names = git('diff', '--name-only', rev, '--').splitlines()
+        names += git('ls-files', '--others', '--exclude-standard', '--full-name').splitlines()
+        return {(top / name).resolve() for name in names if name}
+    
+    def select_changed(self, rev):
+        """
+        只保留受 rev 以来的修改影响的项目（以及受影响的 testbench），见 select_affected
+        Returns:
+            {项目名: 受影响的目标列表}
+        """
+        selected = self.select_affected(self.changed_files_since(rev))
+        self.selection = selected
+        self.projects = {name: self.projects[name] for name in selected}
+        return selected
+    
+    def select_affected(self, changed):
+        """
+        找出受一组文件变化影响的 testbench：
+          - 某个 testbench 的传递依赖（包括共享库和其他项目的RTL）有变化 -> 只重跑这些 testbench
+          - 项目的构建配置或依赖图无法定位的源文件（如被删除的文件）有变化 -> 重跑整个项目
+        Args:
+            changed: 变化的文件（绝对路径）
+        Returns:
+            {项目名: 受影响的目标列表}
+        """
+        selected = {}
+        
+        for name, info in self.projects.items():
+            project_dir = info['path'].resolve()
+            graph = self.get_dependency_graph(name)
+            targets = self.get_build_targets(name)
+            
+            affected = {Path(tb).resolve() for tb in graph.affected_testbenches(changed)}
+            hit = [t for t in targets
+                   if t['files'] and (info['path'] / t['files'][-1]).resolve() in affected]
+            
+            known = {Path(f).resolve() for f in graph.files}
+            known.update((info['path'] / f).resolve() for t in targets for f in t['includes'])
+            owned = [f for f in changed if project_dir in f.parents]
+            if any(f.name in BUILD_CONFIG_FILES
+                   or (f.suffix in HDL_SUFFIXES and (not f.exists() or f not in known))
+                   for f in owned):
+                hit = targets
+            
+            if hit:
+                selected[name] = hit
+        
+        return selected
+    
+    def print_selection(self, rev, selected):
+        """打印 --changed-since 选出的项目和 testbench"""
+        print(f"\n自 {rev} 以来受影响的项目: {len(selected)} 个\n")
+        for name, targets in selected.items():
+            tops = ', '.join(t['top'] for t in targets if t['top'])
+            print(f"  {name}" + (f" ({tops})" if tops else ""))
+        print()
+    
+    def watch_roots(self):
+        """watch 模式需要监视的目录: [(目录, 是否递归), ...]"""
+        roots = set()
+        for name, info in self.projects.items():
+            graph = self.get_dependency_graph(name)
+            roots.add((info['path'].resolve(), False))  # Makefile / sources.mk
+            roots.update((d.resolve(), True) for d in graph.source_dirs)
+            roots.update((d.resolve(), False) for d in graph.library_dirs)
+            roots.update((f.resolve().parent, False) for f in graph.extra_files)
+        return sorted(roots)
+    
+    def _start_watch_run(self, name, target):
+        """
+        watch 模式下在后台启动一个目标的编译+仿真，返回运行状态字典
+        运行期间持有项目锁；项目正被其他进程使用时立即抛出 ProjectBusy（由调用者按 --lock 策略重试或跳过）
+        """
+        import subprocess
+        from verilog_lock import ProjectLock
+        
+        info = self.projects[name]
+        lock = ProjectLock(info['path'], wait=False)
+        lock.acquire()
+        try:
+            # 日志先写入临时文件，结束后再改名
+            log_file = info['path'] / f"{target['output']}_sim.log"
+            tmp_log = log_file.with_name(f"{log_file.name}.{os.getpid()}.tmp")
+            log = open(tmp_log, 'w', encoding='utf-8')
+            proc = subprocess.Popen(
+                ['make', 'simulate'] + self._make_vars(info, target),
+                cwd=info['path'],
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                start_new_session=True  # 取消时连同 make 启动的 iverilog/vvp 一起结束
+            )
+        except BaseException:
+            lock.release()
+            raise
+        print(f"[{datetime.now():%H:%M:%S}] 仿真 {target['label']}...", flush=True)
+        return {'name': name, 'target': target, 'proc': proc, 'log': log, 'lock': lock,
+                'log_file': log_file, 'tmp_log': tmp_log, 'start': time.monotonic()}
+    
+    def _cancel_watch_run(self, run):
+        """结束正在运行的编译/仿真（整个进程组），保留上一次的日志"""
+        import signal
+        
+        try:
+            os.killpg(run['proc'].pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        run['proc'].wait()
+        run['log'].close()
+        run['tmp_log'].unlink(missing_ok=True)
+        run['lock'].release()
+    
+    def _finish_watch_run(self, run):
+        """打印已结束的编译/仿真结果"""
+        run['log'].close()
+        try:
+            os.replace(run['tmp_log'], run['log_file'])
+            elapsed = time.monotonic() - run['start']
+            label = run['target']['label']
             
-            except Exception as e:
-                print(f"✗ ({e})")
+            if run['proc'].returncode == 0:
+                info = self.projects[run['name']]
+                self._record_build(info, run['target'], 'compile')
+                self._record_build(info, run['target'], 'simulate')
+                print(f"[{datetime.now():%H:%M:%S}] ✓ {label} 成功 ({elapsed:.2f}s)")
+                return
+        finally:
+            run['lock'].release()
         
-        print("\n清理完成\n")
+        print(f"[{datetime.now():%H:%M:%S}] ✗ {label} 失败 (日志: {run['log_file']})")
+        lines = run['log_file'].read_text(encoding='utf-8', errors='ignore').splitlines()
+        for line in lines[-10:]:
+            print(f"  {line}")
+    
+    def watch(self, debounce=0.3, polling=False):
+        """
+        监视项目源文件，保存后自动重新编译并仿真受影响的 testbench
+        Args:
+            debounce: 最后一次文件变化后等待的秒数，连续保存只触发一次构建
+            polling: 强制使用轮询代替 inotify
+        """
+        from verilog_watch import create_watcher, InotifyWatcher
+        from verilog_lock import ProjectBusy
+        
+        def relevant(path):
+            return path.name in BUILD_CONFIG_FILES or path.suffix in HDL_SUFFIXES
+        
+        watcher = create_watcher(self.watch_roots(), match=relevant, polling=polling)
+        mode = 'inotify' if isinstance(watcher, InotifyWatcher) else '轮询'
+        print(f"\n监视 {len(self.projects)} 个项目 ({mode})，按 Ctrl+C 退出\n")
+        
+        changed = set()
+        full_rescan = False
+        last_event = 0.0
+        queue = []      # 等待运行的 (项目名, 目标)
+        running = None  # 正在运行的编译/仿真
+        busy_since = {}  # 因项目锁而等待的目标 {标签: 开始等待的时间}
+        
+        try:
+            while True:
+                if changed or full_rescan:
+                    timeout = max(0.0, debounce - (time.monotonic() - last_event))
+                elif running or queue:
+                    timeout = 0.1
+                else:
+                    timeout = None
+                
+                events = watcher.wait(timeout)
+                if events is None:
+                    full_rescan = True  # inotify 事件队列溢出，全部重新检查
+                    last_event = time.monotonic()
+                elif events:
+                    changed.update(events)
+                    last_event = time.monotonic()
+                
+                # 去抖：最后一次变化之后 debounce 秒内没有新的变化才开始构建
+                if (changed or full_rescan) and time.monotonic() - last_event >= debounce:
+                    for info in self.projects.values():
+                        info.pop('graph', None)
+                        info.pop('targets', None)
+                    if full_rescan:
+                        selected = {name: self.get_build_targets(name) for name in self.projects}
+                    else:
+                        selected = self.select_affected({p.resolve() for p in changed})
+                    changed = set()
+                    full_rescan = False
+                    
+                    fresh = [(name, t) for name, targets in selected.items() for t in targets]
+                    labels = {t['label'] for _, t in fresh}
+                    if running and running['target']['label'] in labels:
+                        print(f"[{datetime.now():%H:%M:%S}] ⚠ 源文件已更新，取消 {running['target']['label']}")
+                        self._cancel_watch_run(running)
+                        running = None
+                    queue = [(n, t) for n, t in queue if t['label'] not in labels] + fresh
+                
+                if running and running['proc'].poll() is not None:
+                    self._finish_watch_run(running)
+                    running = None
+                
+                # 按顺序启动第一个能取得项目锁的目标；被其他进程占用的目标按 --lock 策略继续等待或跳过
+                for item in list(queue) if running is None else []:
+                    label = item[1]['label']
+                    try:
+                        running = self._start_watch_run(*item)
+                    except ProjectBusy as e:
+                        now = time.monotonic()
+                        since = busy_since.setdefault(label, now)
+                        if self.lock_policy == 'wait' and (self.lock_timeout is None
+                                                           or now - since < self.lock_timeout):
+                            if since == now:
+                                print(f"[{datetime.now():%H:%M:%S}] ⚠ 等待 {label}（{e}）", flush=True)
+                            continue
+                        print(f"[{datetime.now():%H:%M:%S}] ⚠ 跳过 {label}（{e}）", flush=True)
+                    queue.remove(item)
+                    busy_since.pop(label, None)
+                    if running:
+                        break
+        
+        except KeyboardInterrupt:
+            if running:
+                self._cancel_watch_run(running)
+            print("\n退出监视")
+        finally:
+            watcher.close()
+    
+    def clean_all(self, jobs=None):
+        """清理所有项目的编译产物（含后端的中间产物目录）、波形、日志和临时文件（直接并行删除，不逐个调用 make clean）"""
+        from verilog_retention import collect_artifacts, delete_artifacts
+        from verilog_stats import format_size
+        
+        print("\n开始清理所有项目...\n")
+        
+        artifacts = collect_artifacts(self._artifact_dirs(), jobs)
+        reclaimed, errors, busy = delete_artifacts(artifacts, self._lock_by_name, jobs)
+        
+        project_of = {a['path']: a['project'] for a in artifacts}
+        failed = {}
+        for path, error in errors:
+            failed.setdefault(project_of[path], []).append((path, error))
+        for name in self.projects:
+            count = sum(1 for a in artifacts if a['project'] == name)
+            if name in busy:
+                print(f"清理 {name}... ⚠ 跳过（{busy[name]}）")
+            elif name in failed:
+                print(f"清理 {name}... ✗")
+                for path, error in failed[name]:
+                    print(f"  {path}: {error}")
+            else:
+                print(f"清理 {name}... ✓ ({count} 个文件)")
+        
+        print(f"\n清理完成，释放 {format_size(reclaimed)}\n")
+    
+    def _lock_by_name(self, name):
+        return self._project_lock(self.projects[name])
+    
+    def _artifact_dirs(self):
+        """各项目产物所在的目录：{项目名: [项目目录, 构建目录]}"""
+        return {name: [info['path'], self.build_dir(info)] for name, info in self.projects.items()}
+    
+    def _failing_artifacts(self, keep_failed):
+        """最近 keep_failed 个失败运行（最近一次仿真失败的目标）的产物路径"""
+        from verilog_retention import ARTIFACT_SUFFIXES
+        
+        history = self.history
+        if history is None or keep_failed <= 0:
+            return set()
+        
+        protected = set()
+        kept = 0
+        for row in history.latest_failures('simulate'):
+            if kept >= keep_failed:
+                break
+            if row['project'] not in self.projects:
+                continue  # 项目已删除
+            kept += 1
+            info = self.projects[row['project']]
+            output = next((t['output'] for t in self.get_build_targets(row['project'])
+                           if t['label'] == row['target']), row['project'])
+            for directory in {info['path'], self.build_dir(info)}:
+                if directory.is_dir():
+                    protected.update(p for p in directory.iterdir()
+                                     if p.name.startswith(output) and p.name.endswith(ARTIFACT_SUFFIXES))
+        return protected
+    
+    def enforce_retention(self, quota, keep_failed=3, dry_run=False, jobs=None):
+        """
+        按磁盘配额清理构建产物：超出配额时按最近使用时间删除最久未用的波形、.vvp 和日志
+        Args:
+            quota: 所有项目产物的总配额（字节）
+            keep_failed: 始终保留最近几个失败运行的产物
+            dry_run: 只列出将被删除的文件
+        Returns:
+            是否成功（删除出错时为 False）
+        """
+        from verilog_retention import collect_artifacts, delete_artifacts, plan_eviction
+        from verilog_stats import format_size
+        
+        artifacts = collect_artifacts(self._artifact_dirs(), jobs)
+        protected = self._failing_artifacts(keep_failed)
+        total = sum(a['bytes'] for a in artifacts)
+        evict, remaining = plan_eviction(artifacts, quota, protected)
+        
+        print(f"\n产物占用: {format_size(total)}（{len(artifacts)} 个文件），配额: {format_size(quota)}")
+        if protected:
+            print(f"保留最近失败运行（最多 {keep_failed} 个）的产物: {len(protected)} 个文件")
+        if not evict:
+            print("✓ 未超出配额，无需清理\n")
+            return True
+        
+        planned = sum(a['bytes'] for a in evict)
+        if dry_run:
+            for artifact in evict:
+                print(f"  - {artifact['path']} ({format_size(artifact['bytes'])})")
+            print(f"\n将删除 {len(evict)} 个文件，释放 {format_size(planned)}（--dry-run，未删除）\n")
+            return True
+        
+        reclaimed, errors, busy = delete_artifacts(evict, self._lock_by_name, jobs)
+        deleted = sum(1 for a in evict if a['project'] not in busy) - len(errors)
+        print(f"✓ 已删除 {deleted} 个最久未用的文件，释放 {format_size(reclaimed)}")
+        for path, error in errors:
+            print(f"  ✗ {path}: {error}")
+        for name, reason in busy.items():
+            print(f"  ⚠ 跳过 {name}（{reason}）")
+        if remaining > quota:
+            print(f"⚠ 保留的失败运行产物仍超出配额（{format_size(remaining)}）")
+        print()
+        return not errors
     
     def generate_report(self):
         """生成项目报告"""
+        from verilog_stats import ProjectStats, STATS_CACHE
+        
         report = {
             'timestamp': datetime.now().isoformat(),
             'total_projects': len(self.projects),
             'projects': {}
         }
         
-        for name, info in self.projects.items():
-            rtl_files = list(info['path'].glob('rtl/*.v'))
-            tb_files = list(info['path'].glob('sim/*_tb.v'))
-            
-            # 统计代码行数
-            rtl_lines = sum(len(open(f, encoding='utf-8', errors='ignore').readlines()) 
-                          for f in rtl_files)
-            tb_lines = sum(len(open(f, encoding='utf-8', errors='ignore').readlines()) 
-                         for f in tb_files)
-            
+        # 并行统计，行数按文件 (大小, 修改时间) 缓存
+        stats = ProjectStats(self.root / STATS_CACHE)
+        results = stats.collect({name: info['path'] for name, info in self.projects.items()},
+                                {name: self.build_dir(info) for name, info in self.projects.items()})
+        stats.save(prune=True)
+        
+        for name, result in results.items():
             report['projects'][name] = {
-                'rtl_files': len(rtl_files),
-                'tb_files': len(tb_files),
-                'rtl_lines': rtl_lines,
-                'tb_lines': tb_lines,
-                'vcd_file': (info['path'] / f"{name}.vcd").exists()
+                'rtl_files': len(result['rtl']),
+                'tb_files': len(result['tb']),
+                'rtl_lines': result['rtl_lines'],
+                'tb_lines': result['tb_lines'],
+                'vcd_file': any(Path(w).name == f"{name}.vcd" for w in result['waves']),
+                'vvp_bytes': result['vvp_bytes'],
+                'wave_bytes': result['wave_bytes'],
+                'disk_usage': result['disk_usage'],
             }
+        report['total_disk_usage'] = sum(r['disk_usage'] for r in results.values())
         
         # 保存报告
-        report_file = Path('project_report.json')
+        report_file = self.root / 'project_report.json'
         with open(report_file, 'w', encoding='utf-8') as f:
             json.dump(report, f, indent=2, ensure_ascii=False)
         
@@ -185,11 +1474,16 @@ class VerilogProjectManager:
     
     def show_project_details(self, project_name):
         """显示项目详细信息"""
+        from verilog_stats import ProjectStats, STATS_CACHE, format_size
+        
         if project_name not in self.projects:
             print(f"✗ 项目 '{project_name}' 不存在")
             return
         
         info = self.projects[project_name]
+        stats = ProjectStats(self.root / STATS_CACHE)
+        result = stats.project(info['path'], self.build_dir(info))
+        stats.save()
         
         print(f"\n{'='*70}")
         print(f"项目: {project_name}")
@@ -198,31 +1492,34 @@ class VerilogProjectManager:
         print(f"路径: {info['path']}\n")
         
         # RTL 文件
-        rtl_files = list(info['path'].glob('rtl/*.v'))
-        if rtl_files:
+        if result['rtl']:
             print("RTL 文件:")
-            for f in rtl_files:
-                lines = len(open(f, encoding='utf-8', errors='ignore').readlines())
-                print(f"  - {f.name} ({lines} 行)")
+            for name, lines in result['rtl'].items():
+                print(f"  - {name} ({lines} 行)")
         
         # Testbench 文件
-        tb_files = list(info['path'].glob('sim/*_tb.v'))
-        if tb_files:
+        if result['tb']:
             print("\nTestbench 文件:")
-            for f in tb_files:
-                lines = len(open(f, encoding='utf-8', errors='ignore').readlines())
-                print(f"  - {f.name} ({lines} 行)")
+            for name, lines in result['tb'].items():
+                print(f"  - {name} ({lines} 行)")
+        
+        # 编译产物和波形文件
+        if result['vvp_bytes']:
+            print(f"\n编译产物: {format_size(result['vvp_bytes'])}")
+        if result['waves']:
+            print("\n波形文件:")
+            for name in result['waves']:
+                print(f"  - {name} ({format_size((info['path'] / name).stat().st_size)})")
         
-        # VCD 文件
-        vcd_file = info['path'] / f"{project_name}.vcd"
-        if vcd_file.exists():
-            size_kb = vcd_file.stat().st_size / 1024
-            print(f"\n波形文件: {vcd_file.name} ({size_kb:.1f} KB)")
+        print(f"\n磁盘占用: {format_size(result['disk_usage'])}")
         
         print(f"\n{'='*70}\n")
 
 
-def main():
+def build_parser():
+    import argparse
+    from verilog_backends import BACKENDS
+    
     parser = argparse.ArgumentParser(
         description='Verilog 项目管理工具',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -231,31 +1528,176 @@ def main():
   python manage_verilog_projects.py list       # 列出所有项目
   python manage_verilog_projects.py compile    # 编译所有项目
   python manage_verilog_projects.py simulate   # 仿真所有项目
+  python manage_verilog_projects.py simulate --shards 4  # 每个项目分4片并行仿真
+  python manage_verilog_projects.py compile --incremental  # 只重新编译依赖有变化的 testbench
+  python manage_verilog_projects.py compile --jobs 8       # 8 个编译任务并行
+  python manage_verilog_projects.py deps [name] # 显示模块依赖并更新 sources.mk
+  python manage_verilog_projects.py simulate --changed-since origin/main  # 只跑受修改影响的项目
+  python manage_verilog_projects.py list --changed-since HEAD~1 --dry-run # 只列出会被选中的项目
+  python manage_verilog_projects.py watch      # 保存后自动重新编译并仿真受影响的 testbench
+  python manage_verilog_projects.py daemon &   # 启动守护进程，之后的命令自动由它执行
+  python manage_verilog_projects.py daemon --stop  # 停止守护进程
+  python manage_verilog_projects.py coordinator --address :7460  # 多节点回归：分发项目任务
+  python manage_verilog_projects.py worker --address host:7460 --slots 4  # 在各节点上运行
   python manage_verilog_projects.py clean      # 清理所有项目
+  python manage_verilog_projects.py prune --quota 50G --keep-failed 5  # 超出配额时删除最久未用的产物
+  python manage_verilog_projects.py simulate --build-dir /dev/shm/vbuild --copy-failed-waves  # 产物放在 tmpfs
+  python manage_verilog_projects.py simulate --lock skip  # 跳过正被其他管理器进程使用的项目
+  python manage_verilog_projects.py simulate --backend verilator  # 本次运行使用 Verilator 仿真
+  python manage_verilog_projects.py simulate --precheck --jobs 16  # 先并行做语法预检，排除有语法错误的项目
+  python manage_verilog_projects.py simulate --mem-limit 4G --cpu-time-limit 600  # 限制每个仿真进程的资源
+  python manage_verilog_projects.py compile --jobs 8 --pin-cpus 2  # 每个并行任务绑定 2 个专用核心
   python manage_verilog_projects.py report     # 生成项目报告
   python manage_verilog_projects.py show <name> # 显示项目详情
+  python manage_verilog_projects.py history --query regressions  # 查询运行历史
+  python manage_verilog_projects.py simulate --perf-gate 10  # 仿真吞吐量比基线下降超过10%时失败
+  python manage_verilog_projects.py simulate --no-result-cache  # 不复用缓存的仿真结论，全部重新运行
+  python manage_verilog_projects.py simulate --format jsonl > results.jsonl  # 逐条输出 JSON 结果记录
         '''
     )
     
-    parser.add_argument('command', choices=['list', 'compile', 'simulate', 'clean', 'report', 'show'],
+    parser.add_argument('command',
+                       choices=['list', 'compile', 'simulate', 'clean', 'report', 'show', 'deps', 'watch', 'daemon',
+                                'coordinator', 'worker', 'history', 'prune'],
                        help='执行的命令')
-    parser.add_argument('project_name', nargs='?', help='项目名称（仅用于 show 命令）')
+    parser.add_argument('project_name', nargs='?', help='项目名称（用于 show / deps 命令）')
+    parser.add_argument('--shards', type=int, default=1,
+                       help='仿真分片数：用同一个编译产物并行启动多个仿真进程（默认: 1）')
+    parser.add_argument('--incremental', action='store_true',
+                       help='只编译/仿真传递依赖有变化的 testbench')
+    parser.add_argument('--jobs', type=int, default=1,
+                       help='并行编译数（守护进程中为常驻线程池大小，默认: CPU 数）')
+    parser.add_argument('--changed-since', metavar='REV',
+                       help='只处理受 git diff REV 中的修改影响的项目及其依赖方')
+    parser.add_argument('--dry-run', action='store_true',
+                       help='与 --changed-since 一起使用：只列出选中的项目，不执行命令；'
+                            'prune：只列出将被删除的文件')
+    parser.add_argument('--debounce', type=float, default=0.3,
+                       help='watch 模式：最后一次保存后等待的秒数（默认: 0.3）')
+    parser.add_argument('--polling', action='store_true',
+                       help='watch / daemon 模式：使用轮询代替 inotify')
+    parser.add_argument('--stop', action='store_true', help='daemon 命令：停止守护进程')
+    parser.add_argument('--no-daemon', action='store_true',
+                       help='不使用守护进程，在当前进程中执行命令')
+    parser.add_argument('--address', default=':7460',
+                       help='coordinator / worker：协调器地址 host:port 或 unix:路径（默认: :7460）')
+    parser.add_argument('--slots', type=int, default=1,
+                       help='worker：本节点并行执行的项目任务数（默认: 1）')
+    parser.add_argument('--worker-name', help='worker：节点名（默认: 主机名:进程号）')
+    parser.add_argument('--max-attempts', type=int, default=3,
+                       help='coordinator：节点丢失时一个任务最多分配的次数（默认: 3）')
+    parser.add_argument('--format', choices=['text', 'jsonl'], default='text',
+                       help='compile/simulate：jsonl 时每完成一个目标的一个阶段就向标准输出写一条 JSON 记录'
+                            '（进度信息改到标准错误）')
+    parser.add_argument('--no-result-cache', action='store_true',
+                       help='simulate：不复用结果缓存，总是重新运行仿真')
+    parser.add_argument('--perf-gate', type=float, metavar='PCT',
+                       help='simulate：仿真吞吐量相对基线下降超过 PCT%% 时判定失败')
+    parser.add_argument('--update-baseline', action='store_true',
+                       help=f'simulate：用本次仿真吞吐量覆盖基线 {PERF_BASELINE}')
+    parser.add_argument('--query', choices=['slowest', 'regressions', 'flaky'], default='slowest',
+                       help='history：查询类型（默认: slowest）')
+    parser.add_argument('--phase', choices=['compile', 'simulate'], default='simulate',
+                       help='history：查询的阶段（默认: simulate）')
+    parser.add_argument('--limit', type=int, default=10, help='history：最多显示的条数')
+    parser.add_argument('--quota', help='prune：所有项目构建产物的磁盘配额，例如 500M、50G')
+    parser.add_argument('--keep-failed', type=int, default=3,
+                       help='prune：始终保留最近几个失败运行的产物（默认: 3）')
+    parser.add_argument('--build-dir', metavar='DIR',
+                       help='构建根目录：各项目的编译产物和波形写入 DIR/<项目名>（如 tmpfs 上的 /dev/shm/vbuild），'
+                            '默认使用 Makefile 中的 BUILD_DIR')
+    parser.add_argument('--copy-failed-waves', action='store_true',
+                       help='与 --build-dir 一起使用：把仿真失败的波形复制回项目目录')
+    parser.add_argument('--backend', choices=list(BACKENDS),
+                       help='仿真器后端（默认: 各项目 Makefile 中的 SIMULATOR）')
+    parser.add_argument('--precheck', action='store_true',
+                       help='compile / simulate：先并行做语法预检（如 iverilog -tnull），'
+                            '报告全部语法错误并排除有错误的目标')
+    parser.add_argument('--mem-limit', metavar='SIZE',
+                       help='每个仿真进程的地址空间上限（RLIMIT_AS），例如 4G')
+    parser.add_argument('--cpu-time-limit', type=float, metavar='SECONDS',
+                       help='每个仿真进程的 CPU 时间上限（RLIMIT_CPU）')
+    parser.add_argument('--pin-cpus', type=int, metavar='N',
+                       help='每个并行任务（编译、仿真、分片）绑定 N 个专用核心，并发数不超过核心组数')
+    parser.add_argument('--lock', choices=['wait', 'skip'], default='wait',
+                       help='项目正被其他管理器进程编译/仿真/清理时：wait 等待（默认）/ skip 跳过')
+    parser.add_argument('--lock-timeout', type=float, metavar='SECONDS',
+                       help='--lock wait 最多等待的秒数，超时后跳过该项目（默认: 一直等待）')
+    return parser
+
+
+def run_command(manager, args):
+    """
+    执行一条已解析的命令（命令行和守护进程共用）
+    Returns:
+        退出状态
+    """
+    import subprocess
     
-    args = parser.parse_args()
+    manager.build_root = args.build_dir
+    manager.copy_failed_waves = args.copy_failed_waves
+    manager.lock_policy = args.lock
+    manager.lock_timeout = args.lock_timeout
+    manager.backend_name = args.backend
+    if args.mem_limit or args.cpu_time_limit:
+        from verilog_retention import parse_size
+        try:
+            memory = parse_size(args.mem_limit) if args.mem_limit else None
+        except ValueError as e:
+            print(f"✗ {e}")
+            return 1
+        manager.limits = {'memory': memory, 'cpu_time': args.cpu_time_limit}
+    if manager.limits or args.pin_cpus:
+        from verilog_limits import check_limits
+        error = check_limits(manager.limits, args.pin_cpus)
+        if error:
+            print(f"✗ {error}")
+            return 1
+    if args.pin_cpus:
+        from verilog_limits import CorePool
+        manager.cores = CorePool(args.pin_cpus)
     
-    manager = VerilogProjectManager()
+    if args.changed_since:
+        try:
+            selected = manager.select_changed(args.changed_since)
+        except (RuntimeError, OSError, subprocess.TimeoutExpired) as e:
+            print(f"✗ 无法获取 git 修改列表: {e}")
+            return 1
+        manager.print_selection(args.changed_since, selected)
+        if args.dry_run:
+            return 0
+    
+    # 预检有语法错误时，其余目标仍然编译/仿真，但退出状态为失败
+    precheck_ok = True
+    if args.precheck and args.command in ('compile', 'simulate'):
+        precheck_ok = manager.precheck(jobs=args.jobs)
     
     if args.command == 'list':
         manager.list_projects()
     
     elif args.command == 'compile':
-        manager.compile_all()
+        if not manager.compile_all(incremental=args.incremental, jobs=args.jobs) or not precheck_ok:
+            return 1
     
     elif args.command == 'simulate':
-        manager.simulate_all()
+        if not manager.simulate_all(shards=args.shards, incremental=args.incremental,
+                                    perf_gate=args.perf_gate, update_baseline=args.update_baseline,
+                                    result_cache=not args.no_result_cache) or not precheck_ok:
+            return 1
     
     elif args.command == 'clean':
-        manager.clean_all()
+        manager.clean_all(jobs=args.jobs if args.jobs > 1 else None)
+    
+    elif args.command == 'prune':
+        from verilog_retention import parse_size
+        try:
+            quota = parse_size(args.quota or '')
+        except ValueError:
+            print("✗ prune 命令需要指定有效的 --quota，例如 --quota 50G")
+            return 1
+        if not manager.enforce_retention(quota, keep_failed=args.keep_failed, dry_run=args.dry_run,
+                                         jobs=args.jobs if args.jobs > 1 else None):
+            return 1
     
     elif args.command == 'report':
         manager.generate_report()
@@ -263,8 +1705,78 @@ def main():
     elif args.command == 'show':
         if not args.project_name:
             print("✗ show 命令需要指定项目名称")
-            sys.exit(1)
+            return 1
         manager.show_project_details(args.project_name)
+    
+    elif args.command == 'deps':
+        manager.show_dependencies(args.project_name)
+    
+    elif args.command == 'watch':
+        manager.watch(debounce=args.debounce, polling=args.polling)
+    
+    elif args.command == 'coordinator':
+        from verilog_cluster import Coordinator
+        coordinator = Coordinator(list(manager.projects), incremental=args.incremental,
+                                  max_attempts=args.max_attempts)
+        summary = coordinator.serve(args.address)
+        if summary['failed']:
+            return 1
+    
+    elif args.command == 'worker':
+        from verilog_cluster import run_worker
+        try:
+            count = run_worker(manager, args.address, slots=args.slots, name=args.worker_name)
+        except OSError as e:
+            print(f"✗ 无法连接协调器 {args.address}: {e}")
+            return 1
+        print(f"\n节点退出，共执行 {count} 个任务\n")
+    
+    elif args.command == 'history':
+        from verilog_history import print_query
+        if manager.history is None:
+            return 1
+        print_query(manager.history, args.query, phase=args.phase, limit=args.limit)
+    
+    elif args.command == 'daemon':
+        print("✗ 守护进程中不能再启动守护进程")
+        return 1
+    
+    return 0
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    
+    # 守护进程在运行时，除 watch 和多节点回归外的命令都交给它执行（项目索引和缓存已在内存中）；
+    # jsonl 输出需要区分标准输出和标准错误，也在本地执行
+    local_only = (args.command in ('watch', 'coordinator', 'worker')
+                  or (args.command == 'daemon' and not args.stop)
+                  or args.format == 'jsonl')
+    if not local_only and not args.no_daemon:
+        import verilog_daemon
+        code = verilog_daemon.forward(sys.argv[1:])
+        if code is not None:
+            sys.exit(code)
+        if args.command == 'daemon':
+            print("没有正在运行的守护进程")
+            return
+    
+    manager = VerilogProjectManager()
+    
+    if args.command == 'daemon':
+        from verilog_daemon import ManagerDaemon
+        daemon = ManagerDaemon(manager, run_command,
+                               jobs=args.jobs if args.jobs > 1 else None, polling=args.polling)
+        sys.exit(daemon.serve(parser.parse_args))
+    
+    if args.format == 'jsonl':
+        # 结果记录独占标准输出，便于下游逐行读取；人类可读的进度信息改到标准错误
+        manager.result_stream = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            sys.exit(run_command(manager, args))
+    
+    sys.exit(run_command(manager, args))
 
 
 if __name__ == '__main__':
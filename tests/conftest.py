@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""测试配置：各工具模块是仓库根目录下的独立脚本，把根目录加入导入路径"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""用 fake 后端（不需要任何仿真工具）走通 生成 -> 编译 -> 仿真 -> 结果缓存命中"""
+
+import shutil
+
+import pytest
+
+from verilog_api import Workspace
+
+
+pytestmark = pytest.mark.skipif(shutil.which('make') is None, reason='需要 make')
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    ws = Workspace(tmp_path, backend='fake')
+    ws.create('and_gate', 'a, b / y', backend='fake')
+    return ws
+
+
+def test_generate(workspace, tmp_path):
+    project = workspace.project('and_gate')
+    assert project.path == tmp_path / 'and_gate'
+    assert project.targets == ['and_gate']
+    assert project.backend == 'fake'
+    assert 'SIMULATOR ?= fake' in (project.path / 'Makefile').read_text()
+    with pytest.raises(FileExistsError):
+        workspace.create('and_gate', 'a / y')
+
+
+def test_compile(workspace):
+    project = workspace.project('and_gate')
+    run = project.compile()
+    assert run.ok and run.counts() == {'ok': 1}
+    # fake 后端的编译产物是源文件的拼接
+    image = project.path / 'and_gate.fake'
+    assert 'module and_gate' in image.read_text()
+
+    assert project.compile(incremental=True).counts() == {'skipped': 1}
+
+
+def test_simulate_then_cache_hit(workspace):
+    project = workspace.project('and_gate')
+    first = project.simulate()
+    assert first.ok
+    [result] = first
+    assert (result.phase, result.status, result.cached) == ('simulate', 'ok', False)
+    assert 'PASS: fake simulation' in (project.path / 'and_gate_sim.log').read_text()
+
+    # 编译产物、仿真参数和后端都没有变化：直接复用缓存的结论
+    [again] = project.simulate()
+    assert (again.status, again.cached) == ('ok', True)
+
+    [forced] = project.simulate(result_cache=False)
+    assert (forced.status, forced.cached) == ('ok', False)
+
+
+def test_source_change_misses_cache(workspace):
+    project = workspace.project('and_gate')
+    project.simulate()
+    rtl = project.path / 'rtl' / 'and_gate.v'
+    rtl.write_text(rtl.read_text() + '\n// changed\n')
+    [result] = project.simulate()
+    assert (result.status, result.cached) == ('ok', False)
+
+
+def test_workspace_runs_all_projects(workspace):
+    workspace.create('or_gate', 'a, b / y', backend='fake')
+    run = workspace.simulate(jobs=2)
+    assert sorted(r.project for r in run) == ['and_gate', 'or_gate']
+    assert run.ok and not run.failed
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""资源限制在 exec 之前生效"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from verilog_limits import CPU_GRACE, limit_command
+
+pytestmark = pytest.mark.skipif(os.name != 'posix' or not shutil.which('sh'), reason='需要 POSIX sh')
+
+_PROBE = ("import resource; print(*resource.getrlimit(resource.RLIMIT_AS), "
+          "*resource.getrlimit(resource.RLIMIT_CPU))")
+
+
+def test_limit_command_without_limits_is_unchanged():
+    assert limit_command(['make', 'simulate']) == ['make', 'simulate']
+
+
+def test_limits_are_inherited_by_the_command():
+    cmd = limit_command([sys.executable, '-c', _PROBE], memory=2 * 1024 ** 3, cpu_time=2.5)
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout.split()
+    assert [int(v) for v in out] == [2 * 1024 ** 3, 2 * 1024 ** 3, 3, 3 + CPU_GRACE]
+
+
+@pytest.mark.skipif(not shutil.which('taskset') or not hasattr(os, 'sched_getaffinity'), reason='需要 taskset')
+def test_cpu_affinity():
+    cpu = min(os.sched_getaffinity(0))
+    cmd = limit_command([sys.executable, '-c', 'import os; print(*os.sched_getaffinity(0))'], cpus=[cpu])
+    assert subprocess.run(cmd, capture_output=True, text=True, check=True).stdout.split() == [str(cpu)]
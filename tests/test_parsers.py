@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""编译诊断、仿真日志结论、容量和波形抽取的解析测试"""
+
+import pytest
+
+from verilog_backends import parse_diagnostics
+from verilog_results import LogVerdict
+from verilog_retention import parse_size
+from verilog_wave import extract, parse_time
+
+
+def test_parse_diagnostics_icarus_and_verilator():
+    text = ("rtl/top.v:12: syntax error\n"
+            "rtl/top.v:12: error: Invalid module item.\n"
+            "%Error: rtl/alu.v:7:3: Cannot find file containing module: 'adder'\n"
+            "%Error-PINMISSING: sim/tb.v:20:5: Cell has missing pin: 'clk'\n")
+    assert parse_diagnostics(text) == [
+        {'file': 'rtl/top.v', 'line': 12, 'message': 'syntax error'},
+        {'file': 'rtl/top.v', 'line': 12, 'message': 'error: Invalid module item.'},
+        {'file': 'rtl/alu.v', 'line': 7, 'message': "Cannot find file containing module: 'adder'"},
+        {'file': 'sim/tb.v', 'line': 20, 'message': "Cell has missing pin: 'clk'"},
+    ]
+
+
+def test_parse_diagnostics_ignores_warnings_and_noise():
+    text = ("rtl/top.v:3: warning: implicit definition of wire 'x'.\n"
+            "%Warning-WIDTH: rtl/top.v:4:9: Operator ASSIGN expects 8 bits\n"
+            "2 error(s) during elaboration.\n"
+            "%Error: Exiting due to 1 error(s)\n")
+    assert parse_diagnostics(text) == []
+
+
+def test_log_verdict_pass():
+    verdict = LogVerdict()
+    verdict.feed("PASS: case 1\nPASS: case 2\n")
+    verdict.close()
+    assert not verdict.failed
+    assert verdict.summary() == {'markers': {'pass': 2, 'fail': 0, 'error': 0, 'fatal': 0}, 'first_error': None}
+
+
+def test_log_verdict_split_lines_and_first_error():
+    verdict = LogVerdict()
+    # 一行可以被截断在任意位置，标记只匹配行首
+    verdict.feed("PASS: ok\n  FA")
+    verdict.feed("IL: mismatch at 30\nnote: FAIL is only a word here\nERROR: tb.v:9: boom")
+    verdict.close()
+    assert verdict.failed
+    assert verdict.counts == {'pass': 1, 'fail': 1, 'error': 1, 'fatal': 0}
+    assert verdict.first_error == 'FAIL: mismatch at 30'
+
+
+def test_log_verdict_fatal_only():
+    verdict = LogVerdict()
+    verdict.feed("FATAL: tb.v:5: $fatal")
+    verdict.close()
+    assert verdict.failed and verdict.counts['fatal'] == 1
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('4096', 4096),
+    ('500M', 500 * 1024 ** 2),
+    ('20G', 20 * 1024 ** 3),
+    ('1.5T', int(1.5 * 1024 ** 4)),
+    ('2k', 2048),
+    ('8 MiB', 8 * 1024 ** 2),
+    ('3GB', 3 * 1024 ** 3),
+])
+def test_parse_size(text, expected):
+    assert parse_size(text) == expected
+
+
+@pytest.mark.parametrize('text', ['', 'abc', '-1G', '10X'])
+def test_parse_size_invalid(text):
+    with pytest.raises(ValueError):
+        parse_size(text)
+
+
+VCD = """$date today $end
+$timescale 1ns $end
+$scope module tb $end
+$var wire 1 ! clk $end
+$var reg 4 " cnt [3:0] $end
+$scope module dut $end
+$var wire 1 # y $end
+$var wire 4 $ state [3:0] $end
+$upscope $end
+$upscope $end
+$enddefinitions $end
+#0
+$dumpvars
+0!
+b0 "
+x#
+b0 $
+$end
+#5
+1!
+#10
+0!
+b1 "
+1#
+#12
+0#
+#15
+1!
+$comment 1! inside a comment $end
+#20
+0!
+b10 "
+b11 $
+#25
+1!
+#30
+"""
+
+
+def _body(path):
+    """$enddefinitions 之后的内容"""
+    return path.read_text().split('$enddefinitions $end\n', 1)[1].split('\n')
+
+
+def test_parse_time():
+    assert parse_time('1500') == 1500
+    assert parse_time('10us', 10 ** 6) == 10000       # 时间单位 1ns
+    assert parse_time('2.5 ns', 10 ** 3) == 2500      # 时间单位 1ps
+    with pytest.raises(ValueError):
+        parse_time('10 parsecs')
+
+
+def test_extract_keeps_everything_by_default(tmp_path):
+    src, dst = tmp_path / 'full.vcd', tmp_path / 'view.vcd'
+    src.write_text(VCD)
+    result = extract(src, dst)
+    assert (result['signals'], result['kept'], result['end_time']) == (4, 4, 30)
+    assert '$var wire 4 $ state [3:0] $end' in dst.read_text()
+    assert _body(dst)[:6] == ['#0', '$dumpvars', '0!', 'b0 "', 'x#', 'b0 $']
+    assert _body(dst)[-2:] == ['#30', '']
+
+
+def test_extract_scope_and_window(tmp_path):
+    src, dst = tmp_path / 'full.vcd', tmp_path / 'view.vcd'
+    src.write_text(VCD)
+    result = extract(src, dst, scopes=['tb.dut'], start=11, end='22ns')
+    assert (result['kept'], result['end_time']) == (2, 22)
+    header = dst.read_text().split('$enddefinitions')[0]
+    assert 'clk' not in header and 'cnt' not in header
+    assert header.count('$scope') == 2 and header.count('$upscope') == 2
+    # 窗口之前的值作为初始值在窗口起点写出
+    assert _body(dst) == ['#11', '$dumpvars', '1#', 'b0 $', '$end', '#12', '0#', '#20', 'b11 $', '#22', '']
+
+
+def test_extract_signal_glob_and_resolution(tmp_path):
+    src, dst = tmp_path / 'full.vcd', tmp_path / 'view.vcd'
+    src.write_text(VCD)
+    extract(src, dst, signals=['tb.dut.y'], resolution='10ns')
+    # 10~19ns 内 y 的 1 -> 0 毛刺合并为区间终值，与已写出的值不同才写出
+    assert _body(dst) == ['#0', '$dumpvars', 'x#', '$end', '#10', '0#', '#30', '']
+
+
+def test_extract_rejects_non_vcd(tmp_path):
+    src, dst = tmp_path / 'bad.vcd', tmp_path / 'view.vcd'
+    src.write_text('not a waveform\n')
+    with pytest.raises(ValueError):
+        extract(src, dst)
+    assert not dst.exists()
+    assert list(tmp_path.iterdir()) == [src]
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""产物统计：只把工具生成的文件当作产物"""
+
+from verilog_retention import collect_artifacts
+
+
+def test_collect_artifacts_skips_user_files(tmp_path):
+    project = tmp_path / 'cnt'
+    (project / 'cnt_obj').mkdir(parents=True)
+    (project / 'cnt_obj' / 'Vcnt.o').write_bytes(b'x' * 100)
+    artifacts = ['cnt.vvp', 'cnt.vcd', 'cnt_sim.log', 'cnt.vvp.1234.tmp', 'cnt_sim.log.1234.5678.tmp']
+    user_files = ['design_notes.tmp', 'cnt.1234.tmp', 'notes.txt.99.tmp', '.Makefile.abc.tmp', 'README.md']
+    for name in artifacts + user_files:
+        (project / name).write_text('x')
+
+    found = {item['path'].name for item in collect_artifacts({'cnt': [project]})}
+    assert found == set(artifacts) | {'cnt_obj'}
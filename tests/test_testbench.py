@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""生成的 testbench：时钟和复位不作为数据位参与输入扫描"""
+
+from create_verilog_project import VerilogProjectGenerator
+
+
+def _testbench(signals):
+    generator = VerilogProjectGenerator('dut', signals, verbose=False)
+    return generator._generate_testbench_code()
+
+
+def test_sweep_excludes_clock_and_reset():
+    code = _testbench('clk, rst_n, en, [3:0] d / [3:0] q')
+    assert '{en, d} = i;' in code
+    assert 'sweep_count = 32;' in code
+    assert "rst_n = 1'b0;  // 复位有效" in code
+    assert "rst_n = 1'b1;  // 释放复位" in code
+    loop = code[code.index('for (i = shard'):]
+    assert "#5 clk = 1'b1;" in loop[:loop.index('end')]
+
+
+def test_combinational_sweep_is_unchanged():
+    code = _testbench('a, b / y')
+    assert '{a, b} = i;' in code
+    assert 'clk' not in code
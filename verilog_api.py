@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+编程接口
+在同一个 Python 进程中生成、编译和仿真项目，不必为每次操作启动解释器调用命令行脚本：
+Workspace 表示工作区（项目在首次访问时才扫描），Project 表示其中一个项目，
+每次编译/仿真返回一个 Run，其中每个目标一个 Result。各工具模块在首次用到时才导入
+用法:
+    from verilog_api import Workspace
+    ws = Workspace('tb_projects', backend='verilator')
+    run = ws.simulate(jobs=8)
+    for result in run.failed:
+        print(result.project, result.target, result.status, result.message)
+"""
+
+from pathlib import Path
+
+
+class Result:
+    """一个目标一个阶段（compile / simulate）的结果"""
+
+    def __init__(self, project, target, phase, status, elapsed=0, message='', cached=False):
+        """
+        Args:
+            status: ok / skipped（未变化，或项目被其他进程占用，此时 message 为原因）/
+                    failed / timeout / limit（超出资源限制）/ error
+            elapsed: 耗时（秒）
+            cached: 仿真结论是否来自结果缓存
+        """
+        self.project = project
+        self.target = target
+        self.phase = phase
+        self.status = status
+        self.elapsed = elapsed
+        self.message = message
+        self.cached = cached
+
+    @property
+    def ok(self):
+        """是否成功（跳过的目标不计为失败，与命令行一致）"""
+        return self.status in ('ok', 'skipped')
+
+    def __repr__(self):
+        return f"Result({self.target!r}, {self.phase!r}, {self.status!r})"
+
+
+class Run:
+    """一次编译或仿真操作的结果（每个目标一个 Result）"""
+
+    def __init__(self, phase, results):
+        self.phase = phase
+        self.results = list(results)
+
+    @property
+    def ok(self):
+        return all(result.ok for result in self.results)
+
+    @property
+    def failed(self):
+        return [result for result in self.results if not result.ok]
+
+    def counts(self):
+        """{状态: 目标数}"""
+        counts = {}
+        for result in self.results:
+            counts[result.status] = counts.get(result.status, 0) + 1
+        return counts
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    def __repr__(self):
+        return f"Run({self.phase!r}, {self.counts()})"
+
+
+class Project:
+    """工作区中的一个项目"""
+
+    def __init__(self, workspace, name):
+        self.workspace = workspace
+        self.name = name
+
+    @property
+    def _info(self):
+        return self.workspace.manager.projects[self.name]
+
+    @property
+    def path(self):
+        return self._info['path']
+
+    @property
+    def targets(self):
+        """编译目标（testbench）名称"""
+        return [target['label'] for target in self.workspace.manager.get_build_targets(self.name)]
+
+    @property
+    def backend(self):
+        """本次运行使用的仿真器后端名称"""
+        return self.workspace.manager.backend(self._info).name
+
+    def compile(self, incremental=False, timeout=30):
+        """
+        编译所有目标
+        Args:
+            incremental: 只编译依赖自上次成功编译以来有变化的目标
+        """
+        results = self.workspace.manager.compile_project(self.name, incremental=incremental, timeout=timeout)
+        return Run('compile', self._results('compile', results))
+
+    def simulate(self, incremental=False, result_cache=True, timeout=30):
+        """
+        编译并仿真所有目标
+        Args:
+            incremental: 只仿真依赖自上次成功仿真以来有变化的目标
+            result_cache: 是否复用结果缓存中的结论
+        """
+        results = self.workspace.manager.build_project(self.name, incremental=incremental,
+                                                       result_cache=result_cache, timeout=timeout)
+        return Run('simulate', self._results('simulate', results))
+
+    def reload(self):
+        """重新读取项目的文件列表（源文件增删之后调用）"""
+        self.workspace.manager.reload_project(self.name)
+
+    def _results(self, phase, results):
+        return [Result(self.name, r['label'], phase, r['status'], r['elapsed'], r['message'], r['cached'])
+                for r in results]
+
+    def __repr__(self):
+        return f"Project({self.name!r})"
+
+
+class Workspace:
+    """
+    工作区：包含多个项目的目录
+    管理器在首次使用时创建，项目在首次访问时扫描；同一个 Workspace 可以反复使用，
+    依赖图、编译目标和运行历史数据库在多次操作之间保留
+    """
+
+    def __init__(self, root='.', build_dir=None, backend=None, lock='wait', lock_timeout=None,
+                 limits=None):
+        """
+        Args:
+            root: 工作区目录
+            build_dir: 各项目的 .vvp 和波形写入 <build_dir>/<项目名>（见 --build-dir）
+            backend: 对所有项目使用的仿真器后端，默认使用各项目 Makefile 中的 SIMULATOR
+            lock: 项目被其他进程锁定时 wait 等待 / skip 跳过
+            lock_timeout: wait 策略最多等待的秒数
+            limits: 仿真进程的资源限制 {'memory': 字节, 'cpu_time': 秒}
+        """
+        self.root = Path(root)
+        self.build_dir = build_dir
+        self.backend = backend
+        self.lock = lock
+        self.lock_timeout = lock_timeout
+        self.limits = limits
+        self._manager = None
+
+    @property
+    def manager(self):
+        """底层的 VerilogProjectManager"""
+        if self._manager is None:
+            from manage_verilog_projects import VerilogProjectManager
+
+            manager = VerilogProjectManager(self.root)
+            manager.build_root = self.build_dir
+            manager.backend_name = self.backend
+            manager.lock_policy = self.lock
+            manager.lock_timeout = self.lock_timeout
+            manager.limits = self.limits
+            self._manager = manager
+        return self._manager
+
+    @property
+    def projects(self):
+        """{项目名: Project}"""
+        return {name: Project(self, name) for name in self.manager.projects}
+
+    def project(self, name):
+        """
+        按名称获取项目
+        Raises:
+            KeyError: 工作区中没有该项目
+        """
+        if name not in self.manager.projects:
+            raise KeyError(f"项目不存在: {name}")
+        return Project(self, name)
+
+    def refresh(self):
+        """下次访问时重新扫描工作区（外部进程增删项目之后调用）"""
+        self.manager.projects = None
+
+    def create(self, name, signals, regenerate=False, **options):
+        """
+        生成项目（见 create_verilog_project.py）
+        Args:
+            signals: 信号列表，如 "a, b / y"
+            regenerate: 项目已存在时重新生成（保留用户代码区域）；为 False 时项目已存在抛出 FileExistsError
+            options: VerilogProjectGenerator 的其他参数（lib_dirs、use_lib、backend）
+        """
+        from create_verilog_project import VerilogProjectGenerator
+
+        if not regenerate and (self.root / name).exists():
+            raise FileExistsError(f"项目已存在: {self.root / name}")
+        generator = VerilogProjectGenerator(name, signals, base_dir=self.root, verbose=False,
+                                            regenerate=regenerate, **options)
+        generator.generate_all()
+        self.manager.reload_project(name)
+        return Project(self, name)
+
+    def create_from_template(self, template, name=None, **params):
+        """
+        由模板生成项目（见 create_templates.py）
+        Args:
+            template: 模板名，如 counter
+            name: 项目名，默认由模板名和参数得出
+            params: 模板参数，如 width=32
+        Raises:
+            ValueError: 未知的模板或无效的参数
+        """
+        from create_templates import create_template_project, default_project_name
+
+        name = name or default_project_name(template, params)
+        create_template_project(name, template, params, base_dir=self.root, verbose=False)
+        self.manager.reload_project(name)
+        return Project(self, name)
+
+    def compile(self, names=None, incremental=False, jobs=1, timeout=30):
+        """
+        编译项目（默认为全部），jobs 个项目并行
+        """
+        return Run('compile', self._each(names, jobs, lambda p: p.compile(incremental=incremental,
+                                                                           timeout=timeout)))
+
+    def simulate(self, names=None, incremental=False, result_cache=True, jobs=1, timeout=30):
+        """
+        编译并仿真项目（默认为全部），jobs 个项目并行
+        """
+        return Run('simulate', self._each(names, jobs, lambda p: p.simulate(incremental=incremental,
+                                                                             result_cache=result_cache,
+                                                                             timeout=timeout)))
+
+    def _each(self, names, jobs, operation):
+        projects = [self.project(name) for name in (names if names is not None else self.manager.projects)]
+        if jobs <= 1 or len(projects) <= 1:
+            return [result for project in projects for result in operation(project)]
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            return [result for run in pool.map(operation, projects) for result in run]
+
+    def __repr__(self):
+        return f"Workspace({str(self.root)!r})"
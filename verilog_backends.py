@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+仿真器后端
+生成的 Makefile 和项目管理器通过后端接口编译和运行仿真，而不是固定使用 iverilog / vvp：
+Icarus（解释执行，默认）、Verilator（编译为本地可执行文件，大型设计快得多）和
+不需要任何仿真工具的 fake 后端（用于测试工具链本身）。后端可以按项目（Makefile 中的 SIMULATOR）
+或按运行（make SIMULATOR=... / manage_verilog_projects.py --backend ...）选择
+"""
+
+import re
+from abc import ABC, abstractmethod
+
+
+DEFAULT_BACKEND = 'icarus'
+
+# 编译器诊断信息：Icarus "文件:行: 信息"，Verilator "%Error: 文件:行:列: 信息"
+_DIAGNOSTIC_RE = re.compile(
+    r'^(?:%(?P<level>Error|Warning)[^:]*: )?(?P<file>[^\s:%][^:]*):(?P<line>\d+):(?:\d+:)? (?P<message>.+)$'
+)
+
+
+class Backend(ABC):
+    """
+    后端接口（缺少 makefile_vars / run_command 的子类在实例化时即报错）
+    makefile_vars() 定义 Makefile 中的 IMAGE（编译产物）、COMPILE_OUT（编译器写入的临时产物，
+    成功后改名为 IMAGE）、COMPILE_CMD 和 RUN_CMD（后接仿真参数）
+    """
+
+    name = None
+    description = ''
+    image_suffix = None     # 编译产物后缀
+    flags_var = None        # 额外编译选项的 make 变量（管理器通过它传入 include 目录）
+    version_command = None  # 获取仿真器版本的命令（计入结果缓存键）
+    artifact_dirs = ()      # 构建目录中 <名称><后缀> 形式的中间产物目录（清理和配额统计时整个删除）
+
+    @abstractmethod
+    def makefile_vars(self):
+        """Makefile 中定义 IMAGE / COMPILE_OUT / COMPILE_CMD / RUN_CMD 的文本"""
+
+    @abstractmethod
+    def run_command(self, image):
+        """直接运行编译产物的命令（分片仿真时由管理器启动，后接仿真参数）"""
+
+    def precheck_command(self, top, files, include_dirs=(), lib_dirs=()):
+        """只做语法检查、不生成编译产物的命令（在项目目录中运行）；不支持预检时为 None"""
+        return None
+
+
+class IcarusBackend(Backend):
+    name = 'icarus'
+    description = 'Icarus Verilog：iverilog 编译为 .vvp，由 vvp 解释执行'
+    image_suffix = '.vvp'
+    flags_var = 'IVERILOG_FLAGS'
+    version_command = ('vvp', '-V')
+
+    def makefile_vars(self):
+        return '''IMAGE = $(BUILD_DIR)/$(OUTPUT_NAME).vvp
+COMPILE_OUT = $(IMAGE).$$$$.tmp
+COMPILE_CMD = iverilog $(IVERILOG_FLAGS) $(addprefix -y ,$(LIB_DIRS)) -Y .v -s $(MODULE_NAME) -o $(COMPILE_OUT) $(VERILOG_FILES)
+RUN_CMD = vvp $(IMAGE)
+'''
+
+    def run_command(self, image):
+        return ['vvp', str(image)]
+
+    def precheck_command(self, top, files, include_dirs=(), lib_dirs=()):
+        return (['iverilog', '-tnull', '-Y', '.v']
+                + [f'-y{d}' for d in lib_dirs] + [f'-I{d}' for d in include_dirs]
+                + ['-s', top] + list(files))
+
+
+class VerilatorBackend(Backend):
+    name = 'verilator'
+    description = 'Verilator：--binary 编译为本地可执行文件（--trace 输出波形）'
+    image_suffix = '.vbin'
+    flags_var = 'VERILATOR_FLAGS'
+    version_command = ('verilator', '--version')
+    artifact_dirs = ('_obj',)
+
+    def makefile_vars(self):
+        # 中间文件放在 BUILD_DIR/<名称>_obj，可执行文件在同一文件系统内改名为 IMAGE
+        return '''VERILATOR_FLAGS ?=
+OBJ_DIR = $(BUILD_DIR)/$(OUTPUT_NAME)_obj
+IMAGE = $(BUILD_DIR)/$(OUTPUT_NAME).vbin
+COMPILE_OUT = $(OBJ_DIR)/$(OUTPUT_NAME)
+COMPILE_CMD = verilator --binary --timing --trace -Wno-fatal $(VERILATOR_FLAGS) $(addprefix -y ,$(LIB_DIRS)) +libext+.v --top-module $(MODULE_NAME) --Mdir $(OBJ_DIR) -o $(OUTPUT_NAME) $(VERILOG_FILES)
+RUN_CMD = $(IMAGE)
+'''
+
+    def run_command(self, image):
+        return [str(image)]
+
+    def precheck_command(self, top, files, include_dirs=(), lib_dirs=()):
+        return (['verilator', '--lint-only', '--timing', '-Wno-fatal', '+libext+.v']
+                + [f'-y{d}' for d in lib_dirs] + [f'-I{d}' for d in include_dirs]
+                + ['--top-module', top] + list(files))
+
+
+class FakeBackend(Backend):
+    name = 'fake'
+    description = 'fake：不调用仿真工具，编译产物为源文件的拼接，仿真只输出 PASS 和 $finish 时间'
+    image_suffix = '.fake'
+    flags_var = 'FAKE_FLAGS'
+    version_command = None
+
+    def makefile_vars(self):
+        return '''IMAGE = $(BUILD_DIR)/$(OUTPUT_NAME).fake
+COMPILE_OUT = $(IMAGE).$$$$.tmp
+COMPILE_CMD = cat $(VERILOG_FILES) > $(COMPILE_OUT)
+RUN_CMD = echo "PASS: fake simulation of $(MODULE_NAME)" && echo "$(MODULE_NAME): \\$$finish called at 0 (1ps)" && true
+'''
+
+    def run_command(self, image):
+        return ['sh', '-c', 'echo "PASS: fake simulation $*" && echo "fake: \\$finish called at 0 (1ps)"',
+                'fake']
+
+
+BACKENDS = {backend.name: backend for backend in (IcarusBackend(), VerilatorBackend(), FakeBackend())}
+
+# 所有后端的编译产物后缀（统计和清理时使用）
+IMAGE_SUFFIXES = tuple(backend.image_suffix for backend in BACKENDS.values())
+
+# 所有后端的中间产物目录后缀
+ARTIFACT_DIR_SUFFIXES = tuple(suffix for backend in BACKENDS.values() for suffix in backend.artifact_dirs)
+
+
+def get_backend(name=None):
+    """
+    按名称获取后端（None 为默认后端）
+    Raises:
+        ValueError: 未知的后端
+    """
+    try:
+        return BACKENDS[name or DEFAULT_BACKEND]
+    except KeyError:
+        raise ValueError(f"未知的仿真器后端: {name}（可选: {', '.join(BACKENDS)}）") from None
+
+
+def parse_diagnostics(text):
+    """
+    从编译器输出中提取错误（忽略警告）
+    Returns:
+        [{'file', 'line', 'message'}, ...]
+    """
+    errors = []
+    for line in text.splitlines():
+        m = _DIAGNOSTIC_RE.match(line.strip())
+        if not m:
+            continue
+        message = m.group('message').strip()
+        if m.group('level') == 'Warning' or (not m.group('level') and message.lower().startswith('warning')):
+            continue
+        errors.append({'file': m.group('file'), 'line': int(m.group('line')), 'message': message})
+    return errors
+
+
+def makefile_rules():
+    """Makefile 中按 SIMULATOR 选择各后端变量的条件块"""
+    blocks = []
+    for i, backend in enumerate(BACKENDS.values()):
+        keyword = 'ifeq' if i == 0 else 'else ifeq'
+        blocks.append(f"{keyword} ($(SIMULATOR),{backend.name})\n"
+                      f"# {backend.description}\n"
+                      f"{backend.makefile_vars()}")
+    blocks.append(f"else\n$(error Unknown SIMULATOR '$(SIMULATOR)', expected one of: {' '.join(BACKENDS)})\n"
+                  "endif\n")
+    return ''.join(blocks)
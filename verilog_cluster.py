@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多节点回归：协调器 / 工作节点
+协调器把项目作为任务分发给工作节点，工作节点在自己的工作区（共享存储或相同的检出）中
+编译并仿真项目，把结果实时发回；节点断开或心跳超时时，其未完成的任务重新排队
+
+协议：TCP（host:port）或 Unix socket（unix:路径）上的按行分隔 JSON 消息
+  worker -> coordinator: hello {worker, slots} / heartbeat / result {id, project, targets}
+  coordinator -> worker: job {id, project, incremental} / done
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+import socketserver
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+
+# 默认监听端口
+DEFAULT_PORT = 7460
+
+# 工作节点发送心跳的间隔，以及协调器判定节点丢失的超时（秒）
+HEARTBEAT_INTERVAL = 5
+HEARTBEAT_TIMEOUT = 30
+
+# 一个任务最多分配的次数（节点丢失时重新排队）
+MAX_ATTEMPTS = 3
+
+# 回归报告文件
+REGRESSION_REPORT = 'regression_report.json'
+
+
+def parse_address(address):
+    """
+    解析地址: "unix:/path/to.sock"、"host:port" 或 ":port"
+    Returns:
+        (地址族, socket 地址)
+    """
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[len('unix:'):]
+    host, _, port = address.rpartition(':')
+    return socket.AF_INET, (host or '0.0.0.0', int(port or DEFAULT_PORT))
+
+
+def _send(sock, message, lock=None):
+    data = (json.dumps(message, ensure_ascii=False) + '\n').encode('utf-8')
+    if lock:
+        with lock:
+            sock.sendall(data)
+    else:
+        sock.sendall(data)
+
+
+class _LineReader:
+    """带超时的按行读取（超时返回空字符串，连接断开抛出 ConnectionError）"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = b''
+
+    def readline(self, timeout):
+        self.sock.settimeout(timeout)
+        while b'\n' not in self.buffer:
+            try:
+                chunk = self.sock.recv(65536)
+            except socket.timeout:
+                return ''
+            if not chunk:
+                raise ConnectionError('连接已断开')
+            self.buffer += chunk
+        line, self.buffer = self.buffer.split(b'\n', 1)
+        return line.decode('utf-8', errors='replace')
+
+
+class _ReusableTCPServer(socketserver.ThreadingTCPServer):
+    """协调器重启时可以立即重新绑定同一端口（不修改标准库类的属性）"""
+
+    allow_reuse_address = True
+
+
+class Coordinator:
+    """分发项目任务并汇总结果"""
+
+    def __init__(self, projects, incremental=False, max_attempts=MAX_ATTEMPTS,
+                 heartbeat_timeout=HEARTBEAT_TIMEOUT):
+        """
+        Args:
+            projects: 需要回归的项目名列表
+            incremental: 工作节点只编译/仿真依赖有变化的 testbench
+            max_attempts: 一个任务最多分配的次数
+            heartbeat_timeout: 多久收不到节点的消息判定为节点丢失（秒）
+        """
+        self.incremental = incremental
+        self.max_attempts = max_attempts
+        self.heartbeat_timeout = heartbeat_timeout
+
+        self.jobs = {i: {'id': i, 'project': name, 'attempts': 0}
+                     for i, name in enumerate(projects)}
+        self.queue = deque(self.jobs)
+        self.in_flight = {}   # 任务ID -> 节点名
+        self.results = {}     # 项目名 -> 结果
+        self.workers = set()
+        self.requeued = 0
+        self.cond = threading.Condition()
+
+    def finished(self):
+        return not self.queue and not self.in_flight
+
+    def _take_job(self, worker):
+        with self.cond:
+            if not self.queue:
+                return None
+            job = self.jobs[self.queue.popleft()]
+            job['attempts'] += 1
+            self.in_flight[job['id']] = worker
+            return job
+
+    def _record(self, worker, message):
+        with self.cond:
+            job = self.jobs.get(message.get('id'))
+            if job is None or self.in_flight.get(job['id']) != worker:
+                return  # 已被重新分配的过期结果
+            del self.in_flight[job['id']]
+            self.results[job['project']] = {
+                'worker': worker,
+                'attempts': job['attempts'],
+                'targets': message.get('targets', []),
+            }
+            self.cond.notify_all()
+        self._print_result(worker, job['project'], message.get('targets', []))
+
+    def _print_result(self, worker, project, targets):
+        for target in targets:
+            status = target['status']
+            mark = {'ok': '✓ 成功', 'skipped': '✓ 未变化，跳过',
+                    'limit': '✗ 超出资源限制'}.get(status, f'✗ {status}')
+            if target.get('cached'):
+                mark += '（缓存结果）'
+            print(f"[{worker}] {target['label']}... {mark} ({target.get('elapsed', 0):.2f}s)", flush=True)
+            if target.get('message'):
+                print(f"  错误: {target['message']}")
+
+    def _worker_lost(self, worker, reason):
+        """节点丢失：未完成的任务重新排队，超过次数上限的记为失败"""
+        with self.cond:
+            self.workers.discard(worker)
+            for job_id, owner in list(self.in_flight.items()):
+                if owner != worker:
+                    continue
+                del self.in_flight[job_id]
+                job = self.jobs[job_id]
+                if job['attempts'] < self.max_attempts:
+                    self.queue.appendleft(job_id)
+                    self.requeued += 1
+                    print(f"⚠ 节点 {worker} 丢失（{reason}），任务 {job['project']} 重新排队", flush=True)
+                else:
+                    self.results[job['project']] = {
+                        'worker': worker,
+                        'attempts': job['attempts'],
+                        'targets': [{'label': job['project'], 'status': 'worker_lost',
+                                     'message': f"{job['attempts']} 次分配的节点都已丢失"}],
+                    }
+                    print(f"✗ 任务 {job['project']} 已分配 {job['attempts']} 次，放弃", flush=True)
+            self.cond.notify_all()
+
+    def handle_worker(self, sock):
+        """与一个工作节点通信，直到所有任务完成或节点丢失"""
+        reader = _LineReader(sock)
+        try:
+            hello = json.loads(reader.readline(self.heartbeat_timeout) or '{}')
+        except (ConnectionError, OSError, ValueError):
+            return
+        if hello.get('type') != 'hello':
+            return
+
+        requested = hello.get('worker') or f'worker{id(sock)}'
+        slots = max(1, int(hello.get('slots', 1)))
+        with self.cond:
+            # 重名的节点各自使用不同的名称：in_flight 按名称记录，重名会把两者的任务混在一起
+            worker = requested
+            suffix = 1
+            while worker in self.workers:
+                suffix += 1
+                worker = f'{requested}-{suffix}'
+            self.workers.add(worker)
+        if worker != requested:
+            print(f"⚠ 节点名 {requested} 已在使用，改为 {worker}", flush=True)
+        print(f"✓ 节点 {worker} 已连接（{slots} 个并行任务）", flush=True)
+
+        last_seen = time.monotonic()
+        try:
+            while True:
+                with self.cond:
+                    busy = sum(1 for owner in self.in_flight.values() if owner == worker)
+                    if self.finished():
+                        break
+                for _ in range(slots - busy):
+                    job = self._take_job(worker)
+                    if job is None:
+                        break
+                    _send(sock, {'type': 'job', 'id': job['id'], 'project': job['project'],
+                                 'incremental': self.incremental})
+
+                line = reader.readline(0.5)
+                if not line:
+                    if time.monotonic() - last_seen > self.heartbeat_timeout:
+                        raise TimeoutError(f'{self.heartbeat_timeout}s 内没有心跳')
+                    continue
+                last_seen = time.monotonic()
+
+                message = json.loads(line)
+                if message.get('type') == 'result':
+                    self._record(worker, message)
+
+            _send(sock, {'type': 'done'})
+        except (ConnectionError, TimeoutError, OSError, ValueError) as e:
+            self._worker_lost(worker, e)
+
+    def serve(self, address):
+        """
+        监听 address 并分发任务，直到所有任务完成
+        Returns:
+            汇总字典 {'success': [...], 'failed': [...], 'results': {...}}
+        """
+        family, addr = parse_address(address)
+        coordinator = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                coordinator.handle_worker(self.request)
+
+        if family == socket.AF_UNIX:
+            if os.path.exists(addr):
+                os.unlink(addr)
+            server = socketserver.ThreadingUnixStreamServer(addr, Handler)
+            bound = f'unix:{addr}'
+        else:
+            server = _ReusableTCPServer(addr, Handler)
+            bound = f'{server.server_address[0]}:{server.server_address[1]}'
+        server.daemon_threads = True
+
+        print(f"\n协调器监听 {bound}，共 {len(self.jobs)} 个项目任务\n", flush=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        start = time.time()
+        try:
+            with self.cond:
+                while not self.finished():
+                    self.cond.wait()
+            time.sleep(0.5)  # 让各节点收到 done 消息
+        finally:
+            server.shutdown()
+            server.server_close()
+            if family == socket.AF_UNIX and os.path.exists(addr):
+                os.unlink(addr)
+
+        return self.summarize(time.time() - start)
+
+    def summarize(self, elapsed):
+        """汇总结果并写入回归报告"""
+        success = []
+        failed = []
+        for result in self.results.values():
+            for target in result['targets']:
+                (success if target['status'] in ('ok', 'skipped') else failed).append(target['label'])
+
+        report = {
+            'timestamp': datetime.now().isoformat(),
+            'elapsed': round(elapsed, 3),
+            'workers': sorted({r['worker'] for r in self.results.values()}),
+            'requeued': self.requeued,
+            'success': len(success),
+            'failed': len(failed),
+            'projects': self.results,
+        }
+        with open(REGRESSION_REPORT, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        print(f"\n回归完成: {len(success)} 个成功, {len(failed)} 个失败 "
+              f"({len(report['workers'])} 个节点, 重新排队 {self.requeued} 次, {elapsed:.2f}s)")
+        for label in failed:
+            print(f"  ✗ {label}")
+        print(f"✓ 报告已保存到 {REGRESSION_REPORT}\n")
+
+        return {'success': success, 'failed': failed, 'results': self.results}
+
+
+def run_worker(manager, address, slots=1, name=None, connect_timeout=30):
+    """
+    作为工作节点连接协调器，执行分配的项目任务直到收到 done
+    Args:
+        manager: 本节点工作区的 VerilogProjectManager
+        address: 协调器地址
+        slots: 并行执行的任务数
+        name: 节点名（默认 主机名:进程号）
+        connect_timeout: 等待协调器启动的最长时间（秒）
+    Returns:
+        完成的任务数
+    """
+    family, addr = parse_address(address)
+    if family == socket.AF_INET and addr[0] == '0.0.0.0':
+        addr = ('127.0.0.1', addr[1])
+    name = name or f'{socket.gethostname()}:{os.getpid()}'
+
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            sock.connect(addr)
+            break
+        except OSError:
+            sock.close()
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+
+    send_lock = threading.Lock()
+    stop = threading.Event()
+    completed = 0
+    completed_lock = threading.Lock()
+
+    def heartbeat():
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                _send(sock, {'type': 'heartbeat'}, send_lock)
+            except OSError:
+                return
+
+    def run_job(job):
+        nonlocal completed
+        project = job['project']
+        if project not in manager.projects:
+            targets = [{'label': project, 'status': 'error', 'elapsed': 0,
+                        'message': f"节点 {name} 的工作区中没有项目 {project}"}]
+        else:
+            try:
+                targets = manager.build_project(project, incremental=job.get('incremental', False))
+            except Exception as e:
+                targets = [{'label': project, 'status': 'error', 'elapsed': 0, 'message': str(e)}]
+        _send(sock, {'type': 'result', 'id': job['id'], 'project': project, 'targets': targets}, send_lock)
+        # 只统计结果已发回协调器的任务（连接断开时发送失败，任务由协调器重新排队）
+        with completed_lock:
+            completed += 1
+        status = '✓' if all(t['status'] in ('ok', 'skipped') for t in targets) else '✗'
+        print(f"{status} {project}", flush=True)
+
+    with sock:
+        _send(sock, {'type': 'hello', 'worker': name, 'slots': slots}, send_lock)
+        print(f"✓ 已连接协调器 {address}（节点 {name}）", flush=True)
+        threading.Thread(target=heartbeat, daemon=True).start()
+
+        reader = _LineReader(sock)
+        with ThreadPoolExecutor(max_workers=slots) as pool:
+            try:
+                while True:
+                    line = reader.readline(None)
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        message = None
+                    if not isinstance(message, dict):
+                        print(f"⚠ 忽略无法解析的消息: {line.strip()[:80]}", flush=True)
+                        continue
+                    if message.get('type') == 'done':
+                        break
+                    if message.get('type') == 'job':
+                        pool.submit(run_job, message)
+            except ConnectionError:
+                print("⚠ 与协调器的连接已断开")
+            finally:
+                stop.set()
+
+    return completed
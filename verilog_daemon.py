@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Verilog 项目管理守护进程
+常驻内存保存项目索引、依赖图和构建状态，并保持一个常驻线程池，
+通过工作区中的 Unix socket 为 manage_verilog_projects.py 的各个命令提供服务；
+源文件的变化由 verilog_watch 监视，只让受影响项目的缓存失效
+"""
+
+import os
+import sys
+import copy
+import json
+import socket
+import threading
+import contextlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+
+# 守护进程 socket（相对工作区目录）
+DAEMON_SOCKET = Path('.vbuild') / 'manager.sock'
+
+# 响应流中输出文本与退出状态之间的分隔符
+_END_OF_OUTPUT = b'\0'
+
+
+class _SocketWriter:
+    """把 print 输出实时转发给客户端的类文件对象"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.closed = False
+
+    def write(self, text):
+        if text and not self.closed:
+            try:
+                self.conn.sendall(text.encode('utf-8'))
+            except OSError:
+                self.closed = True  # 客户端已断开，命令继续执行
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def _recv_line(conn):
+    data = b''
+    while not data.endswith(b'\n'):
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def forward(argv, timeout=None):
+    """
+    把命令转发给当前工作区的守护进程，输出实时打印到本地
+    Returns:
+        命令的退出状态；没有可用的守护进程时返回 None
+    """
+    if not hasattr(socket, 'AF_UNIX') or not DAEMON_SOCKET.exists():
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(DAEMON_SOCKET))
+    except OSError:
+        sock.close()
+        return None  # socket 文件残留，守护进程已退出
+
+    with sock:
+        sock.settimeout(timeout)
+        sock.sendall(json.dumps({'argv': argv}).encode('utf-8') + b'\n')
+
+        pending = b''
+        out = sys.stdout.buffer if hasattr(sys.stdout, 'buffer') else None
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            pending += chunk
+            # 退出状态之前的内容都是命令输出；保留末尾可能属于状态的部分
+            cut = pending.rfind(_END_OF_OUTPUT)
+            text, pending = (pending, b'') if cut < 0 else (pending[:cut], pending[cut:])
+            if text:
+                if out:
+                    out.write(text)
+                    out.flush()
+                else:
+                    print(text.decode('utf-8', errors='ignore'), end='', flush=True)
+
+    if not pending.startswith(_END_OF_OUTPUT):
+        print("✗ 守护进程连接中断")
+        return 1
+    try:
+        return json.loads(pending[1:].decode('utf-8'))['exit']
+    except (ValueError, KeyError):
+        return 1
+
+
+class ManagerDaemon:
+    """常驻的项目管理服务"""
+
+    def __init__(self, manager, run_command, jobs=None, polling=False):
+        """
+        Args:
+            manager: VerilogProjectManager 实例（常驻的项目索引和缓存）
+            run_command: run_command(manager, args) -> 退出状态，执行一条已解析的命令
+            jobs: 常驻线程池大小（编译等并行任务使用）
+            polling: 使用轮询代替 inotify 监视源文件
+        """
+        self.manager = manager
+        self.run_command = run_command
+        self.manager.pool = ThreadPoolExecutor(max_workers=jobs)
+        self.manager.history  # 打开运行历史数据库，各命令共用一个连接
+        self.polling = polling
+        self.lock = threading.Lock()  # 命令串行执行，避免多个客户端同时修改缓存
+        self.root_mtime = self._root_mtime()
+        self.stopping = threading.Event()
+
+    def _root_mtime(self):
+        return os.stat('.').st_mtime_ns
+
+    def _refresh(self):
+        """工作区根目录有项目增删时重新发现项目"""
+        mtime = self._root_mtime()
+        if mtime != self.root_mtime:
+            self.root_mtime = mtime
+            self.manager.projects = {}
+            self.manager.load_projects()
+
+    def _invalidate(self, changed):
+        """源文件变化时让相关项目的缓存失效（None 表示全部失效）"""
+        with self.lock:
+            projects = self.manager.projects
+            if changed is None:
+                owners = set(projects)
+            else:
+                owners = set()
+                for path in changed:
+                    owner = next((name for name, info in projects.items()
+                                  if info['path'].resolve() in path.parents), None)
+                    if owner is None:
+                        owners = set(projects)  # 共享库或外部RTL：可能影响任意项目
+                        break
+                    owners.add(owner)
+            for name in owners:
+                self.manager.reload_project(name)
+
+    def _watch_loop(self):
+        from verilog_watch import create_watcher
+        from manage_verilog_projects import BUILD_CONFIG_FILES, HDL_SUFFIXES
+
+        def relevant(path):
+            return path.name in BUILD_CONFIG_FILES or path.suffix in HDL_SUFFIXES
+
+        roots = None
+        watcher = None
+        while not self.stopping.is_set():
+            with self.lock:
+                new_roots = self.manager.watch_roots()
+            if new_roots != roots:
+                if watcher:
+                    watcher.close()
+                roots = new_roots
+                watcher = create_watcher(roots, match=relevant, polling=self.polling)
+            changed = watcher.wait(1.0)
+            if changed is None or changed:
+                self._invalidate(None if changed is None else {p.resolve() for p in changed})
+        if watcher:
+            watcher.close()
+
+    def _handle(self, conn, parse_args):
+        with conn:
+            try:
+                request = json.loads(_recv_line(conn).decode('utf-8'))
+            except ValueError:
+                return
+
+            writer = _SocketWriter(conn)
+            code = 0
+            with self.lock, contextlib.redirect_stdout(writer), contextlib.redirect_stderr(writer):
+                try:
+                    args = parse_args(request['argv'])
+                    if args.command == 'daemon' and args.stop:
+                        print("✓ 守护进程已停止")
+                        self.stopping.set()
+                    else:
+                        self._refresh()
+                        # 每条命令使用一个浅拷贝：--changed-since 等筛选不影响常驻的项目索引
+                        view = copy.copy(self.manager)
+                        view.projects = dict(self.manager.projects)
+                        view.selection = {}
+                        code = self.run_command(view, args) or 0
+                except SystemExit as e:
+                    code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                except Exception as e:
+                    print(f"✗ 守护进程执行命令时出错: {e}")
+                    code = 1
+
+            try:
+                conn.sendall(_END_OF_OUTPUT + json.dumps({'exit': code}).encode('utf-8'))
+            except OSError:
+                pass
+
+        if self.stopping.is_set():
+            # 唤醒 accept，让主循环退出
+            with contextlib.suppress(OSError), socket.socket(socket.AF_UNIX) as s:
+                s.connect(str(DAEMON_SOCKET))
+
+    def serve(self, parse_args):
+        """
+        在工作区的 Unix socket 上提供服务，直到收到 daemon --stop
+        Args:
+            parse_args: parse_args(argv) -> argparse.Namespace
+        """
+        if daemon_running():
+            print(f"✗ 守护进程已在运行: {DAEMON_SOCKET}")
+            return 1
+
+        DAEMON_SOCKET.parent.mkdir(exist_ok=True)
+        with contextlib.suppress(FileNotFoundError):
+            DAEMON_SOCKET.unlink()  # 上次异常退出残留的 socket
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(DAEMON_SOCKET))
+        server.listen(16)
+
+        threading.Thread(target=self._watch_loop, daemon=True).start()
+        print(f"✓ 守护进程已启动: {DAEMON_SOCKET}（{len(self.manager.projects)} 个项目）", flush=True)
+
+        try:
+            while not self.stopping.is_set():
+                conn, _ = server.accept()
+                if self.stopping.is_set():
+                    conn.close()
+                    break
+                threading.Thread(target=self._handle, args=(conn, parse_args), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            with contextlib.suppress(FileNotFoundError):
+                DAEMON_SOCKET.unlink()
+            self.manager.pool.shutdown(wait=False)
+        print("守护进程已退出")
+        return 0
+
+
+def daemon_running():
+    """当前工作区是否有正在运行的守护进程"""
+    if not hasattr(socket, 'AF_UNIX') or not DAEMON_SOCKET.exists():
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(DAEMON_SOCKET))
+        except OSError:
+            return False
+    return True
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Verilog 模块依赖分析工具
+扫描项目 rtl/ 和 sim/ 下的源文件，建立模块定义、模块实例化和 `include 的依赖图，
+用于自动生成编译文件列表，以及判断哪些 testbench 需要重新编译/仿真
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+from collections import deque
+from pathlib import Path
+
+from verilog_lock import atomic_write
+from verilog_ports import VerilogLexer
+
+
+# 扫描结果缓存（相对项目目录）
+DEPS_CACHE = Path('.vbuild') / 'deps.json'
+
+# 默认扫描的源码目录（相对项目目录）
+SOURCE_DIRS = ('rtl', 'sim')
+
+# 不可能是模块名的关键字（包括内置门级原语）
+VERILOG_KEYWORDS = {
+    'always', 'and', 'assign', 'automatic', 'begin', 'buf', 'bufif0', 'bufif1',
+    'case', 'casex', 'casez', 'cmos', 'deassign', 'default', 'defparam', 'disable',
+    'edge', 'else', 'end', 'endcase', 'endfunction', 'endgenerate', 'endmodule',
+    'endprimitive', 'endspecify', 'endtable', 'endtask', 'event', 'for', 'force',
+    'forever', 'fork', 'function', 'generate', 'genvar', 'highz0', 'highz1', 'if',
+    'initial', 'inout', 'input', 'integer', 'join', 'localparam', 'macromodule',
+    'module', 'nand', 'negedge', 'nmos', 'nor', 'not', 'notif0', 'notif1', 'or',
+    'output', 'parameter', 'pmos', 'posedge', 'primitive', 'pull0', 'pull1',
+    'pulldown', 'pullup', 'rcmos', 'real', 'realtime', 'reg', 'release', 'repeat',
+    'rnmos', 'rpmos', 'rtran', 'rtranif0', 'rtranif1', 'scalared', 'signed',
+    'small', 'specify', 'specparam', 'strong0', 'strong1', 'supply0', 'supply1',
+    'table', 'task', 'time', 'tran', 'tranif0', 'tranif1', 'tri', 'tri0', 'tri1',
+    'triand', 'trior', 'trireg', 'unsigned', 'vectored', 'wait', 'wand', 'weak0',
+    'weak1', 'while', 'wire', 'wor', 'xnor', 'xor', 'logic', 'bit', 'var',
+}
+
+
+def _is_name(token):
+    """token 是否可能是模块名/实例名"""
+    kind, text = token
+    return kind in ('ident', 'escaped') and text not in VERILOG_KEYWORDS
+
+
+def scan_source(path):
+    """
+    扫描单个源文件
+    Returns:
+        {'modules': [定义的模块], 'instances': [实例化的模块], 'includes': [`include 的文件名]}
+    """
+    modules = []
+    instances = set()
+    includes = []
+
+    with open(path, encoding='utf-8', errors='ignore') as f:
+        lexer = VerilogLexer(f)
+        window = deque(maxlen=3)  # 最近的3个 token
+
+        while True:
+            token = lexer.next_token()
+            if token is None:
+                break
+            kind, text = token
+
+            if kind == 'directive' and text == '`include':
+                target = lexer.next_token()
+                if target and target[0] == 'string':
+                    includes.append(target[1].strip('"'))
+                window.clear()
+                continue
+
+            if text in ('module', 'macromodule'):
+                name = lexer.next()
+                if name:
+                    modules.append(name)
+                window.clear()
+                continue
+
+            # 带参数的实例化: A #(...) u (...)
+            if text == '#' and window and _is_name(window[-1]):
+                instances.add(window[-1][1])
+            # 普通实例化: A u (...) 或实例数组 A u [3:0] (...)
+            elif text in ('(', '[') and len(window) >= 2 \
+                    and _is_name(window[-1]) and _is_name(window[-2]):
+                instances.add(window[-2][1])
+
+            window.append(token)
+
+    return {'modules': modules, 'instances': sorted(instances), 'includes': includes}
+
+
+def _stat_key(path):
+    """文件的 (大小, 修改时间) 指纹"""
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+class DependencyGraph:
+    """单个项目的模块依赖图"""
+
+    def __init__(self, project_dir, source_dirs=SOURCE_DIRS, extra_files=(), library_dirs=()):
+        """
+        Args:
+            project_dir: 项目目录
+            source_dirs: 需要扫描的源码目录（相对项目目录）
+            extra_files: 源码目录之外需要一起扫描的文件（如 Makefile 引用的已有RTL）
+            library_dirs: 共享IP库目录（iverilog -y），只用于解析项目中找不到定义的模块
+        """
+        self.project_dir = Path(project_dir)
+        self.source_dirs = [self.project_dir / d for d in source_dirs]
+        self.extra_files = [Path(f) for f in extra_files]
+        self.library_dirs = [Path(d) for d in library_dirs]
+        self.files = {}             # 文件路径 -> 扫描结果
+        self.module_files = {}      # 模块名 -> 定义该模块的文件
+        self.library_files = set()  # 来自共享IP库的文件（编译时由 iverilog -y 解析，不放入文件列表）
+        self.missing = {}           # 文件路径 -> 找不到定义的实例化模块
+        self._content_hashes = {}   # 文件路径 -> (stat, 内容哈希)
+
+    @classmethod
+    def scan(cls, project_dir, source_dirs=SOURCE_DIRS, extra_files=(), library_dirs=()):
+        """扫描项目并建立依赖图；未变化的文件直接使用缓存的扫描结果"""
+        graph = cls(project_dir, source_dirs, extra_files, library_dirs)
+        graph._load()
+        return graph
+
+    def _load(self):
+        # 项目文件优先，与 iverilog 只在找不到模块定义时才搜索 -y 目录的行为一致
+        self._scan_files(self._source_files(), self.project_dir)
+        for lib_dir in self.library_dirs:
+            if lib_dir.is_dir():
+                # iverilog -y 不递归子目录；库的扫描缓存放在库目录下，由所有项目共享
+                lib_files = sorted(lib_dir.glob('*.v'))
+                self._scan_files(lib_files, lib_dir)
+                self.library_files.update(lib_files)
+
+        for path, entry in self.files.items():
+            missing = [m for m in entry['instances'] if m not in self.module_files]
+            if missing:
+                self.missing[path] = missing
+
+    def _scan_files(self, paths, cache_root):
+        """扫描一组文件，扫描结果缓存在 cache_root/.vbuild/deps.json"""
+        cache_file = cache_root / DEPS_CACHE
+        try:
+            cache = json.loads(cache_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            cache = {}
+
+        new_cache = {}
+        for path in paths:
+            key = os.path.relpath(path, cache_root)
+            stat = _stat_key(path)
+            entry = cache.get(key)
+            if not entry or entry['stat'] != stat:
+                entry = {'stat': stat, **scan_source(path)}
+            new_cache[key] = entry
+            self.files[path] = entry
+            for module in entry['modules']:
+                self.module_files.setdefault(module, path)
+
+        if new_cache != cache:
+            try:
+                cache_file.parent.mkdir(exist_ok=True)
+                # 共享库的缓存由多个项目和线程同时写入，先写临时文件再改名，读取者不会看到写了一半的文件
+                atomic_write(cache_file, json.dumps(new_cache, ensure_ascii=False))
+            except OSError:
+                pass  # 缓存写入失败不影响结果
+
+    def _source_files(self):
+        """需要扫描的所有源文件"""
+        files = []
+        for source_dir in self.source_dirs:
+            if source_dir.is_dir():
+                files.extend(sorted(source_dir.rglob('*.v')))
+        for path in self.extra_files:
+            if path.is_file() and path.resolve() not in {f.resolve() for f in files}:
+                files.append(path)
+        return files
+
+    def resolve_include(self, including_file, name):
+        """解析 `include 文件：先找包含它的文件所在目录，再找各源码目录和项目根目录"""
+        for base in [Path(including_file).parent, *self.source_dirs, self.project_dir]:
+            candidate = base / name
+            if candidate.is_file():
+                return candidate
+        return None
+
+    def dependencies(self, top_file):
+        """
+        计算 top_file 的传递依赖
+        Returns:
+            (源文件列表（top_file 在最后）, `include 文件列表)
+        """
+        top_file = Path(top_file)
+        sources = []
+        includes = []
+        visited = set()
+        pending = [top_file]
+
+        while pending:
+            path = pending.pop()
+            if path in visited:
+                continue
+            visited.add(path)
+
+            entry = self.files.get(path)
+            if entry is None:
+                continue
+            if path != top_file:
+                sources.append(path)
+
+            for name in entry['includes']:
+                included = self.resolve_include(path, name)
+                if included and included not in includes:
+                    includes.append(included)
+            for module in entry['instances']:
+                dep = self.module_files.get(module)
+                if dep is not None and dep not in visited:
+                    pending.append(dep)
+
+        return sorted(sources) + [top_file], includes
+
+    def testbenches(self):
+        """项目中的 testbench 文件（sim/*_tb.v）"""
+        return sorted(p for p in self.files
+                      if p.parent == self.project_dir / 'sim' and p.name.endswith('_tb.v'))
+
+    def top_module(self, tb_file):
+        """testbench 文件中的顶层模块：文件内没有被实例化的第一个模块"""
+        entry = self.files[Path(tb_file)]
+        instantiated = set(entry['instances'])
+        for module in entry['modules']:
+            if module not in instantiated:
+                return module
+        return entry['modules'][0] if entry['modules'] else Path(tb_file).stem
+
+    def fingerprint(self, files):
+        """一组文件的指纹（基于大小和修改时间），任一文件变化时指纹随之变化"""
+        digest = hashlib.sha1()
+        for path in sorted(str(f) for f in files):
+            try:
+                stat = _stat_key(path)
+            except OSError:
+                stat = None
+            digest.update(f"{path}:{stat}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def content_hash(self, files):
+        """一组文件内容的哈希（未变化的文件不重新读取）"""
+        digest = hashlib.sha1()
+        for path in sorted(str(f) for f in files):
+            try:
+                stat = _stat_key(path)
+            except OSError:
+                digest.update(f"{path}:missing\n".encode('utf-8'))
+                continue
+            cached = self._content_hashes.get(path)
+            if cached is None or cached[0] != stat:
+                with open(path, 'rb') as f:
+                    cached = (stat, hashlib.sha1(f.read()).hexdigest())
+                self._content_hashes[path] = cached
+            digest.update(f"{path}:{cached[1]}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def affected_testbenches(self, changed_files):
+        """返回传递依赖中包含任一 changed_files 的 testbench"""
+        changed = {Path(f).resolve() for f in changed_files}
+        affected = []
+        for tb in self.testbenches():
+            sources, includes = self.dependencies(tb)
+            if any(Path(f).resolve() in changed for f in sources + includes):
+                affected.append(tb)
+        return affected
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Verilog 模块依赖分析工具',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+示例:
+  # 显示项目中每个 testbench 的编译文件列表
+  python verilog_deps.py my_project
+  
+  # 同时从共享IP库解析模块
+  python verilog_deps.py my_project -y ip_lib
+        '''
+    )
+    parser.add_argument('project_dir', help='项目目录')
+    parser.add_argument('-y', '--lib-dir', action='append', default=[],
+                        help='共享IP库目录（可多次指定）')
+
+    args = parser.parse_args()
+
+    if not Path(args.project_dir).is_dir():
+        print(f"✗ 目录不存在: {args.project_dir}")
+        sys.exit(1)
+
+    graph = DependencyGraph.scan(args.project_dir, library_dirs=args.lib_dir)
+    for tb in graph.testbenches():
+        sources, includes = graph.dependencies(tb)
+        print(f"{tb} (顶层: {graph.top_module(tb)})")
+        for f in sources:
+            print(f"  * {f} (library)" if f in graph.library_files else f"  - {f}")
+        for f in includes:
+            print(f"  + {f} (include)")
+    for path, modules in graph.missing.items():
+        print(f"⚠ {path}: 找不到模块定义 {', '.join(modules)}")
+
+
+if __name__ == '__main__':
+    main()
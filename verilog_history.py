@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+编译/仿真运行历史数据库
+每次 compile / simulate 的状态、耗时、资源占用、产物大小和源文件哈希都记录到工作区的 SQLite 数据库，
+并提供最慢项目、耗时回归和不稳定（时过时不过）项目的查询
+"""
+
+import os
+import re
+import sys
+import time
+import signal
+import socket
+import sqlite3
+import argparse
+import threading
+import subprocess
+import statistics
+from datetime import datetime
+from pathlib import Path
+
+
+# 历史数据库（相对工作区目录）
+HISTORY_DB = Path('.vbuild') / 'history.db'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at     TEXT NOT NULL,
+    project        TEXT NOT NULL,
+    target         TEXT NOT NULL,
+    phase          TEXT NOT NULL,
+    status         TEXT NOT NULL,
+    duration       REAL,
+    cpu_user       REAL,
+    cpu_sys        REAL,
+    max_rss_kb     INTEGER,
+    artifact_bytes INTEGER,
+    source_hash    TEXT,
+    host           TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_target ON runs (project, target, phase, id);
+'''
+
+# 后续版本增加的列（打开旧数据库时自动补上）
+_ADDED_COLUMNS = {
+    'sim_time_ns': 'REAL',
+    'log_lines': 'INTEGER',
+}
+
+# Icarus 仿真结束信息，例如 "tb.v:10: $finish called at 1000000 (1ps)"
+_FINISH_RE = re.compile(r'\$(?:finish|stop) called at (\d+) \((\d+)(s|ms|us|ns|ps|fs)\)')
+
+_UNIT_NS = {'s': 1e9, 'ms': 1e6, 'us': 1e3, 'ns': 1.0, 'ps': 1e-3, 'fs': 1e-6}
+
+
+def parse_sim_output(text):
+    """
+    从仿真输出中提取仿真结束时间和日志行数
+    分片仿真的合并日志中有多个结束信息，仿真时间取总和（各分片的工作量之和）
+    Returns:
+        {'sim_time_ns': 仿真时间(ns) 或 None, 'log_lines': 行数}
+    """
+    sim_time_ns = None
+    for m in _FINISH_RE.finditer(text):
+        ns = int(m.group(1)) * int(m.group(2)) * _UNIT_NS[m.group(3)]
+        sim_time_ns = (sim_time_ns or 0) + ns
+    return {'sim_time_ns': sim_time_ns, 'log_lines': text.count('\n')}
+
+
+def run_measured(cmd, cwd=None, timeout=None, on_stdout=None):
+    """
+    运行命令并测量耗时和资源占用（POSIX 上通过 wait4 取得该进程树的 rusage）
+    Args:
+        on_stdout: on_stdout(line: bytes)，标准输出每读到一行调用一次（用于边运行边解析日志）
+    Returns:
+        {'returncode', 'stdout', 'stderr', 'timed_out', 'duration', 'cpu_user', 'cpu_sys', 'max_rss_kb'}
+        超时时 returncode 为 None
+    """
+    start = time.monotonic()
+    proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            start_new_session=(os.name == 'posix'))
+
+    # 在线程中读取输出，避免管道写满阻塞子进程；主线程用 wait4 回收以获得 rusage
+    output = {}
+
+    def read(key, f, callback):
+        if callback is None:
+            output[key] = f.read()
+            return
+        lines = []
+        for line in iter(f.readline, b''):
+            lines.append(line)
+            callback(line)
+        output[key] = b''.join(lines)
+
+    readers = [threading.Thread(target=read, args=(k, f, callback))
+               for k, f, callback in (('stdout', proc.stdout, on_stdout), ('stderr', proc.stderr, None))]
+    for reader in readers:
+        reader.start()
+
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        try:
+            if os.name == 'posix':
+                os.killpg(proc.pid, signal.SIGKILL)  # 连同 make 启动的 iverilog/vvp 一起结束
+            else:
+                proc.kill()
+        except ProcessLookupError:
+            pass
+
+    timer = threading.Timer(timeout, kill) if timeout else None
+    if timer:
+        timer.start()
+
+    usage = None
+    try:
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+        else:
+            proc.wait()
+    finally:
+        if timer:
+            timer.cancel()
+    for reader in readers:
+        reader.join()
+    proc.stdout.close()
+    proc.stderr.close()
+
+    # ru_maxrss: Linux 为 KB，macOS 为字节
+    max_rss = None
+    if usage is not None:
+        max_rss = usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+
+    return {
+        'returncode': None if timed_out.is_set() else proc.returncode,
+        'stdout': output.get('stdout', b''),
+        'stderr': output.get('stderr', b''),
+        'timed_out': timed_out.is_set(),
+        'duration': time.monotonic() - start,
+        'cpu_user': usage.ru_utime if usage else None,
+        'cpu_sys': usage.ru_stime if usage else None,
+        'max_rss_kb': max_rss,
+    }
+
+
+class RunHistory:
+    """运行历史数据库（线程安全）"""
+
+    def __init__(self, path=HISTORY_DB):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.executescript(_SCHEMA)
+            columns = {row['name'] for row in self.conn.execute('PRAGMA table_info(runs)')}
+            for column, sql_type in _ADDED_COLUMNS.items():
+                if column not in columns:
+                    self.conn.execute(f'ALTER TABLE runs ADD COLUMN {column} {sql_type}')
+
+    def record(self, project, target, phase, status, duration=None, cpu_user=None, cpu_sys=None,
+               max_rss_kb=None, artifact_bytes=None, source_hash=None, sim_time_ns=None,
+               log_lines=None):
+        """记录一次运行"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT INTO runs (started_at, project, target, phase, status, duration, cpu_user, '
+                'cpu_sys, max_rss_kb, artifact_bytes, source_hash, host, sim_time_ns, log_lines) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (datetime.now().isoformat(timespec='seconds'), project, target, phase, status,
+                 duration, cpu_user, cpu_sys, max_rss_kb, artifact_bytes, source_hash,
+                 socket.gethostname(), sim_time_ns, log_lines)
+            )
+
+    def _series(self, phase, status=None):
+        """按目标分组的运行记录（按时间顺序）"""
+        sql = 'SELECT * FROM runs WHERE phase = ?'
+        params = [phase]
+        if status:
+            sql += ' AND status = ?'
+            params.append(status)
+        with self.lock:
+            rows = self.conn.execute(sql + ' ORDER BY id', params).fetchall()
+        series = {}
+        for row in rows:
+            series.setdefault((row['project'], row['target']), []).append(row)
+        return series
+
+    def slowest(self, phase='simulate', limit=10, window=5):
+        """
+        最慢的目标：最近 window 次成功运行的平均耗时
+        Returns:
+            [{'project', 'target', 'runs', 'avg_duration', 'max_rss_kb'}, ...]
+        """
+        rows = []
+        for (project, target), runs in self._series(phase, 'ok').items():
+            recent = runs[-window:]
+            rss = [r['max_rss_kb'] for r in recent if r['max_rss_kb'] is not None]
+            rows.append({
+                'project': project,
+                'target': target,
+                'runs': len(recent),
+                'avg_duration': statistics.mean(r['duration'] for r in recent),
+                'max_rss_kb': max(rss) if rss else None,
+            })
+        rows.sort(key=lambda r: r['avg_duration'], reverse=True)
+        return rows[:limit]
+
+    def regressions(self, phase='simulate', window=5, threshold=1.2):
+        """
+        耗时回归：最近 window 次成功运行的中位数相对之前 window 次的中位数增长超过 threshold 倍
+        源文件哈希没有变化的回归更可能来自工具链或机器，而不是设计本身
+        Returns:
+            [{'project', 'target', 'before', 'after', 'ratio', 'sources_changed'}, ...]
+        """
+        rows = []
+        for (project, target), runs in self._series(phase, 'ok').items():
+            if len(runs) < 2 * window:
+                continue
+            before, after = runs[-2 * window:-window], runs[-window:]
+            before_median = statistics.median(r['duration'] for r in before)
+            after_median = statistics.median(r['duration'] for r in after)
+            if before_median <= 0 or after_median / before_median < threshold:
+                continue
+            rows.append({
+                'project': project,
+                'target': target,
+                'before': before_median,
+                'after': after_median,
+                'ratio': after_median / before_median,
+                'sources_changed': {r['source_hash'] for r in before} != {r['source_hash'] for r in after},
+            })
+        rows.sort(key=lambda r: r['ratio'], reverse=True)
+        return rows
+
+    def flaky(self, phase='simulate', window=20, min_flips=2):
+        """
+        不稳定的目标：最近 window 次运行中，源文件没有变化时结果在通过/失败之间切换至少 min_flips 次
+        Returns:
+            [{'project', 'target', 'runs', 'flips', 'pass_rate'}, ...]
+        """
+        rows = []
+        for (project, target), runs in self._series(phase).items():
+            recent = [r for r in runs[-window:] if r['status'] != 'skipped']
+            flips = sum(1 for a, b in zip(recent, recent[1:])
+                        if (a['status'] == 'ok') != (b['status'] == 'ok')
+                        and a['source_hash'] == b['source_hash'])
+            if flips < min_flips:
+                continue
+            rows.append({
+                'project': project,
+                'target': target,
+                'runs': len(recent),
+                'flips': flips,
+                'pass_rate': sum(r['status'] == 'ok' for r in recent) / len(recent),
+            })
+        rows.sort(key=lambda r: (r['flips'], -r['pass_rate']), reverse=True)
+        return rows
+
+    def latest_failures(self, phase='simulate'):
+        """
+        最近一次运行失败（或超时）的目标，按时间倒序
+        Returns:
+            [{'project', 'target', 'status', 'started_at'}, ...]
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT project, target, status, started_at FROM runs WHERE id IN '
+                '(SELECT MAX(id) FROM runs WHERE phase = ? GROUP BY project, target) ORDER BY id DESC',
+                (phase,)
+            ).fetchall()
+        return [dict(row) for row in rows if row['status'] not in ('ok', 'skipped')]
+
+    def close(self):
+        self.conn.close()
+
+
+def print_query(history, query, phase='simulate', limit=10):
+    """打印查询结果"""
+    if query == 'slowest':
+        rows = history.slowest(phase, limit=limit)
+        print(f"\n最慢的目标（{phase}，最近 5 次成功运行的平均耗时）\n")
+        print(f"{'目标':<40} {'次数':>6} {'平均耗时':>10} {'最大内存':>12}")
+        for r in rows:
+            rss = f"{r['max_rss_kb'] / 1024:.1f}MB" if r['max_rss_kb'] is not None else '-'
+            print(f"{r['target']:<40} {r['runs']:>6} {r['avg_duration']:>9.2f}s {rss:>12}")
+    elif query == 'regressions':
+        rows = history.regressions(phase)[:limit]
+        print(f"\n耗时回归（{phase}，最近 5 次 vs 之前 5 次的中位数）\n")
+        print(f"{'目标':<40} {'之前':>9} {'最近':>9} {'倍数':>7}  原因")
+        for r in rows:
+            cause = '源文件有变化' if r['sources_changed'] else '源文件未变化（工具链/机器?）'
+            print(f"{r['target']:<40} {r['before']:>8.2f}s {r['after']:>8.2f}s {r['ratio']:>6.2f}x  {cause}")
+    elif query == 'flaky':
+        rows = history.flaky(phase)[:limit]
+        print(f"\n不稳定的目标（{phase}，源文件不变时通过/失败交替）\n")
+        print(f"{'目标':<40} {'次数':>6} {'切换':>6} {'通过率':>8}")
+        for r in rows:
+            print(f"{r['target']:<40} {r['runs']:>6} {r['flips']:>6} {r['pass_rate']:>7.0%}")
+    if not rows:
+        print("  （没有记录）")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='编译/仿真运行历史查询',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+示例:
+  python verilog_history.py slowest              # 最慢的目标
+  python verilog_history.py regressions          # 耗时回归
+  python verilog_history.py flaky --phase compile
+        '''
+    )
+    parser.add_argument('query', choices=['slowest', 'regressions', 'flaky'], help='查询类型')
+    parser.add_argument('--phase', choices=['compile', 'simulate'], default='simulate')
+    parser.add_argument('--limit', type=int, default=10, help='最多显示的条数')
+    parser.add_argument('--db', default=str(HISTORY_DB), help=f'数据库路径（默认: {HISTORY_DB}）')
+
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"✗ 没有运行历史: {args.db}")
+        sys.exit(1)
+    history = RunHistory(args.db)
+    print_query(history, args.query, phase=args.phase, limit=args.limit)
+    history.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+仿真进程的资源限制和 CPU 亲和性
+通过 sh 的 ulimit 在 exec 之前设置地址空间和 CPU 时间上限（由 make 派生的 iverilog / vvp 继承），
+防止失控的 testbench 耗尽共享回归主机的内存；并行任务可以各自绑定到一组专用核心，避免超额占用核心、
+互相冲刷缓存。超出限制的运行作为单独的失败类别（limit）报告
+"""
+
+import os
+import re
+import math
+import shutil
+import signal
+import threading
+import contextlib
+
+
+# 超出资源限制的运行状态
+LIMIT_STATUS = 'limit'
+
+# CPU 时间软限制（发送 SIGXCPU）之后到硬限制（SIGKILL）的宽限秒数
+CPU_GRACE = 5
+
+# 内存分配失败的输出（vvp / Verilator 生成的可执行文件 / C++ 运行库）
+_OOM_RE = re.compile(r'out of memory|cannot allocate memory|bad_alloc|memory exhausted', re.I)
+
+# 超出 CPU 时间限制时子进程收到的信号（通过 shell 转述时退出码为 128 + 信号值）
+_LIMIT_SIGNALS = {getattr(signal, 'SIGXCPU', None), signal.SIGKILL} - {None}
+
+
+def check_limits(limits=None, pin_cpus=False):
+    """
+    检查当前平台能否执行资源限制和核心绑定
+    Returns:
+        不支持时的错误说明，支持时为 None
+    """
+    if limits and (os.name != 'posix' or not shutil.which('sh')):
+        return "当前平台不支持资源限制（需要 POSIX sh 的 ulimit）"
+    if pin_cpus and not shutil.which('taskset'):
+        return "找不到 taskset（util-linux），无法绑定核心"
+    return None
+
+
+def limit_command(cmd, memory=None, cpu_time=None, cpus=None):
+    """
+    包装命令，使资源限制和 CPU 亲和性在 exec 之前生效（之后派生的所有进程继承）
+    限制由 sh 的 ulimit 和 taskset 设置，fork 与 exec 之间不运行 Python 代码（管理器在线程池中启动子进程）
+    Args:
+        memory: 地址空间上限（字节，RLIMIT_AS；Linux 不执行 RLIMIT_RSS）
+        cpu_time: CPU 时间上限（秒，RLIMIT_CPU）
+        cpus: 绑定的核心编号
+    Returns:
+        新的命令列表；都不需要时原样返回
+    """
+    cmd = list(cmd)
+    settings = []
+    if memory:
+        settings.append(f"ulimit -v {max(1, memory // 1024)}")
+    if cpu_time:
+        # 先设软限制（发送 SIGXCPU），再设硬限制（SIGKILL）：硬限制不能低于当前的软限制
+        soft = max(1, math.ceil(cpu_time))
+        settings.append(f"ulimit -S -t {soft} && ulimit -H -t {soft + CPU_GRACE}")
+    if settings:
+        cmd = ['sh', '-c', ' && '.join(settings) + ' && exec "$@"', 'sh'] + cmd
+    if cpus:
+        cmd = ['taskset', '-c', ','.join(str(cpu) for cpu in sorted(cpus))] + cmd
+    return cmd
+
+
+def limit_violation(limits, returncode, output='', cpu_used=None):
+    """
+    判断一次失败的运行是否因为超出资源限制
+    Args:
+        limits: {'memory': 字节, 'cpu_time': 秒}
+        returncode: 退出码（负数为被信号结束）
+        output: 运行输出
+        cpu_used: 进程树消耗的 CPU 时间（秒）
+    Returns:
+        原因说明，不是资源限制导致时为 None
+    """
+    if not limits or returncode in (0, None):
+        return None
+    cpu_time = limits.get('cpu_time')
+    if cpu_time:
+        killed = -returncode in _LIMIT_SIGNALS or returncode - 128 in _LIMIT_SIGNALS
+        if killed or (cpu_used is not None and cpu_used >= cpu_time * 0.95):
+            return f"CPU 时间超过 {cpu_time:g} 秒"
+    if limits.get('memory') and _OOM_RE.search(output):
+        return f"内存超过 {limits['memory'] // (1024 * 1024)} MB"
+    return None
+
+
+class CorePool:
+    """
+    把可用核心分成每组 per_job 个的核心组，并发任务各自取用一组、结束后归还；
+    没有空闲核心组时等待，因此并发任务数不会超过核心组数
+    """
+
+    def __init__(self, per_job, cpus=None):
+        """
+        Args:
+            per_job: 每个任务的核心数
+            cpus: 可用核心编号，默认为当前进程允许使用的全部核心
+        """
+        if cpus is None:
+            cpus = os.sched_getaffinity(0) if hasattr(os, 'sched_getaffinity') else range(os.cpu_count() or 1)
+        cpus = sorted(cpus)
+        per_job = max(1, min(per_job, len(cpus)))
+        self.groups = [cpus[i:i + per_job] for i in range(0, len(cpus) - per_job + 1, per_job)]
+        self._free = list(self.groups)
+        self._cond = threading.Condition()
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """取用一个核心组（上下文管理器，返回核心编号列表）"""
+        with self._cond:
+            while not self._free:
+                self._cond.wait()
+            group = self._free.pop(0)
+        try:
+            yield group
+        finally:
+            with self._cond:
+                self._free.append(group)
+                self._cond.notify()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+项目锁与原子写入
+多个管理器进程（多个 CI 任务、开发者和夜间回归）同时处理同一个工作区时，用项目目录中的
+建议性文件锁（flock）串行化对同一项目的编译、仿真和清理；产物先写入临时文件再原子改名，
+其他进程不会读到写了一半的 .vvp、波形或日志
+"""
+
+import os
+import time
+import socket
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # 非 POSIX 平台：不加锁
+    fcntl = None
+
+
+# 锁文件（相对项目目录）
+LOCK_FILE = Path('.vbuild') / 'lock'
+
+# 等待锁时的轮询间隔（秒）
+POLL_INTERVAL = 0.1
+
+
+class ProjectBusy(Exception):
+    """项目正被其他进程锁定（skip 策略，或等待超时）"""
+
+    def __init__(self, project_dir, holder=None):
+        self.project_dir = Path(project_dir)
+        self.holder = holder
+        message = f"项目 {self.project_dir.name} 正被其他进程使用"
+        super().__init__(f"{message}（{holder}）" if holder else message)
+
+
+# 本进程持有的锁 {锁文件路径: {'mutex', 'fd', 'count'}}：flock 对同一进程中不同的文件描述符也互斥，
+# 同一进程中的多个线程（以及嵌套的 compile -> simulate）共用一个文件描述符和引用计数
+_held = {}
+_held_lock = threading.Lock()
+
+
+class ProjectLock:
+    """
+    单个项目的建议性锁（可重入，可用作上下文管理器）
+    用法:
+        with ProjectLock(project_dir, wait=False):
+            ...
+    """
+
+    def __init__(self, project_dir, wait=True, timeout=None):
+        """
+        Args:
+            project_dir: 项目目录
+            wait: 被其他进程锁定时等待（True）还是立即抛出 ProjectBusy（False）
+            timeout: 最多等待的秒数，None 表示一直等待
+        """
+        self.project_dir = Path(project_dir)
+        self.path = os.path.realpath(self.project_dir / LOCK_FILE)
+        self.wait = wait
+        self.timeout = timeout
+
+    def _entry(self):
+        with _held_lock:
+            return _held.setdefault(self.path, {'mutex': threading.Lock(), 'fd': None, 'count': 0})
+
+    def acquire(self):
+        if fcntl is None:
+            return
+        entry = self._entry()
+        with entry['mutex']:
+            if entry['count'] == 0:
+                entry['fd'] = self._lock_file()
+            entry['count'] += 1
+
+    def release(self):
+        if fcntl is None:
+            return
+        entry = self._entry()
+        with entry['mutex']:
+            entry['count'] -= 1
+            if entry['count'] == 0:
+                fcntl.flock(entry['fd'], fcntl.LOCK_UN)
+                os.close(entry['fd'])
+                entry['fd'] = None
+
+    def _lock_file(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if not self.wait or (deadline is not None and time.monotonic() >= deadline):
+                        raise ProjectBusy(self.project_dir, self.holder())
+                    time.sleep(POLL_INTERVAL)
+            # 记录持有者，便于其他进程报告是谁占用了项目
+            os.ftruncate(fd, 0)
+            os.pwrite(fd, f"{os.getpid()}@{socket.gethostname()}\n".encode('utf-8'), 0)
+            return fd
+        except BaseException:
+            os.close(fd)
+            raise
+
+    def holder(self):
+        """当前持有者（进程号@主机名），无法读取时为 None"""
+        try:
+            return Path(self.path).read_text(encoding='utf-8').strip() or None
+        except OSError:
+            return None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def atomic_write(path, data):
+    """
+    先写入同一目录下的临时文件再改名，读取者只会看到旧内容或完整的新内容
+    Args:
+        data: bytes 或 str（UTF-8）
+    """
+    path = Path(path)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
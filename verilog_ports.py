@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Verilog 流式端口提取工具
+按块读取 Verilog 源文件（包括数百MB的门级网表），提取模块名、端口、位宽和参数，
+不会把整个文件读入内存
+"""
+
+import re
+import sys
+import json
+import argparse
+from pathlib import Path
+
+
+# 每次从文件读取的字符数
+CHUNK_SIZE = 1 << 20
+
+# 缓冲区中至少保留的待解析字符数，保证单个 token 不会被块边界截断
+LOOKAHEAD = 4096
+
+_TOKEN_RE = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<attribute>\(\*(?!\s*\)).*?(?:\*\)|\Z))
+  | (?P<string>"(?:\\.|[^"\\\n])*(?:"|\Z))
+  | (?P<directive>`[A-Za-z_]\w*)
+  | (?P<escaped>\\\S+)
+  | (?P<number>(?:\d[\d_]*)?\s*'[sS]?[bodhBODH]\s*[0-9a-fA-FxzXZ?_]+|\d[\d_]*(?:\.[\d_]+)?(?:[eE][+-]?\d+)?)
+  | (?P<ident>[A-Za-z_][\w$]*)
+  | (?P<system>\$[\w$]+)
+  | (?P<op>.)
+''', re.S | re.X)
+
+# 模块体快速跳过：直接在原始文本中查找下一个关心的关键字（跳过注释、字符串和转义标识符），
+# 门级网表中大量的实例化语句因此不必逐个 token 解析
+_BODY_KEYWORD_RE = re.compile(r'''
+    //[^\n]*
+  | /\*.*?(?:\*/|\Z)
+  | "(?:\\.|[^"\\\n])*(?:"|\Z)
+  | \\\S+
+  | (?<![\w$])(?P<keyword>input|output|inout|parameter|localparam|function|task|endmodule)(?![\w$])
+''', re.S | re.X)
+
+# 解析时丢弃的 token 类型
+_SKIP_KINDS = {'ws', 'comment', 'attribute'}
+
+# 端口声明中出现在方向之后、位宽之前的线网/变量类型
+_NET_TYPES = {
+    'wire', 'reg', 'logic', 'tri', 'tri0', 'tri1', 'triand', 'trior',
+    'wand', 'wor', 'uwire', 'supply0', 'supply1', 'var', 'bit',
+}
+
+_DIRECTIONS = {'input', 'output', 'inout'}
+
+
+class VerilogLexer:
+    """
+    流式 Verilog 词法分析器
+    按块读取文件，缓冲区中只保留尚未解析的部分；
+    注释、空白和 (* 属性 *) 会被丢弃，编译指令（如 `include）以 directive 类型返回
+    """
+
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        """
+        Args:
+            stream: 以文本模式打开的文件对象
+            chunk_size: 每次读取的字符数
+        """
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        """读取下一块并丢弃已解析的部分"""
+        chunk = self._stream.read(self._chunk_size)
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        if not chunk:
+            self._eof = True
+
+    def next_token(self):
+        """返回下一个 (类型, 文本)，文件结束时返回 None"""
+        while True:
+            if not self._eof and len(self._buf) - self._pos < LOOKAHEAD:
+                self._fill()
+                continue
+
+            if self._pos >= len(self._buf):
+                return None
+
+            m = _TOKEN_RE.match(self._buf, self._pos)
+
+            # token 到达缓冲区末尾时可能被块边界截断（包括未闭合的块注释），读入更多内容后重新匹配
+            if m.end() == len(self._buf) and not self._eof:
+                self._fill()
+                continue
+
+            self._pos = m.end()
+            if m.lastgroup not in _SKIP_KINDS:
+                return m.lastgroup, m.group()
+
+    def next(self):
+        """返回下一个 token 的文本，文件结束时返回 None"""
+        token = self.next_token()
+        return token[1] if token else None
+
+    def skip_to(self, pattern):
+        """
+        跳到 pattern 中 keyword 组下一次匹配的位置，中间的文本不做词法分析
+        pattern 的其它分支用于跳过注释、字符串等内容，避免匹配到其中的关键字
+        """
+        while True:
+            m = pattern.search(self._buf, self._pos)
+            if m is None:
+                if self._eof:
+                    self._pos = len(self._buf)
+                    return
+                # 保留末尾几个字符，避免关键字被块边界截断
+                self._pos = max(self._pos, len(self._buf) - 16)
+                self._fill()
+                continue
+
+            if m.end() >= len(self._buf) and not self._eof:
+                self._fill()
+                continue
+
+            if m.group('keyword'):
+                self._pos = m.start()
+                return
+            self._pos = m.end()
+
+    def collect_group(self, opener, closer):
+        """
+        读取到与已读取的 opener 匹配的 closer 为止，返回中间的 token 列表（不含 closer）
+        """
+        depth = 1
+        group = []
+        while True:
+            tok = self.next()
+            if tok is None:
+                return group
+            if tok == opener:
+                depth += 1
+            elif tok == closer:
+                depth -= 1
+                if depth == 0:
+                    return group
+            group.append(tok)
+
+
+def tokenize(stream, chunk_size=CHUNK_SIZE):
+    """流式词法分析，逐个产生 (类型, 文本)"""
+    lexer = VerilogLexer(stream, chunk_size)
+    while True:
+        token = lexer.next_token()
+        if token is None:
+            return
+        yield token
+
+
+def _split_top_level(tokens, separator=','):
+    """按不在括号内的分隔符拆分 token 列表"""
+    items = [[]]
+    depth = 0
+    for tok in tokens:
+        if tok in ('(', '[', '{'):
+            depth += 1
+        elif tok in (')', ']', '}'):
+            depth -= 1
+        if tok == separator and depth == 0:
+            items.append([])
+        else:
+            items[-1].append(tok)
+    return [item for item in items if item]
+
+
+def _parse_parameter_items(tokens, local=False):
+    """
+    解析参数声明列表，例如 "parameter W = 8, parameter [3:0] X = 4'h2"
+    返回 [{'name', 'value', 'local'}, ...]
+    """
+    params = []
+    for item in _split_top_level(tokens):
+        if item[0] in ('parameter', 'localparam'):
+            local = item[0] == 'localparam'
+        if '=' not in item:
+            continue
+        eq = item.index('=')
+        names = [tok for tok in item[:eq] if re.match(r'[A-Za-z_\\]', tok)
+                 and tok not in ('parameter', 'localparam', 'signed', 'unsigned', 'integer', 'real')]
+        if not names:
+            continue
+        params.append({'name': names[-1], 'value': ''.join(item[eq + 1:]), 'local': local})
+    return params
+
+
+def _parse_port_attrs(tokens):
+    """
+    解析端口声明中名称前的部分（方向、类型、signed、位宽）
+    返回 (direction, signed, width, 剩余 token)
+    """
+    direction = None
+    signed = False
+    width = ''
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i]
+        if tok in _DIRECTIONS:
+            direction = tok
+        elif tok == 'signed':
+            signed = True
+        elif tok == 'integer':
+            signed = True
+            width = '[31:0]'
+        elif tok in _NET_TYPES or tok == 'unsigned':
+            pass
+        elif tok == '[':
+            depth = 1
+            j = i + 1
+            while j < len(tokens) and depth:
+                if tokens[j] == '[':
+                    depth += 1
+                elif tokens[j] == ']':
+                    depth -= 1
+                j += 1
+            width = ''.join(tokens[i:j])
+            i = j
+            continue
+        else:
+            break
+        i += 1
+    return direction, signed, width, tokens[i:]
+
+
+def _parse_ansi_ports(tokens):
+    """解析 ANSI 风格的端口列表: (input [7:0] a, b, output reg y)"""
+    ports = []
+    direction, signed, width = 'input', False, ''
+    for item in _split_top_level(tokens):
+        if item[0] in _DIRECTIONS:
+            direction, signed, width, rest = _parse_port_attrs(item)
+        elif item[0] in _NET_TYPES or item[0] in ('signed', '['):
+            _, signed, width, rest = _parse_port_attrs(item)
+        else:
+            rest = item
+        if rest:
+            ports.append({'name': rest[0], 'direction': direction,
+                          'signed': signed, 'width': width})
+    return ports
+
+
+def _skip_block(ts, end_keyword):
+    """跳过 function/task 等块，直到对应的结束关键字"""
+    while True:
+        tok = ts.next()
+        if tok is None or tok == end_keyword:
+            return
+
+
+def _parse_module(ts):
+    """解析已读取 module 关键字之后的模块定义，返回模块信息字典"""
+    module = {'name': ts.next(), 'parameters': [], 'ports': []}
+    port_order = []
+    declared = {}
+
+    tok = ts.next()
+    if tok == '#':
+        if ts.next() == '(':
+            module['parameters'].extend(
+                _parse_parameter_items(ts.collect_group('(', ')')))
+        tok = ts.next()
+
+    if tok == '(':
+        header = ts.collect_group('(', ')')
+        if header and (header[0] in _DIRECTIONS or header[0] in _NET_TYPES):
+            module['ports'] = _parse_ansi_ports(header)
+        else:
+            # 非 ANSI 风格：头部只有端口名，方向和位宽在模块体内声明
+            for item in _split_top_level(header):
+                name = item[1] if item[0] == '.' and len(item) > 1 else item[0]
+                port_order.append(name)
+        tok = ts.next()
+
+    # 模块体：只关心端口声明和参数，其余 token 直接跳过
+    while tok is not None and tok != 'endmodule':
+        if tok in _DIRECTIONS:
+            decl = [tok]
+            while True:
+                tok = ts.next()
+                if tok is None or tok == ';':
+                    break
+                decl.append(tok)
+            direction, signed, width, rest = _parse_port_attrs(decl)
+            for item in _split_top_level(rest):
+                declared[item[0]] = {'name': item[0], 'direction': direction,
+                                     'signed': signed, 'width': width}
+        elif tok in ('parameter', 'localparam'):
+            decl = [tok]
+            while True:
+                tok = ts.next()
+                if tok is None or tok == ';':
+                    break
+                decl.append(tok)
+            module['parameters'].extend(_parse_parameter_items(decl))
+        elif tok in ('function', 'task'):
+            _skip_block(ts, 'end' + tok)
+        ts.skip_to(_BODY_KEYWORD_RE)
+        tok = ts.next()
+
+    if port_order:
+        module['ports'] = [declared.get(name, {'name': name, 'direction': 'inout',
+                                               'signed': False, 'width': ''})
+                           for name in port_order]
+    return module
+
+
+def iter_modules(stream, chunk_size=CHUNK_SIZE):
+    """
+    流式扫描文件对象，逐个产生模块信息字典:
+    {'name', 'parameters': [{'name', 'value', 'local'}], 'ports': [{'name', 'direction', 'signed', 'width'}]}
+    """
+    ts = VerilogLexer(stream, chunk_size)
+    while True:
+        tok = ts.next()
+        if tok is None:
+            return
+        if tok in ('module', 'macromodule'):
+            yield _parse_module(ts)
+
+
+def scan_modules(path, chunk_size=CHUNK_SIZE):
+    """流式扫描 Verilog 文件中的所有模块（生成器）"""
+    with open(path, encoding='utf-8', errors='ignore') as f:
+        yield from iter_modules(f, chunk_size)
+
+
+def port_signal(port):
+    """
+    把端口信息转换成生成器使用的信号定义格式
+    例如: {'name': 'data', 'signed': True, 'width': '[7:0]'} -> "signed [7:0] data"
+    转义标识符（如 \\y[0]）后面必须跟空白，这里保留一个结尾空格
+    """
+    parts = []
+    if port['signed']:
+        parts.append('signed')
+    if port['width']:
+        parts.append(port['width'])
+    parts.append(port['name'])
+    signal = ' '.join(parts)
+    return signal + ' ' if port['name'].startswith('\\') else signal
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Verilog 流式端口提取工具',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+示例:
+  # 列出文件中所有模块的端口和参数（JSON 格式）
+  python verilog_ports.py netlist.v
+
+  # 只输出指定模块
+  python verilog_ports.py netlist.v --module top
+        '''
+    )
+    parser.add_argument('verilog_file', help='Verilog 源文件')
+    parser.add_argument('--module', action='append', help='只输出指定模块（可多次指定）')
+
+    args = parser.parse_args()
+
+    if not Path(args.verilog_file).exists():
+        print(f"✗ 文件不存在: {args.verilog_file}")
+        sys.exit(1)
+
+    for module in scan_modules(args.verilog_file):
+        if args.module and module['name'] not in args.module:
+            continue
+        print(json.dumps(module, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+仿真结果缓存
+以 (编译产物内容哈希, 仿真参数, 仿真器后端和版本) 为键保存仿真结论、日志摘要和产物引用；
+编译产物和参数都没有变化的确定性 testbench 可以直接复用上次的结论而不重新运行仿真
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import subprocess
+import functools
+from pathlib import Path
+from datetime import datetime
+
+
+# 结果缓存目录（相对项目目录），每个键一个 <键>.json 和对应的 <键>.log
+RESULT_CACHE = Path('.vbuild') / 'results'
+
+# 仿真产物（波形）后缀
+WAVE_SUFFIXES = ('.vcd', '.fst', '.lxt', '.lxt2')
+
+# 仿真日志中的结论标记（只匹配行首）：模板 testbench 打印 "PASS: ..." / "FAIL: ..." / "ERROR: ..."，
+# Icarus 的 $error / $fatal 输出 "ERROR: 文件:行: ..." / "FATAL: 文件:行: ..."
+_MARKER_RE = re.compile(r'^\s*(PASS(?:ED)?|FAIL(?:ED)?|ERROR|FATAL)\b')
+
+
+@functools.lru_cache(maxsize=None)
+def simulator_version(command=('vvp', '-V')):
+    """仿真器版本（版本命令输出的第一行，如 vvp -V）；没有版本命令或无法获取时为 None"""
+    if not command:
+        return None
+    try:
+        result = subprocess.run(list(command), capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    lines = (result.stdout or result.stderr).splitlines()
+    return lines[0].strip() if lines else None
+
+
+def file_digest(path):
+    """文件内容的 sha1（按块读取）"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def result_key(image, plusargs='', version=None):
+    """
+    结果缓存键
+    Args:
+        image: 编译产物（.vvp 等）的路径
+        plusargs: 仿真参数（包括 +seed 等随机种子参数）
+        version: 仿真器版本
+    """
+    digest = hashlib.sha1()
+    digest.update(f"{file_digest(image)}\n{plusargs}\n{version}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class LogVerdict:
+    """逐行解析仿真日志，根据 PASS / FAIL / ERROR / FATAL 标记判定真实结论（退出码为0也可能失败）"""
+
+    def __init__(self):
+        self.counts = {'pass': 0, 'fail': 0, 'error': 0, 'fatal': 0}
+        self.first_error = None
+        self._partial = ''
+
+    def feed(self, text):
+        """输入一段日志（可以在任意位置截断，不完整的行留到下次）"""
+        lines = (self._partial + text).split('\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self._line(line)
+
+    def close(self):
+        if self._partial:
+            self._line(self._partial)
+            self._partial = ''
+
+    def _line(self, line):
+        m = _MARKER_RE.match(line)
+        if not m:
+            return
+        kind = m.group(1)[:4].lower()
+        kind = {'pass': 'pass', 'fail': 'fail', 'erro': 'error', 'fata': 'fatal'}[kind]
+        self.counts[kind] += 1
+        if kind != 'pass' and self.first_error is None:
+            self.first_error = line.strip()
+
+    @property
+    def failed(self):
+        """日志中是否有失败标记"""
+        return bool(self.counts['fail'] or self.counts['error'] or self.counts['fatal'])
+
+    def summary(self):
+        return {'markers': dict(self.counts), 'first_error': self.first_error}
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+class ResultCache:
+    """单个项目的仿真结果缓存"""
+
+    def __init__(self, project_dir, artifact_dir=None):
+        """
+        Args:
+            project_dir: 项目目录（缓存保存在其中）
+            artifact_dir: 波形所在的构建目录，默认为项目目录
+        """
+        self.project_dir = Path(project_dir)
+        self.artifact_dir = Path(artifact_dir or project_dir)
+        self.cache_dir = self.project_dir / RESULT_CACHE
+
+    def lookup(self, key):
+        """
+        查找缓存的结论；引用的产物（波形）被删除或修改时视为未命中，需要重新仿真生成
+        Returns:
+            {'status', 'log_digest', 'log', 'artifacts', 'recorded_at'} 或 None
+        """
+        try:
+            entry = json.loads((self.cache_dir / f"{key}.json").read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        for rel, stat in entry.get('artifacts', {}).items():
+            try:
+                if _stat_key(self.project_dir / rel) != stat:
+                    return None
+            except OSError:
+                return None
+        entry['log'] = self.cache_dir / f"{key}.log"
+        return entry
+
+    def snapshot(self):
+        """
+        构建目录中波形文件的 {路径: (大小, 修改时间)}，仿真前调用，用于找出本次仿真生成的产物
+        路径在项目目录内时相对项目目录，否则为绝对路径
+        """
+        waves = {}
+        try:
+            entries = list(os.scandir(self.artifact_dir))
+        except OSError:
+            return waves  # 构建目录尚未创建
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith(WAVE_SUFFIXES):
+                try:
+                    name = str(Path(entry.path).relative_to(self.project_dir))
+                except ValueError:
+                    name = str(Path(entry.path).resolve())
+                waves[name] = _stat_key(entry.path)
+        return waves
+
+    def changed(self, before):
+        """与仿真前的 snapshot() 相比新建或修改的波形 {路径: (大小, 修改时间)}"""
+        # 不用开始时间比较修改时间：文件系统时间戳的精度可能比 time.time() 粗
+        return {name: stat for name, stat in self.snapshot().items() if before.get(name) != stat}
+
+    def store(self, key, status, log_text, before):
+        """
+        保存一次仿真的结论
+        Args:
+            status: 'ok' / 'failed'
+            log_text: 仿真输出
+            before: 仿真前的 snapshot()，与之相比新建或修改的波形文件作为产物引用
+        """
+        artifacts = self.changed(before)
+
+        data = log_text.encode('utf-8')
+        record = {
+            'status': status,
+            'log_digest': hashlib.sha1(data).hexdigest(),
+            'artifacts': artifacts,
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            (self.cache_dir / f"{key}.log").write_bytes(data)
+            # 先写临时文件再改名，并行仿真同一项目时不会读到写了一半的记录
+            tmp = self.cache_dir / f"{key}.json.{os.getpid()}.{time.monotonic_ns()}"
+            tmp.write_text(json.dumps(record, indent=2, ensure_ascii=False), encoding='utf-8')
+            os.replace(tmp, self.cache_dir / f"{key}.json")
+        except OSError:
+            pass  # 缓存写入失败不影响结果
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+构建产物保留策略
+统计工作区中各项目的编译产物（.vvp 等，以及后端的中间产物目录）、波形、日志和临时文件，超出磁盘配额时按最近使用时间（LRU）
+从最久未用的开始删除；最近 N 个失败运行的产物始终保留，便于调试。删除直接在线程池中并行进行，不调用 make
+"""
+
+import os
+import re
+import shutil
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from verilog_backends import ARTIFACT_DIR_SUFFIXES, IMAGE_SUFFIXES
+from verilog_lock import ProjectBusy
+from verilog_results import WAVE_SUFFIXES
+
+
+# 由保留策略管理的产物后缀（项目目录和构建目录顶层的文件）
+ARTIFACT_SUFFIXES = IMAGE_SUFFIXES + ('.log',) + WAVE_SUFFIXES
+
+# 中断的编译/仿真留下的临时文件：<产物名>.<进程号>[.<线程号>].tmp，产物名必须带产物后缀，
+# 用户自己的 .tmp 文件和生成器正在写入的 .<名称>.*.tmp 不算
+_TEMP_RE = re.compile(r'^(?!\.)(.+?)\.\d+(?:\.\d+)?\.tmp$')
+
+# 默认保留最近几个失败运行的产物
+KEEP_FAILED = 3
+
+_SIZE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*$', re.I)
+
+
+def parse_size(text):
+    """解析容量: "500M"、"20G"、"1.5T"、"4096"（字节）"""
+    m = _SIZE_RE.match(str(text))
+    if not m:
+        raise ValueError(f"无效的容量: {text}")
+    return int(float(m.group(1)) * 1024 ** ' KMGT'.index(m.group(2).upper() or ' '))
+
+
+def _disk_bytes(st):
+    """文件实际占用的磁盘空间（与 du 一致），没有 st_blocks 的平台使用文件大小"""
+    return getattr(st, 'st_blocks', 0) * 512 or st.st_size
+
+
+def _tree_usage(path):
+    """目录树中所有条目的 (磁盘占用, 最近使用时间)"""
+    total = 0
+    last_used = 0
+    for root, dirs, files in os.walk(path):
+        for name in files + dirs:
+            try:
+                st = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            total += _disk_bytes(st)
+            last_used = max(last_used, st.st_atime, st.st_mtime)
+    return total, last_used
+
+
+def _is_artifact(entry):
+    """项目目录或构建目录顶层的条目是否是产物（文件或中间产物目录）"""
+    name = entry.name
+    if entry.is_dir(follow_symlinks=False):
+        return name.endswith(ARTIFACT_DIR_SUFFIXES)
+    if not entry.is_file(follow_symlinks=False):
+        return False
+    if name.endswith(ARTIFACT_SUFFIXES):
+        return True
+    m = _TEMP_RE.match(name)
+    return bool(m) and m.group(1).endswith(ARTIFACT_SUFFIXES)
+
+
+def _scan_project(project, dirs):
+    artifacts = []
+    entries = []
+    seen = set()
+    for directory in dirs:
+        directory = os.path.realpath(directory)
+        if directory in seen:
+            continue  # 构建目录就是项目目录
+        seen.add(directory)
+        try:
+            entries.extend(os.scandir(directory))
+        except OSError:
+            continue  # 构建目录尚未创建
+    for entry in entries:
+        try:
+            if not _is_artifact(entry):
+                continue
+            st = entry.stat(follow_symlinks=False)
+        except OSError:
+            continue
+        # 文件系统可能以 noatime / relatime 挂载，取访问时间和修改时间中较新的一个
+        size, last_used = _disk_bytes(st), max(st.st_atime, st.st_mtime)
+        if entry.is_dir(follow_symlinks=False):
+            tree_size, tree_used = _tree_usage(entry.path)
+            size, last_used = size + tree_size, max(last_used, tree_used)
+        artifacts.append({
+            'project': project,
+            'path': Path(entry.path),
+            'bytes': size,
+            'last_used': last_used,
+        })
+    return artifacts
+
+
+def collect_artifacts(projects, jobs=None):
+    """
+    并行统计各项目的产物
+    Args:
+        projects: {项目名: 项目目录} 或 {项目名: [项目目录, 构建目录, ...]}
+    Returns:
+        [{'project', 'path', 'bytes', 'last_used'}, ...]
+    """
+    def scan(item):
+        project, dirs = item
+        return _scan_project(project, [dirs] if isinstance(dirs, (str, os.PathLike)) else dirs)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = pool.map(scan, projects.items())
+        return [artifact for artifacts in results for artifact in artifacts]
+
+
+def _delete(path):
+    try:
+        st = os.lstat(path)
+        size = _disk_bytes(st)
+        if os.path.isdir(path) and not os.path.islink(path):
+            size += _tree_usage(path)[0]
+            shutil.rmtree(path)
+        else:
+            os.unlink(path)
+        return size, None
+    except FileNotFoundError:
+        return 0, None  # 已被其他进程删除
+    except OSError as e:
+        return 0, (path, str(e))
+
+
+def delete_artifacts(artifacts, lock, jobs=None):
+    """
+    按项目并行删除产物，删除每个项目的产物期间持有该项目的锁
+    Args:
+        artifacts: collect_artifacts() / plan_eviction() 的结果
+        lock: lock(项目名) -> 项目锁（上下文管理器）；项目正被其他进程使用时抛出 ProjectBusy，跳过该项目
+    Returns:
+        (释放的字节数, [(路径, 错误信息), ...], {跳过的项目: 原因})
+    """
+    by_project = {}
+    for artifact in artifacts:
+        by_project.setdefault(artifact['project'], []).append(artifact['path'])
+
+    def delete(item):
+        project, paths = item
+        try:
+            with lock(project):
+                return [_delete(path) for path in paths], None
+        except ProjectBusy as e:
+            return [], (project, str(e))
+
+    reclaimed = 0
+    errors = []
+    busy = {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for results, skipped in pool.map(delete, by_project.items()):
+            for size, error in results:
+                reclaimed += size
+                if error:
+                    errors.append(error)
+            if skipped:
+                busy[skipped[0]] = skipped[1]
+    return reclaimed, errors, busy
+
+
+def plan_eviction(artifacts, quota, protected=()):
+    """
+    选出需要删除的产物：按最近使用时间从旧到新删除，直到总占用不超过配额
+    Args:
+        artifacts: collect_artifacts() 的结果
+        quota: 配额（字节）
+        protected: 不删除的文件路径集合
+    Returns:
+        (需要删除的产物列表, 删除后的总占用)
+    """
+    total = sum(a['bytes'] for a in artifacts)
+    evict = []
+    protected = {Path(p) for p in protected}
+    for artifact in sorted(artifacts, key=lambda a: a['last_used']):
+        if total <= quota:
+            break
+        if artifact['path'] in protected:
+            continue
+        evict.append(artifact)
+        total -= artifact['bytes']
+    return evict, total
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+项目统计工具
+并行统计各项目源文件的行数、编译/仿真产物大小和磁盘占用，供 report / show 使用；
+行数按固定大小的块读取计数（不把整个文件读入内存），结果按文件 (大小, 修改时间) 缓存
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from verilog_backends import IMAGE_SUFFIXES
+from verilog_lock import atomic_write
+from verilog_results import WAVE_SUFFIXES
+
+
+# 行数缓存（相对工作区目录）
+STATS_CACHE = Path('.vbuild') / 'stats.json'
+
+# 计数时每次读取的块大小
+CHUNK_SIZE = 1 << 20
+
+
+def count_lines(path):
+    """
+    统计文件行数（与 readlines() 的结果一致：最后一行没有换行符时也计为一行）
+    """
+    lines = 0
+    last = b'\n'
+    buffer = bytearray(CHUNK_SIZE)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            lines += buffer.count(b'\n', 0, n)
+            last = buffer[n - 1:n]
+    return lines + (last != b'\n')
+
+
+def format_size(size):
+    """把字节数格式化为易读的形式"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class ProjectStats:
+    """带缓存的项目统计"""
+
+    def __init__(self, cache_file=STATS_CACHE, jobs=None):
+        """
+        Args:
+            cache_file: 行数缓存文件
+            jobs: 并行统计的线程数，默认由 ThreadPoolExecutor 决定
+        """
+        self.cache_file = Path(cache_file)
+        self.jobs = jobs
+        try:
+            self.cache = json.loads(self.cache_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            self.cache = {}
+        self.used = {}  # 本次用到的缓存项
+        self.lock = threading.Lock()
+
+    def line_count(self, path, st=None):
+        """文件行数；文件 (大小, 修改时间) 未变化时直接使用缓存"""
+        key = str(path)
+        st = st or os.stat(path)
+        stat = [st.st_size, st.st_mtime_ns]
+        entry = self.cache.get(key)
+        if entry is None or entry[:2] != stat:
+            entry = stat + [count_lines(path)]
+        with self.lock:
+            self.used[key] = entry
+        return entry[2]
+
+    def project(self, path, build_dir=None):
+        """
+        统计单个项目（一次遍历项目目录）
+        Args:
+            build_dir: 编译产物和波形所在的构建目录，默认为项目目录；
+                       在项目目录之外时只统计其顶层文件，并计入磁盘占用
+        Returns:
+            {'rtl': {文件名: 行数}, 'tb': {文件名: 行数}, 'rtl_lines', 'tb_lines',
+             'vvp_bytes'（各后端的编译产物）, 'wave_bytes', 'waves': [波形文件（相对项目目录，构建目录在项目之外时为绝对路径）],
+             'disk_usage'}
+        """
+        path = Path(path)
+        rtl = {}
+        tb = {}
+        vvp_bytes = 0
+        wave_bytes = 0
+        waves = []
+        disk_usage = 0
+
+        pending = [(str(path), '')]
+        build_rel = ''
+        if build_dir is not None:
+            try:
+                build_rel = Path(build_dir).resolve().relative_to(path.resolve()).as_posix() + '/'
+                build_rel = '' if build_rel == './' else build_rel
+            except ValueError:
+                build_rel = None  # 项目目录之外（rel 为 None 表示不再向下遍历）
+                pending.append((str(build_dir), None))
+        while pending:
+            directory, rel = pending.pop()
+            try:
+                entries = list(os.scandir(directory))
+                st = os.lstat(directory)
+            except OSError:
+                continue  # 统计过程中被删除，或构建目录尚未创建
+            # 与 du 一致按实际占用的块计算，没有 st_blocks 的平台使用文件大小
+            disk_usage += getattr(st, 'st_blocks', 0) * 512 or st.st_size
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if rel is not None:
+                            pending.append((entry.path, f"{rel}{entry.name}/"))
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                disk_usage += getattr(st, 'st_blocks', 0) * 512 or st.st_size
+                name = entry.name
+                if rel == 'rtl/' and name.endswith('.v'):
+                    rtl[name] = self.line_count(entry.path, st)
+                elif rel == 'sim/' and name.endswith('_tb.v'):
+                    tb[name] = self.line_count(entry.path, st)
+                elif rel == build_rel and name.endswith(IMAGE_SUFFIXES):
+                    vvp_bytes += st.st_size
+                elif rel in (build_rel, '') and name.endswith(WAVE_SUFFIXES):
+                    # 项目目录顶层也可能有从构建目录复制回来的失败运行波形
+                    wave_bytes += st.st_size
+                    waves.append(entry.path if rel is None else f"{rel}{name}")
+
+        rtl = dict(sorted(rtl.items()))
+        tb = dict(sorted(tb.items()))
+        return {
+            'rtl': rtl,
+            'tb': tb,
+            'rtl_lines': sum(rtl.values()),
+            'tb_lines': sum(tb.values()),
+            'vvp_bytes': vvp_bytes,
+            'wave_bytes': wave_bytes,
+            'waves': sorted(waves),
+            'disk_usage': disk_usage,
+        }
+
+    def collect(self, projects, build_dirs=None):
+        """
+        并行统计多个项目
+        Args:
+            projects: {项目名: 项目目录}
+            build_dirs: {项目名: 构建目录}，默认为项目目录
+        Returns:
+            {项目名: 统计结果}，顺序与 projects 相同
+        """
+        build_dirs = build_dirs or {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            futures = {name: pool.submit(self.project, path, build_dirs.get(name))
+                       for name, path in projects.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    def save(self, prune=False):
+        """
+        保存行数缓存（内容没有变化时不写入）
+        Args:
+            prune: 只保留本次用到的项（统计了全部项目时使用，丢弃已删除文件的旧项）
+        """
+        cache = dict(self.used) if prune else {**self.cache, **self.used}
+        if cache == self.cache:
+            return
+        try:
+            self.cache_file.parent.mkdir(exist_ok=True)
+            # 多个 report 可能同时保存：每个写入者使用自己的临时文件
+            atomic_write(self.cache_file, json.dumps(cache))
+            self.cache = cache
+        except OSError:
+            pass  # 缓存写入失败不影响结果
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Verilog 项目统计工具',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+示例:
+  # 统计项目的行数、产物大小和磁盘占用
+  python verilog_stats.py my_project other_project
+        '''
+    )
+    parser.add_argument('dirs', nargs='+', help='项目目录')
+    parser.add_argument('--jobs', type=int, default=None, help='并行统计的线程数')
+
+    args = parser.parse_args()
+
+    missing = [d for d in args.dirs if not Path(d).is_dir()]
+    if missing:
+        print(f"✗ 目录不存在: {', '.join(missing)}")
+        sys.exit(1)
+
+    stats = ProjectStats(jobs=args.jobs)
+    results = stats.collect({d: d for d in args.dirs})
+    stats.save()
+    for name, result in results.items():
+        print(f"{name}: RTL {result['rtl_lines']} 行, TB {result['tb_lines']} 行, "
+              f"编译产物 {format_size(result['vvp_bytes'])}, 波形 {format_size(result['wave_bytes'])}, "
+              f"磁盘占用 {format_size(result['disk_usage'])}")
+
+
+if __name__ == '__main__':
+    main()
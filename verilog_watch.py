@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件变化监视工具
+Linux 上通过 inotify（ctypes 调用 libc，无需第三方库）等待文件系统事件，
+其他平台或 inotify 不可用时退回到按间隔比较文件 (大小, 修改时间) 的轮询方式
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import argparse
+import ctypes
+import ctypes.util
+from pathlib import Path
+
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+# 只关心写完成、移入/移出、创建/删除和 touch（不监听 IN_MODIFY，避免一次保存产生大量事件）
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+# 轮询方式的默认间隔（秒）
+POLL_INTERVAL = 0.5
+
+
+class InotifyWatcher:
+    """基于 inotify 的监视器"""
+
+    def __init__(self, roots, match=None):
+        """
+        Args:
+            roots: [(目录, 是否递归), ...]
+            match: match(path) -> bool，只报告匹配的文件，默认报告全部
+        """
+        self.match = match or (lambda path: True)
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+        self._dirs = {}          # wd -> 目录
+        self._recursive = set()  # 递归监视的 wd（其中新建的子目录会自动加入监视）
+        for root, recursive in roots:
+            self._add_tree(Path(root), recursive)
+
+    def _add_watch(self, directory, recursive):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            return  # 目录已被删除或无权限
+        self._dirs[wd] = Path(directory)
+        if recursive:
+            self._recursive.add(wd)
+
+    def _add_tree(self, root, recursive):
+        if not root.is_dir():
+            return
+        self._add_watch(root, recursive)
+        if recursive:
+            for dirpath, dirnames, _ in os.walk(root):
+                dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+                for d in dirnames:
+                    self._add_watch(Path(dirpath) / d, True)
+
+    def wait(self, timeout=None):
+        """
+        等待文件变化
+        Returns:
+            变化的文件路径集合（超时返回空集合）；事件队列溢出时返回 None，表示需要全部重新检查
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        overflow = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    self._recursive.discard(wd)
+                    continue
+
+                directory = self._dirs.get(wd)
+                if directory is None or not name:
+                    continue
+                path = directory / os.fsdecode(name)
+
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and wd in self._recursive:
+                        self._add_tree(path, True)
+                        # 目录中可能已经有文件（例如整个目录被移入）
+                        changed.update(p for p in path.rglob('*') if p.is_file() and self.match(p))
+                elif self.match(path):
+                    changed.add(path)
+
+        return None if overflow else changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """按间隔比较文件 (大小, 修改时间) 的监视器"""
+
+    def __init__(self, roots, match=None, interval=POLL_INTERVAL):
+        """
+        Args:
+            roots: [(目录, 是否递归), ...]
+            match: match(path) -> bool，只监视匹配的文件，默认监视全部
+            interval: 轮询间隔（秒）
+        """
+        self.roots = [(Path(root), recursive) for root, recursive in roots]
+        self.match = match or (lambda path: True)
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        pending = list(self.roots)
+        while pending:
+            directory, recursive = pending.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and not entry.name.startswith('.'):
+                            pending.append((Path(entry.path), True))
+                    elif self.match(Path(entry.path)):
+                        st = entry.stat()
+                        snapshot[Path(entry.path)] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    continue  # 扫描过程中被删除
+        return snapshot
+
+    def wait(self, timeout=None):
+        """
+        等待文件变化（与 InotifyWatcher.wait 相同的接口）
+        Returns:
+            变化的文件路径集合（超时返回空集合）
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return set()
+            time.sleep(self.interval if remaining is None else min(self.interval, remaining))
+
+            snapshot = self._scan()
+            changed = {p for p in snapshot.keys() | self._snapshot.keys()
+                       if snapshot.get(p) != self._snapshot.get(p)}
+            self._snapshot = snapshot
+            if changed:
+                return changed
+
+    def close(self):
+        pass
+
+
+def create_watcher(roots, match=None, polling=False):
+    """
+    创建监视器：优先使用 inotify，不可用时退回到轮询
+    Args:
+        roots: [(目录, 是否递归), ...]
+        match: match(path) -> bool，只报告匹配的文件
+        polling: 强制使用轮询
+    """
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(roots, match)
+        except (OSError, AttributeError):
+            pass  # libc 中没有 inotify，或 inotify 实例数达到上限
+    return PollingWatcher(roots, match)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='文件变化监视工具',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+示例:
+  # 监视目录（递归），打印变化的文件
+  python verilog_watch.py my_project/rtl my_project/sim
+
+  # 强制使用轮询方式
+  python verilog_watch.py my_project --polling
+        '''
+    )
+    parser.add_argument('dirs', nargs='+', help='需要监视的目录')
+    parser.add_argument('--polling', action='store_true', help='使用轮询代替 inotify')
+
+    args = parser.parse_args()
+
+    watcher = create_watcher([(d, True) for d in args.dirs], polling=args.polling)
+    print(f"监视中 ({type(watcher).__name__})，按 Ctrl+C 退出")
+    try:
+        while True:
+            changed = watcher.wait()
+            if changed is None:
+                print("⚠ 事件队列溢出")
+                continue
+            for path in sorted(changed):
+                print(path)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+if __name__ == '__main__':
+    main()
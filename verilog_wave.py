@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+波形抽取工具
+流式读取完整的 VCD（不把整个文件读入内存），只保留选中的作用域或信号和一个时间窗口，
+可以把短于指定分辨率的活动合并掉，生成小得多的查看文件；生成的 Makefile 在波形超过
+VIEW_THRESHOLD 时由 make view 调用，GTKWave 打开抽取后的文件
+"""
+
+import os
+import re
+import sys
+import argparse
+import fnmatch
+from pathlib import Path
+
+
+# 时间单位（飞秒）
+TIME_UNITS = {'fs': 1, 'ps': 10 ** 3, 'ns': 10 ** 6, 'us': 10 ** 9, 'ms': 10 ** 12, 's': 10 ** 15}
+
+_TIME_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(fs|ps|ns|us|ms|s)?\s*$')
+
+# 带值和标识符两个记号的变化：向量 b / 实数 r / 字符串 s
+_MULTI_TOKEN = frozenset('bBrRsS')
+
+
+def parse_time(text, timescale_fs=1):
+    """
+    解析时间: "1500"（VCD 时间单位）、"10us"、"2.5 ns"
+    Args:
+        timescale_fs: VCD 时间单位（飞秒），带单位的时间按它换算
+    """
+    m = _TIME_RE.match(str(text))
+    if not m:
+        raise ValueError(f"无效的时间: {text}")
+    if not m.group(2):
+        return int(float(m.group(1)))
+    return int(float(m.group(1)) * TIME_UNITS[m.group(2)] // timescale_fs)
+
+
+def _read_header(f):
+    """
+    读取 $enddefinitions 之前的声明
+    Returns:
+        (声明事件列表, 时间单位（飞秒）, 同一行中 $enddefinitions $end 之后的记号)
+        事件: ('text', 原文) / ('scope', 原文, 名称) / ('upscope',) / ('var', 原文, 标识符, 名称)
+    """
+    events = []
+    timescale_fs = 1
+    tokens = []
+    for line in f:
+        tokens.extend(line.split())
+        # 声明以 $end 结束，可能跨多行；凑齐完整的声明再处理
+        while '$end' in tokens:
+            end = tokens.index('$end')
+            decl, tokens = tokens[:end + 1], tokens[end + 1:]
+            keyword = decl[0]
+            text = ' '.join(decl)
+            if keyword == '$enddefinitions':
+                return events, timescale_fs, tokens
+            if keyword == '$scope':
+                events.append(('scope', text, decl[2] if len(decl) > 3 else ''))
+            elif keyword == '$upscope':
+                events.append(('upscope',))
+            elif keyword == '$var':
+                # $var 类型 位宽 标识符 名称 [范围] $end
+                events.append(('var', text, decl[3], decl[4]))
+            else:
+                if keyword == '$timescale':
+                    m = _TIME_RE.match(''.join(decl[1:-1]))
+                    if m:
+                        timescale_fs = int(float(m.group(1)) * TIME_UNITS[m.group(2) or 's'])
+                events.append(('text', text))
+    raise ValueError("不是有效的 VCD 文件：没有 $enddefinitions")
+
+
+def _select(events, scopes=(), signals=()):
+    """
+    选出保留的信号，生成只包含这些信号（及其所在作用域）的声明
+    Args:
+        scopes: 作用域路径（如 tb.dut），保留其中（含子作用域）的所有信号
+        signals: 信号全名的通配模式（如 tb.dut.state*）
+    Returns:
+        (声明文本行列表, 保留的标识符集合, 信号总数)
+    """
+    scopes = [s.strip('.') for s in scopes]
+    keep_all = not scopes and not signals
+    lines = []
+    kept = set()
+    total = 0
+    stack = []  # [[作用域声明, 名称, 是否已输出], ...]
+    for event in events:
+        kind = event[0]
+        if kind == 'text':
+            lines.append(event[1])
+        elif kind == 'scope':
+            stack.append([event[1], event[2], False])
+        elif kind == 'upscope':
+            if stack and stack.pop()[2]:
+                lines.append('$upscope $end')
+        else:
+            total += 1
+            path = '.'.join(entry[1] for entry in stack)
+            name = f"{path}.{event[3]}" if path else event[3]
+            if not (keep_all
+                    or any(path == s or path.startswith(s + '.') for s in scopes)
+                    or any(fnmatch.fnmatchcase(name, p) for p in signals)):
+                continue
+            # 作用域只在其中有保留的信号时输出
+            for entry in stack:
+                if not entry[2]:
+                    lines.append(entry[0])
+                    entry[2] = True
+            lines.append(event[1])
+            kept.add(event[2])
+    lines.append('$enddefinitions $end')
+    return lines, kept, total
+
+
+class _Writer:
+    """按时间桶合并变化：同一个桶内每个信号只写最后的值，与已写出的值相同的变化省略"""
+
+    def __init__(self, out):
+        self.out = out
+        self.bucket = None    # 当前时间桶，进入时间窗口之前为 None
+        self.pending = {}     # 当前桶内的变化 {标识符: 值}
+        self.emitted = {}     # 已写出的值
+        self.last = None      # 最后写出的时间
+        self.changes = 0
+
+    def advance(self, bucket):
+        if bucket != self.bucket:
+            self.flush()
+            self.bucket = bucket
+
+    def flush(self):
+        changes = [(ident, value) for ident, value in self.pending.items() if self.emitted.get(ident) != value]
+        self.pending = {}
+        if not changes:
+            return
+        first = not self.emitted
+        self.out.write(f"#{self.bucket}\n")
+        self.last = self.bucket
+        if first:
+            self.out.write("$dumpvars\n")
+        for ident, value in changes:
+            self.out.write(f"{value}{ident}\n" if len(value) == 1 else f"{value} {ident}\n")
+            self.emitted[ident] = value
+        if first:
+            self.out.write("$end\n")
+        self.changes += len(changes)
+
+
+def extract(src, dst, scopes=(), signals=(), start=None, end=None, resolution=None):
+    """
+    从 src 流式抽取波形写入 dst（先写临时文件再改名）
+    Args:
+        scopes: 保留的作用域路径
+        signals: 保留的信号全名通配模式（都为空时保留所有信号）
+        start, end: 时间窗口（VCD 时间单位，或带单位的字符串如 "10us"），None 表示不限
+        resolution: 时间分辨率，同一个分辨率区间内的变化合并为区间起点的最终值（滤掉更短的毛刺）
+    Returns:
+        {'signals', 'kept', 'changes', 'end_time', 'bytes_in', 'bytes_out'}
+    """
+    src, dst = Path(src), Path(dst)
+    tmp = dst.with_name(f"{dst.name}.{os.getpid()}.tmp")
+    # latin-1 逐字节对应，任何内容都能原样写回
+    with open(src, encoding='latin-1') as f, open(tmp, 'w', encoding='latin-1') as out:
+        try:
+            events, timescale_fs, tokens = _read_header(f)
+            start, end, resolution = (None if value is None else parse_time(value, timescale_fs)
+                                      for value in (start, end, resolution))
+            start = start or 0
+            resolution = resolution if resolution and resolution > 1 else None
+
+            lines, kept, total = _select(events, scopes, signals)
+            out.write('\n'.join(lines) + '\n')
+
+            writer = _Writer(out)
+            time = 0
+            value = None
+            comment = False
+            done = False
+            for line in _lines(tokens, f):
+                for token in line:
+                    if comment:
+                        comment = token != '$end'
+                        continue
+                    if value is not None:
+                        # 向量 / 实数 / 字符串值之后的标识符
+                        if token in kept:
+                            writer.pending[token] = value
+                        value = None
+                        continue
+                    c = token[0]
+                    if c == '#':
+                        time = int(token[1:])
+                        if end is not None and time > end:
+                            done = True
+                            break
+                        if time >= start:
+                            bucket = time - time % resolution if resolution else time
+                            if writer.bucket is None:
+                                # 进入时间窗口：窗口之前累积的值作为初始值在窗口起点写出
+                                writer.bucket = start - start % resolution if resolution else start
+                            writer.advance(max(bucket, writer.bucket))
+                    elif c in _MULTI_TOKEN:
+                        value = token
+                    elif c == '$':
+                        # $dumpvars / $dumpall / $dumpon / $dumpoff / $end 只是分组，变化按普通变化处理
+                        comment = token == '$comment'
+                    else:
+                        ident = token[1:]
+                        if ident in kept:
+                            writer.pending[ident] = c
+                if done:
+                    break
+            if writer.bucket is None:
+                writer.bucket = start
+            writer.flush()
+            end_time = end if done else time
+            # 写出窗口终点，查看器显示完整的时间范围
+            if writer.last is None or end_time > writer.last:
+                out.write(f"#{end_time}\n")
+        except BaseException:
+            out.close()
+            tmp.unlink()
+            raise
+    os.replace(tmp, dst)
+    return {'signals': total, 'kept': len(kept), 'changes': writer.changes, 'end_time': end_time,
+            'bytes_in': src.stat().st_size, 'bytes_out': dst.stat().st_size}
+
+
+def _lines(first, f):
+    """$enddefinitions 之后的记号：同一行剩下的部分，然后逐行读取"""
+    if first:
+        yield first
+    for line in f:
+        yield line.split()
+
+
+def main():
+    from verilog_retention import parse_size
+    from verilog_stats import format_size
+
+    parser = argparse.ArgumentParser(
+        description='VCD 波形抽取工具',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+示例:
+  # 只保留 tb.dut 下的信号和 10us 到 20us 的时间窗口
+  python verilog_wave.py my_project/my_project.vcd -o view.vcd --scope tb.dut --start 10us --end 20us
+
+  # 按信号名选择，并合并短于 100ns 的活动
+  python verilog_wave.py big.vcd -o view.vcd --signal 'tb.dut.state*' --resolution 100ns
+
+  # 波形小于 100M 时不抽取（删除旧的查看文件），供 make view 使用
+  python verilog_wave.py big.vcd -o view.vcd --min-size 100M
+        '''
+    )
+    parser.add_argument('vcd', help='原始波形文件')
+    parser.add_argument('-o', '--output', required=True, help='输出的查看文件')
+    parser.add_argument('--scope', action='append', default=[],
+                        help='保留的作用域路径，包括子作用域（可多次指定）')
+    parser.add_argument('--signal', action='append', default=[],
+                        help='保留的信号全名通配模式（可多次指定）')
+    parser.add_argument('--start', help='时间窗口起点（VCD 时间单位，或带单位如 10us）')
+    parser.add_argument('--end', help='时间窗口终点')
+    parser.add_argument('--resolution', help='时间分辨率，合并更短的活动')
+    parser.add_argument('--min-size', metavar='SIZE',
+                        help='原始波形小于此大小时不抽取，并删除已有的输出文件')
+
+    args = parser.parse_args()
+
+    if not Path(args.vcd).is_file():
+        print(f"✗ 波形文件不存在: {args.vcd}")
+        sys.exit(1)
+
+    size = Path(args.vcd).stat().st_size
+    try:
+        min_size = parse_size(args.min_size) if args.min_size else 0
+    except ValueError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+    if size < min_size:
+        Path(args.output).unlink(missing_ok=True)
+        return
+
+    try:
+        result = extract(args.vcd, args.output, scopes=args.scope, signals=args.signal,
+                         start=args.start, end=args.end, resolution=args.resolution)
+    except (OSError, ValueError) as e:
+        print(f"✗ 抽取失败: {e}")
+        sys.exit(1)
+    print(f"✓ {args.output}: 保留 {result['kept']}/{result['signals']} 个信号, {result['changes']} 次变化, "
+          f"{format_size(result['bytes_in'])} → {format_size(result['bytes_out'])}")
+
+
+if __name__ == '__main__':
+    main()